@@ -1,6 +1,17 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import User, Student, Staff, Guardian, Subject, Class, Exam, ExamResult, FeeStructure, FeePayment, Attendance, Timetable, StudentClass, ClassSubject
+from .search_service import search_filter
+
+
+class FullTextSearchMixin:
+    """Answer the changelist search box from the full-text search index."""
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(search_filter(search_term, self.search_kind)), False
 
 # Define an inline admin descriptor for Student model
 class StudentInline(admin.StackedInline):
@@ -36,27 +47,33 @@ class CustomUserAdmin(UserAdmin):
 admin.site.register(User, CustomUserAdmin)
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('user', 'student_id', 'admission_number', 'date_of_birth', 'gender')
     list_filter = ('gender',)
     search_fields = ('user__username', 'student_id', 'admission_number')
+    search_kind = 'student'
 
 @admin.register(Staff)
-class StaffAdmin(admin.ModelAdmin):
+class StaffAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('user', 'staff_id', 'role', 'date_joined')
     list_filter = ('role',)
     search_fields = ('user__username', 'staff_id')
+    search_kind = 'staff'
 
 @admin.register(Guardian)
-class GuardianAdmin(admin.ModelAdmin):
+class GuardianAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('get_student_name', 'first_name', 'last_name', 'relationship')
     list_filter = ('relationship',)
-    search_fields = ('student__user__first_name', 'student__user__last_name', 'first_name', 'last_name')
+    search_fields = ('first_name', 'last_name', 'email', 'guardian_number')
+    search_kind = 'guardian'
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('students__user')
+
     def get_student_name(self, obj):
-        return obj.student.user.get_full_name() if obj.student and obj.student.user else 'No Student'
-    get_student_name.short_description = 'Student'
-    get_student_name.admin_order_field = 'student__user__first_name'
+        names = [student.user.get_full_name() for student in obj.students.all()]
+        return ', '.join(names) or 'No Student'
+    get_student_name.short_description = 'Students'
 
 @admin.register(Subject)
 class SubjectAdmin(admin.ModelAdmin):
@@ -0,0 +1,141 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .dashboard_service import invalidate_dashboard
+from .models import (
+    Attendance, ExamResult, FeePayment, ArchivedAttendance, ArchivedExamResult, ArchivedFeePayment, ArchivedYear,
+)
+from .utils import get_year_dates
+
+# kind -> (live model, archive model)
+ARCHIVES = {
+    'attendance': (Attendance, ArchivedAttendance),
+    'examresult': (ExamResult, ArchivedExamResult),
+    'feepayment': (FeePayment, ArchivedFeePayment),
+}
+
+BATCH_SIZE = 5000
+
+
+class ArchiveError(Exception):
+    """Raised for a year that cannot be archived (the current year or a later one)."""
+
+
+def _year_filter(kind, year):
+    """The live rows of `kind` belonging to an academic year."""
+    if kind == 'feepayment':
+        # Balances still owed stay live, where arrears and statements look for them
+        return Q(fee_structure__year=year) & ~Q(status__in=FeePayment.OUTSTANDING_STATUSES)
+    start, end = get_year_dates(year)
+    if kind == 'examresult':
+        return Q(exam__date__range=(start, end))
+    return Q(date__range=(start, end))
+
+
+def _shared_fields(archive):
+    """Fields the archive table shares with its live table, in archive order."""
+    return [field for field in archive._meta.concrete_fields if field.name != 'academic_year']
+
+
+def _move(kind, year, low, high):
+    """Copy the year's live rows with ids in [low, high] to the archive, then delete exactly those copied."""
+    live, archive = ARCHIVES[kind]
+    fields = _shared_fields(archive)
+    columns = [field.column for field in fields]
+    select_sql, params = (
+        live.objects.filter(_year_filter(kind, year), pk__range=(low, high))
+        .values_list(*[live._meta.get_field(field.name).attname for field in fields])
+        .order_by().query.sql_with_params()
+    )
+    quote = connection.ops.quote_name
+    live_table, archive_table = quote(live._meta.db_table), quote(archive._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {archive_table} ({', '.join(map(quote, columns))}, {quote('academic_year')}) "
+            f"SELECT moved.*, %s FROM ({select_sql}) moved",
+            (year, *params),
+        )
+        cursor.execute(
+            f"DELETE FROM {live_table} WHERE {quote('id')} IN "
+            f"(SELECT {quote('id')} FROM {archive_table} WHERE {quote('id')} BETWEEN %s AND %s)",
+            (low, high),
+        )
+        return cursor.rowcount
+
+
+def archive_year(year, kinds=None, batch_size=BATCH_SIZE, progress=None):
+    """
+    Move a closed academic year's attendance, exam results and settled fee
+    payments to the archive tables, `batch_size` rows per transaction so
+    the live tables stay writable while it runs. Interrupted runs can be
+    repeated: every batch either moves completely or not at all.
+    `progress(kind, moved)` is called after each batch.
+    Returns {kind: rows moved}.
+    """
+    if year >= timezone.localdate().year:
+        raise ArchiveError(f'{year} is not closed yet; only earlier academic years can be archived.')
+    moved = {}
+    for kind in kinds or ARCHIVES:
+        live, _ = ARCHIVES[kind]
+        rows = live.objects.filter(_year_filter(kind, year)).order_by('pk').values_list('pk', flat=True)
+        moved[kind] = 0
+        last = None
+        while True:
+            ids = list((rows if last is None else rows.filter(pk__gt=last))[:batch_size])
+            if not ids:
+                break
+            last = ids[-1]
+            with transaction.atomic():
+                moved[kind] += _move(kind, year, ids[0], last)
+            if progress:
+                progress(kind, moved[kind])
+        if moved[kind]:
+            with transaction.atomic():
+                record, _ = ArchivedYear.objects.select_for_update().get_or_create(year=year, kind=kind)
+                record.rows += moved[kind]
+                record.save()
+    # The rows left through raw SQL, so no delete signals ran
+    invalidate_dashboard(*[kind for kind, count in moved.items() if count])
+    return moved
+
+
+def archived_years(kind):
+    return set(ArchivedYear.objects.filter(kind=kind).values_list('year', flat=True))
+
+
+def _sources(kind, year, filters):
+    """Querysets over the live table and, if it may hold matching rows, the archive."""
+    live, archive = ARCHIVES[kind]
+    sources = [live.objects.filter(**filters)]
+    years = archived_years(kind)
+    if year is None and years:
+        sources.append(archive.objects.filter(**filters))
+    elif year in years:
+        sources.append(archive.objects.filter(academic_year=year, **filters))
+    return sources
+
+
+def history(kind, fields, year=None, **filters):
+    """
+    values_list(*fields) of the rows of `kind` matching `filters`, whether
+    live or archived. Pass the academic `year` when known: the archive is
+    only read when that year (or, without a year, any year) is archived.
+    Related lookups work on both tables, e.g. 'exam__subject__name'.
+    The result is a queryset that can be ordered by the given fields.
+    """
+    sources = [source.values_list(*fields).order_by() for source in _sources(kind, year, filters)]
+    if len(sources) == 1:
+        return sources[0]
+    return sources[0].union(*sources[1:], all=True)
+
+
+def history_counts(kind, group_by, year=None, **filters):
+    """Row counts of `kind` per distinct `group_by` values, live and archived. Returns a Counter."""
+    counts = Counter()
+    for source in _sources(kind, year, filters):
+        for row in source.values(*group_by).annotate(rows=Count('pk')).order_by():
+            counts[tuple(row[field] for field in group_by)] += row['rows']
+    return counts
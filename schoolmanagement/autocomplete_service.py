@@ -0,0 +1,294 @@
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict, namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Student, Staff, Guardian
+from .utils import bump_cache_version, get_cache_version
+
+# Roles allowed to look up each kind of person. Guardians may also look up
+# students, but only their own children (see PrefixIndex.lookup).
+ROLE_KINDS = {
+    'admin': ('student', 'staff', 'guardian'),
+    'teacher': ('student', 'staff'),
+    'accountant': ('student', 'guardian'),
+    'librarian': ('student', 'staff'),
+    'guardian': ('student',),
+}
+
+MAX_SUGGESTIONS = 20
+MIN_PREFIX_LENGTH = 2
+
+Suggestion = namedtuple('Suggestion', ['kind', 'object_id', 'label', 'detail'])
+
+
+class Entry:
+    """A person in the index: what to show and which keys lead to them."""
+
+    __slots__ = ('kind', 'object_id', 'label', 'detail', 'keys', 'guardian_ids')
+
+    def __init__(self, kind, object_id, label, detail, keys, guardian_ids=()):
+        self.kind = kind
+        self.object_id = object_id
+        self.label = label
+        self.detail = detail
+        self.keys = keys
+        self.guardian_ids = frozenset(guardian_ids)
+
+    def suggestion(self):
+        return Suggestion(self.kind, self.object_id, self.label, self.detail)
+
+
+def _keys(*values):
+    """Lower-cased lookup keys: each value, and each word of multi-word values."""
+    keys = set()
+    for value in values:
+        value = (value or '').strip().lower()
+        if not value:
+            continue
+        keys.add(value)
+        keys.update(value.split())
+    return keys
+
+
+def _student_entry(student, guardian_ids=()):
+    user = student.user
+    name = user.get_full_name() or user.username
+    detail = ' · '.join(filter(None, [student.admission_number, str(student.current_class or '')]))
+    keys = _keys(user.first_name, user.last_name, name, student.admission_number, student.student_id)
+    return Entry('student', student.pk, name, detail, keys, guardian_ids)
+
+
+def _staff_entry(staff):
+    user = staff.user
+    name = user.get_full_name() or user.username
+    detail = ' · '.join(filter(None, [staff.staff_id, staff.get_role_display()]))
+    keys = _keys(user.first_name, user.last_name, name, staff.staff_id)
+    return Entry('staff', staff.pk, name, detail, keys)
+
+
+def _guardian_entry(guardian):
+    name = f"{guardian.first_name} {guardian.last_name}".strip()
+    detail = ' · '.join(filter(None, [guardian.guardian_number, guardian.phone]))
+    keys = _keys(guardian.first_name, guardian.last_name, name, guardian.guardian_number, guardian.phone)
+    return Entry('guardian', guardian.pk, name, detail, keys)
+
+
+def _student_guardians(student_ids=None):
+    links = Student.guardians.through.objects.all()
+    if student_ids is not None:
+        links = links.filter(student_id__in=student_ids)
+    guardians = defaultdict(set)
+    for student_id, guardian_id in links.values_list('student_id', 'guardian_id'):
+        guardians[student_id].add(guardian_id)
+    return guardians
+
+
+class PrefixIndex:
+    """
+    Sorted (key, kind, id) tuples searched with bisect. Every key of an
+    entry sharing the typed prefix sits in one contiguous run of the list,
+    so a lookup is a binary search plus a short scan.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._entries = {}
+        # Guardian user id -> guardian id, for role filtering without a query
+        self._guardian_users = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Fill the index from the database: one query per kind plus the guardian links."""
+        guardians = _student_guardians()
+        entries = [
+            _student_entry(student, guardians.get(student.pk, ()))
+            for student in Student.objects.select_related('user', 'current_class')
+        ]
+        entries += [_staff_entry(staff) for staff in Staff.objects.select_related('user')]
+        guardian_users = {}
+        for guardian in Guardian.objects.all():
+            entries.append(_guardian_entry(guardian))
+            if guardian.user_id:
+                guardian_users[guardian.user_id] = guardian.pk
+
+        keys = [(key, entry.kind, entry.object_id) for entry in entries for key in entry.keys]
+        keys.sort()
+        with self._lock:
+            self._keys = keys
+            self._entries = {(entry.kind, entry.object_id): entry for entry in entries}
+            self._guardian_users = guardian_users
+
+    def _discard(self, kind, object_id):
+        entry = self._entries.pop((kind, object_id), None)
+        if entry is None:
+            return
+        for key in entry.keys:
+            position = bisect_left(self._keys, (key, kind, object_id))
+            if position < len(self._keys) and self._keys[position] == (key, kind, object_id):
+                del self._keys[position]
+
+    def update(self, entry):
+        with self._lock:
+            self._discard(entry.kind, entry.object_id)
+            self._entries[entry.kind, entry.object_id] = entry
+            for key in entry.keys:
+                insort(self._keys, (key, entry.kind, entry.object_id))
+
+    def remove(self, kind, object_id):
+        with self._lock:
+            self._discard(kind, object_id)
+
+    def set_guardian_user(self, guardian_id, user_id):
+        with self._lock:
+            for stale_user in [user for user, guardian in self._guardian_users.items() if guardian == guardian_id]:
+                del self._guardian_users[stale_user]
+            if user_id:
+                self._guardian_users[user_id] = guardian_id
+
+    def lookup(self, prefix, kinds, guardian_user_id=None, limit=MAX_SUGGESTIONS):
+        """
+        Entries of `kinds` with a key starting with `prefix`. With
+        `guardian_user_id`, only the children of that guardian are returned.
+        The scan holds the lock, as update() edits the key list in place.
+        """
+        prefix = prefix.strip().lower()
+        found = {}
+        with self._lock:
+            guardian_id = None
+            if guardian_user_id is not None:
+                guardian_id = self._guardian_users.get(guardian_user_id)
+                if guardian_id is None:
+                    return []
+
+            keys, entries = self._keys, self._entries
+            position = bisect_left(keys, (prefix,))
+            while position < len(keys) and len(found) < limit:
+                key, kind, object_id = keys[position]
+                if not key.startswith(prefix):
+                    break
+                position += 1
+                if kind not in kinds or (kind, object_id) in found:
+                    continue
+                entry = entries.get((kind, object_id))
+                if entry is None or (guardian_id is not None and guardian_id not in entry.guardian_ids):
+                    continue
+                found[kind, object_id] = entry
+        return [entry.suggestion() for entry in found.values()]
+
+
+_index = PrefixIndex()
+_index_version = None
+# Guards _index_version: it is read and moved on under this lock only
+_version_lock = threading.Lock()
+
+# Each change is logged in the shared cache under the version it bumped to,
+# so other processes replay the people that changed instead of reloading
+CHANGELOG_TIMEOUT = 60 * 60
+# Further behind than this, a full reload is cheaper than replaying
+MAX_REPLAY = 500
+RELOAD = 'reload'
+
+
+def _change_key(version):
+    return f'autocomplete:change:{version}'
+
+
+def _read_person(kind, pk):
+    """Re-read one student, staff member or guardian into the index, or drop them if gone."""
+    if kind == 'student':
+        student = Student.objects.select_related('user', 'current_class').filter(pk=pk).first()
+        entry = student and _student_entry(student, _student_guardians([pk]).get(pk, ()))
+    elif kind == 'staff':
+        staff = Staff.objects.select_related('user').filter(pk=pk).first()
+        entry = staff and _staff_entry(staff)
+    else:
+        guardian = Guardian.objects.filter(pk=pk).first()
+        entry = guardian and _guardian_entry(guardian)
+        _index.set_guardian_user(pk, guardian and guardian.user_id)
+    if entry:
+        _index.update(entry)
+    else:
+        _index.remove(kind, pk)
+
+
+def _catch_up(version):
+    """Bring the index up to `version`: replay the logged changes, or reload. Needs _version_lock."""
+    global _index_version
+    changes = {}
+    if _index_version is not None and 0 < version - _index_version <= MAX_REPLAY:
+        keys = [_change_key(number) for number in range(_index_version + 1, version + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) == len(keys) and RELOAD not in changes.values():
+            for key in keys:
+                _read_person(*changes[key])
+            _index_version = version
+            return
+    _index.load()
+    _index_version = version
+
+
+def get_index():
+    """
+    The process-wide index, loaded on first use. Changes made in another
+    process bump the 'autocomplete' cache version and log what changed,
+    and this process replays them on its next lookup. That needs a cache
+    shared by all processes (see CACHES in settings); with a per-process
+    cache, other processes never see the changes.
+    """
+    if get_cache_version('autocomplete') != _index_version:
+        with _version_lock:
+            version = get_cache_version('autocomplete')
+            if version != _index_version:
+                _catch_up(version)
+    return _index
+
+
+def _log_change(change):
+    """Log a change for other processes, and apply it here when the index is loaded."""
+    global _index_version
+    with _version_lock:
+        version = bump_cache_version('autocomplete')
+        cache.set(_change_key(version), change, CHANGELOG_TIMEOUT)
+        if _index_version is None:
+            return
+        if change == RELOAD:
+            _index_version = None
+            return
+        _read_person(*change)
+        if _index_version == version - 1:
+            _index_version = version
+        # Otherwise other processes changed people too; get_index() replays those
+
+
+def refresh_person(kind, pk):
+    """Re-read one student, staff member or guardian into the index, everywhere, once the change commits."""
+    transaction.on_commit(lambda: _log_change((kind, pk)))
+
+
+def invalidate_autocomplete():
+    """Reload the index everywhere on next use, after changes too wide to apply one by one."""
+    transaction.on_commit(lambda: _log_change(RELOAD))
+
+
+def remove_person(kind, pk):
+    refresh_person(kind, pk)
+
+
+def autocomplete(user, prefix, kinds=None, limit=MAX_SUGGESTIONS):
+    """
+    Suggestions for a typed prefix, limited to what `user`'s role may see.
+    Served from memory; the database is only read when the index (re)loads.
+    """
+    prefix = (prefix or '').strip()
+    allowed = ROLE_KINDS.get(getattr(user, 'role', None), ())
+    if user.is_superuser:
+        allowed = ROLE_KINDS['admin']
+    if kinds:
+        allowed = tuple(kind for kind in allowed if kind in kinds)
+    if len(prefix) < MIN_PREFIX_LENGTH or not allowed:
+        return []
+    guardian_user_id = user.pk if getattr(user, 'role', None) == 'guardian' and not user.is_superuser else None
+    return get_index().lookup(prefix, allowed, guardian_user_id=guardian_user_id, limit=limit)
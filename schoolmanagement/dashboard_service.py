@@ -0,0 +1,323 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .models import Student, Staff, FeePayment, FeeStructure, Exam, ExamResult, Class, Attendance
+from .utils import bump_cache_version, get_cache_versions
+
+# Models each dashboard is built from. Every model has its own version key,
+# so that, say, a fee payment does not invalidate the teacher dashboards.
+# Many-to-many links are named after their through model.
+ROLE_MODELS = {
+    'admin': ('student', 'staff', 'feepayment', 'exam'),
+    'student': ('student', 'studentclass', 'exam', 'examresult', 'feestructure'),
+    'teacher': ('staff', 'class', 'classsubject', 'studentclass', 'subject', 'exam'),
+    'guardian': ('student', 'student_guardians', 'exam', 'examresult', 'attendance', 'feepayment'),
+}
+DASHBOARD_MODELS = tuple(sorted({name for names in ROLE_MODELS.values() for name in names}))
+
+# Entries are invalidated by version bumps; the timeout only clears out
+# entries of old versions that nothing reads any more
+DASHBOARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def invalidate_dashboard(*model_names):
+    """Bump the version of the given models so dashboard entries built on them go stale."""
+    for model_name in model_names:
+        bump_cache_version(f'dashboard:{model_name}')
+
+
+def _cache_key(name, model_names):
+    versions = get_cache_versions([f'dashboard:{model_name}' for model_name in model_names])
+    return f'dashboard:{name}:' + ':'.join(str(version) for version in versions)
+
+
+def dashboard_version(role):
+    """
+    Version string of the data behind a role's dashboard, for keying cached
+    template fragments. It changes whenever one of the role's models changes
+    and at midnight, since "upcoming" lists depend on the date.
+    """
+    versions = get_cache_versions([f'dashboard:{model_name}' for model_name in ROLE_MODELS[role]])
+    return f"{timezone.localdate():%Y%m%d}-" + '-'.join(str(version) for version in versions)
+
+
+def admin_metrics():
+    """
+    Counters and recent exams for the admin dashboard. Served from the cache
+    with no database queries until a Student, Staff, FeePayment or Exam changes.
+    """
+    key = _cache_key('admin', ROLE_MODELS['admin'])
+    metrics = cache.get(key)
+    if metrics is None:
+        metrics = {
+            'total_students': Student.objects.count(),
+            'total_staff': Staff.objects.count(),
+            'pending_fees': FeePayment.objects.filter(status__in=FeePayment.OUTSTANDING_STATUSES).count(),
+            'recent_exams': list(Exam.objects.select_related('class_level', 'subject').order_by('-date')[:5]),
+        }
+        cache.set(key, metrics, DASHBOARD_CACHE_TIMEOUT)
+    return metrics
+
+
+def student_panel(student):
+    """Recent exams with the student's own result, and upcoming fees. Four queries."""
+    class_ids = set(student.enrolled_classes.values_list('id', flat=True))
+    if student.current_class_id:
+        class_ids.add(student.current_class_id)
+
+    recent_exams = list(
+        Exam.objects.filter(class_level__in=class_ids).select_related('subject', 'class_level').order_by('-date')[:5]
+    )
+    results = {
+        result.exam_id: result
+        for result in ExamResult.objects.filter(student=student, exam__in=recent_exams)
+    }
+    for exam in recent_exams:
+        exam.result = results.get(exam.pk)
+
+    upcoming_fees = list(
+        FeeStructure.objects.filter(class_level__in=class_ids, due_date__gte=timezone.localdate()).order_by('due_date')
+    )
+    return {
+        'recent_exams': recent_exams,
+        'upcoming_fees': upcoming_fees,
+    }
+
+
+def teacher_panel(staff):
+    """Classes taught with their subjects and student counts, and upcoming exams. Three queries."""
+    classes = list(
+        Class.objects.filter(classsubject__teacher=staff).distinct()
+        .annotate(student_count=Count('students', distinct=True))
+        .prefetch_related('subjects')
+    )
+    recent_exams = list(
+        Exam.objects.filter(class_level__in=classes, date__gte=timezone.localdate())
+        .select_related('subject', 'class_level').order_by('date')[:5]
+    )
+    return {
+        'classes': classes,
+        'recent_exams': recent_exams,
+    }
+
+
+def guardian_panel(guardian):
+    """
+    Children, upcoming exams and attendance and fee totals across all of a
+    guardian's children. Four queries however many children there are.
+    """
+    students = list(guardian.students.select_related('user', 'current_class'))
+    class_ids = {student.current_class_id for student in students if student.current_class_id}
+
+    upcoming_exams = list(
+        Exam.objects.filter(class_level__in=class_ids, date__gte=timezone.localdate())
+        .select_related('subject', 'class_level').order_by('date')
+    )
+
+    attendance = Attendance.objects.filter(student__in=students).aggregate(
+        total=Count('id'),
+        present=Count('id', filter=Q(status__in=['present', 'late'])),
+    )
+    fees = FeePayment.objects.filter(student__in=students).aggregate(
+        due=Sum(F('amount_due') + F('fine_amount')),
+        paid=Sum('amount_paid'),
+    )
+    due, paid = fees['due'] or Decimal('0'), fees['paid'] or Decimal('0')
+
+    return {
+        'students': students,
+        'upcoming_exams': upcoming_exams,
+        'attendance_summary': {
+            'total': attendance['total'],
+            'present': attendance['present'],
+            'percentage': round(attendance['present'] * 100 / attendance['total']) if attendance['total'] else 0,
+        },
+        'fee_summary': {
+            'total_due': due,
+            'total_paid': paid,
+            'percentage_paid': min(round(paid * 100 / due), 100) if due else 0,
+        },
+    }
+
+
+def data_last_modified(students):
+    """
+    Latest updated_at across the attendance, exam results and fee payments
+    of a Student queryset, or None if there are none. One aggregate query
+    that reads only the (student, updated_at) indexes.
+    """
+    def latest(model):
+        return Subquery(
+            model.objects.filter(student=OuterRef('pk')).order_by('-updated_at').values('updated_at')[:1]
+        )
+
+    row = students.order_by().aggregate(
+        attendance=Max(latest(Attendance)),
+        results=Max(latest(ExamResult)),
+        fees=Max(latest(FeePayment)),
+    )
+    stamps = [stamp for stamp in row.values() if stamp]
+    return max(stamps) if stamps else None
+
+
+def _exam_data(exam):
+    return {
+        'id': exam.pk,
+        'name': exam.name,
+        'subject': exam.subject.name,
+        'class': str(exam.class_level),
+        'date': exam.date,
+    }
+
+
+def result_data(result):
+    """An exam result as JSON-serialisable data; needs exam__subject and exam__class_level loaded."""
+    return dict(_exam_data(result.exam), marks=result.marks_obtained, total_marks=result.exam.total_marks,
+                grade=result.grade)
+
+
+def guardian_dashboard_data(guardian):
+    """guardian_panel() as plain JSON-serialisable data."""
+    panel = guardian_panel(guardian)
+    return {
+        'students': [
+            {
+                'id': student.pk,
+                'name': student.user.get_full_name(),
+                'admission_number': student.admission_number,
+                'class': str(student.current_class) if student.current_class else None,
+            }
+            for student in panel['students']
+        ],
+        'upcoming_exams': [_exam_data(exam) for exam in panel['upcoming_exams']],
+        'attendance_summary': panel['attendance_summary'],
+        'fee_summary': panel['fee_summary'],
+    }
+
+
+def student_summary(student):
+    """Attendance counts, recent results and fee balance of one student. Three queries."""
+    attendance = Attendance.objects.filter(student=student).aggregate(
+        total=Count('id'),
+        **{status: Count('id', filter=Q(status=status)) for status, _ in Attendance.ATTENDANCE_STATUS}
+    )
+    results = ExamResult.objects.filter(student=student).select_related(
+        'exam__subject', 'exam__class_level'
+    ).order_by('-exam__date')[:5]
+    fees = FeePayment.objects.filter(student=student).aggregate(
+        due=Sum(F('amount_due') + F('fine_amount')),
+        paid=Sum('amount_paid'),
+        outstanding=Count('id', filter=Q(status__in=FeePayment.OUTSTANDING_STATUSES)),
+    )
+    due, paid = fees['due'] or Decimal('0'), fees['paid'] or Decimal('0')
+
+    return {
+        'student': {
+            'id': student.pk,
+            'name': student.user.get_full_name(),
+            'admission_number': student.admission_number,
+            'class': str(student.current_class) if student.current_class else None,
+        },
+        'attendance': attendance,
+        'recent_results': [result_data(result) for result in results],
+        'fees': {
+            'total_due': due,
+            'total_paid': paid,
+            'balance': due - paid,
+            'outstanding': fees['outstanding'],
+        },
+    }
+
+
+# Rows of recent attendance and results shown per child on the guardian dashboard
+CHILD_RECENT_LIMIT = 5
+
+
+class ChildSummary:
+    """Everything the guardian dashboard shows for one child."""
+
+    def __init__(self, student):
+        self.student = student
+        self.recent_attendance = []
+        self.attendance_summary = {'total': 0, 'present': 0, 'absent': 0, 'late': 0, 'excused': 0, 'percentage': 0}
+        self.upcoming_exams = []
+        self.recent_results = []
+        self.fee_dues = []
+        self.balance = Decimal('0')
+
+
+def _latest_per_student(queryset, order_by, limit):
+    """
+    The `limit` most recent rows of each student in `queryset`, grouped by
+    student id. Uses ROW_NUMBER() where the database supports window
+    functions, otherwise trims the full fetch in memory.
+    """
+    grouped = defaultdict(list)
+    if connection.features.supports_over_clause:
+        queryset = queryset.annotate(
+            row_number=Window(RowNumber(), partition_by=F('student_id'), order_by=[F(field).desc() for field in order_by])
+        ).filter(row_number__lte=limit).order_by('student_id', 'row_number')
+    else:
+        queryset = queryset.order_by(*[f'-{field}' for field in order_by])
+    for row in queryset:
+        if len(grouped[row.student_id]) < limit:
+            grouped[row.student_id].append(row)
+    return grouped
+
+
+def guardian_children_summaries(guardian):
+    """
+    Build a ChildSummary for each of a guardian's children.
+
+    Attendance, exams, results and fee dues of all the children are fetched
+    together, with one query each, and grouped per child in memory, so the
+    number of queries is the same for one child or ten.
+    """
+    students = list(guardian.students.select_related('user', 'current_class').order_by('user__first_name'))
+    summaries = {student.pk: ChildSummary(student) for student in students}
+    if not summaries:
+        return []
+
+    recent_attendance = _latest_per_student(
+        Attendance.objects.filter(student__in=summaries).select_related('class_level'), ['date'], CHILD_RECENT_LIMIT
+    )
+    attendance_counts = Attendance.objects.filter(student__in=summaries).order_by().values('student_id').annotate(
+        total=Count('id'),
+        **{status: Count('id', filter=Q(status=status)) for status, _ in Attendance.ATTENDANCE_STATUS}
+    )
+    recent_results = _latest_per_student(
+        ExamResult.objects.filter(student__in=summaries).select_related('exam__subject'),
+        ['exam__date', 'exam__start_time'], CHILD_RECENT_LIMIT,
+    )
+
+    exams_by_class = defaultdict(list)
+    class_ids = {student.current_class_id for student in students if student.current_class_id}
+    for exam in Exam.objects.filter(
+        class_level__in=class_ids, date__gte=timezone.localdate()
+    ).select_related('subject').order_by('date', 'start_time'):
+        exams_by_class[exam.class_level_id].append(exam)
+
+    fee_dues = FeePayment.objects.filter(
+        student__in=summaries, status__in=FeePayment.OUTSTANDING_STATUSES
+    ).select_related('fee_structure').order_by('fee_structure__due_date')
+
+    for student_id, summary in summaries.items():
+        summary.recent_attendance = recent_attendance.get(student_id, [])
+        summary.recent_results = recent_results.get(student_id, [])
+        summary.upcoming_exams = exams_by_class.get(summary.student.current_class_id, [])
+    for counts in attendance_counts:
+        summary = summaries[counts.pop('student_id')]
+        attended = counts['present'] + counts['late']
+        counts['percentage'] = round(attended * 100 / counts['total']) if counts['total'] else 0
+        summary.attendance_summary = counts
+    for fee in fee_dues:
+        summary = summaries[fee.student_id]
+        summary.fee_dues.append(fee)
+        summary.balance += (fee.amount_due or 0) + fee.fine_amount - fee.amount_paid
+    return list(summaries.values())
@@ -3,6 +3,8 @@ from django.http import HttpResponseForbidden
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 
+from .routers import pinned_to_primary, use_replica
+
 def role_required(allowed_roles=None):
     """
     Decorator to check if the user has the required role.
@@ -15,7 +17,7 @@ def role_required(allowed_roles=None):
         @wraps(view_func)
         def _wrapped_view(request, *args, **kwargs):
             if not request.user.is_authenticated:
-                return redirect(reverse_lazy('login'))
+                return redirect(reverse_lazy('schoolmanagement:login'))
                 
             # Superusers have access to everything
             if request.user.is_superuser:
@@ -38,7 +40,7 @@ def guardian_required(view_func):
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
         if not request.user.is_authenticated:
-            return redirect(reverse_lazy('login'))
+            return redirect(reverse_lazy('schoolmanagement:login'))
             
         # Superusers and staff have access
         if request.user.is_superuser or request.user.is_staff:
@@ -76,3 +78,16 @@ def student_required(view_func):
 def guardian_only(view_func):
     """Decorator to check if the user is a guardian."""
     return role_required(['guardian'])(view_func)
+
+def replica_reads(view_func):
+    """
+    Decorator for read-only views (reports, exports, history pages) to read
+    from the replica database. Write requests, and sessions that wrote
+    since the replica was last refreshed, still read from the primary.
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        enabled = request.method in ('GET', 'HEAD') and not pinned_to_primary(request)
+        with use_replica(enabled):
+            return view_func(request, *args, **kwargs)
+    return _wrapped_view
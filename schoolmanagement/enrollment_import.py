@@ -0,0 +1,345 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .autocomplete_service import invalidate_autocomplete
+from .dashboard_service import invalidate_dashboard
+from .marks_import import read_rows
+from .models import Class, Guardian, Student, StudentClass
+from .search_service import index_objects
+from .utils import generate_random_password, next_sequence_number
+
+User = get_user_model()
+
+COLUMNS = {
+    'first_name': ('first_name', 'first_names', 'given_name'),
+    'last_name': ('last_name', 'surname', 'family_name'),
+    'email': ('email', 'email_address'),
+    'username': ('username',),
+    'password': ('password',),
+    'class': ('class', 'class_name', 'form', 'grade'),
+    'gender': ('gender', 'sex'),
+    'date_of_birth': ('date_of_birth', 'dob', 'birth_date'),
+    'phone': ('phone', 'phone_number'),
+    'address': ('address',),
+    'guardians': ('guardians', 'guardian', 'guardian_email', 'guardian_number'),
+}
+REQUIRED_COLUMNS = ('first_name', 'last_name', 'email')
+
+GENDERS = {'m': 'M', 'male': 'M', 'f': 'F', 'female': 'F', 'o': 'O', 'other': 'O'}
+
+BATCH_SIZE = 500
+
+# Below this many passwords, starting worker processes costs more than it saves
+POOL_THRESHOLD = 32
+
+
+class StudentImportError(Exception):
+    """Raised when an upload cannot be read at all (as opposed to a bad row)."""
+
+
+class MissingPasswordsError(StudentImportError):
+    """Raised when rows have no password and generated ones could not be handed out."""
+
+
+class StudentImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.errors = []
+        # (admission number, email, password) of accounts given a generated password
+        self.credentials = []
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+    @property
+    def has_errors(self):
+        return bool(self.errors)
+
+
+def _init_worker():
+    # Worker processes that are spawned rather than forked start without Django set up
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    make_password() for each password, spread over a pool of processes.
+    The hashers are deliberately slow and hold the GIL, so threads would not help.
+    """
+    passwords = list(passwords)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) < POOL_THRESHOLD:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def allocate_admission_numbers(count, year=None):
+    """
+    Reserve a block of `count` consecutive ADM-YYYY-NNNN admission numbers
+    with one query. Call inside the transaction that saves the students.
+    """
+    year = year or datetime.now().year
+    prefix = f'ADM-{year}-'
+    start = next_sequence_number(Student.objects.all(), 'admission_number', prefix)
+    return [f'{prefix}{number:04d}' for number in range(start, start + count)]
+
+
+def _columns(header):
+    titles = [title.strip().lower().replace(' ', '_') for title in header]
+    columns = {}
+    for field, names in COLUMNS.items():
+        for index, title in enumerate(titles):
+            if title in names:
+                columns[field] = index
+                break
+    return columns
+
+
+def _class_lookup():
+    classes = {}
+    for class_level in Class.objects.all():
+        classes[str(class_level).lower()] = class_level
+        classes.setdefault(class_level.name.lower(), class_level)
+        if class_level.stream:
+            classes[f'{class_level.name} {class_level.stream}'.lower()] = class_level
+    return classes
+
+
+def _guardian_lookup(references):
+    """Guardians by lower-cased email and guardian number, for the references used in the file."""
+    references = {reference.lower() for reference in references}
+    guardians = {}
+    if references:
+        for guardian_id, email, number in Guardian.objects.values_list('id', 'email', 'guardian_number'):
+            for key in (email, number):
+                if key and key.lower() in references:
+                    guardians[key.lower()] = guardian_id
+    return guardians
+
+
+def _taken(field, values):
+    """Values of a unique User field that are already in use."""
+    taken = set()
+    values = list(values)
+    for start in range(0, len(values), BATCH_SIZE):
+        lookup = {f'{field}__in': values[start:start + BATCH_SIZE]}
+        taken.update(value.lower() for value in User.objects.filter(**lookup).values_list(field, flat=True))
+    return taken
+
+
+def _validate(rows, columns):
+    """
+    Check every row in one pass against prefetched classes, guardians and
+    existing accounts. Returns (valid rows as dicts, [(row number, message)]).
+    """
+    def cell(row, field):
+        index = columns.get(field)
+        return row[index].strip() if index is not None and index < len(row) else ''
+
+    parsed = []
+    for row_number, row in rows:
+        parsed.append((row_number, {field: cell(row, field) for field in COLUMNS}))
+
+    classes = _class_lookup()
+    guardians = _guardian_lookup(
+        reference.strip() for _, data in parsed for reference in data['guardians'].split(';') if reference.strip()
+    )
+    taken_emails = _taken('email', {data['email'] for _, data in parsed if data['email']})
+    taken_usernames = _taken('username', {data['username'] or data['email'] for _, data in parsed if data['email']})
+
+    valid, errors = [], []
+    seen_emails, seen_usernames = set(), set()
+    for row_number, data in parsed:
+        missing = [field for field in REQUIRED_COLUMNS if not data[field]]
+        if missing:
+            errors.append((row_number, f"Missing {', '.join(missing)}."))
+            continue
+        try:
+            validate_email(data['email'])
+        except ValidationError:
+            errors.append((row_number, f"'{data['email']}' is not a valid email address."))
+            continue
+        email = User.objects.normalize_email(data['email'])
+        username = data['username'] or email
+        if email.lower() in taken_emails or email.lower() in seen_emails:
+            errors.append((row_number, f"Email '{email}' is already in use."))
+            continue
+        if username.lower() in taken_usernames or username.lower() in seen_usernames:
+            errors.append((row_number, f"Username '{username}' is already in use."))
+            continue
+
+        class_level = None
+        if data['class']:
+            class_level = classes.get(data['class'].lower())
+            if class_level is None:
+                errors.append((row_number, f"Class '{data['class']}' does not exist."))
+                continue
+        gender = None
+        if data['gender']:
+            gender = GENDERS.get(data['gender'].lower())
+            if gender is None:
+                errors.append((row_number, f"Gender '{data['gender']}' should be M, F or O."))
+                continue
+        date_of_birth = None
+        if data['date_of_birth']:
+            try:
+                date_of_birth = parse_date(data['date_of_birth'])
+            except ValueError:
+                pass
+            if date_of_birth is None:
+                errors.append((row_number, f"Date of birth '{data['date_of_birth']}' should be YYYY-MM-DD."))
+                continue
+        guardian_ids = []
+        unknown = []
+        for reference in filter(None, (part.strip() for part in data['guardians'].split(';'))):
+            if reference.lower() in guardians:
+                guardian_ids.append(guardians[reference.lower()])
+            else:
+                unknown.append(reference)
+        if unknown:
+            errors.append((row_number, f"Guardian '{unknown[0]}' does not exist."))
+            continue
+
+        seen_emails.add(email.lower())
+        seen_usernames.add(username.lower())
+        valid.append({
+            'row_number': row_number,
+            'first_name': data['first_name'],
+            'last_name': data['last_name'],
+            'email': email,
+            'username': username,
+            'password': data['password'],
+            'class_level': class_level,
+            'gender': gender,
+            'date_of_birth': date_of_birth,
+            'phone': data['phone'],
+            'address': data['address'],
+            'guardian_ids': set(guardian_ids),
+        })
+    return valid, errors
+
+
+def _save(valid, hashed, admission_date):
+    """Create the users, students, class enrolments and guardian links in bulk."""
+    admission_numbers = allocate_admission_numbers(len(valid))
+    users = User.objects.bulk_create([
+        User(
+            username=data['username'],
+            email=data['email'],
+            first_name=data['first_name'],
+            last_name=data['last_name'],
+            phone=data['phone'],
+            role='student',
+            password=password,
+            date_joined=timezone.now(),
+        )
+        for data, password in zip(valid, hashed)
+    ], batch_size=BATCH_SIZE)
+    if any(user.pk is None for user in users):
+        # Backends that cannot return ids from a bulk insert
+        ids = dict(User.objects.filter(email__in=[user.email for user in users]).values_list('email', 'id'))
+        for user in users:
+            user.pk = ids[user.email]
+
+    students = Student.objects.bulk_create([
+        Student(
+            user=user,
+            student_id=admission_number,
+            admission_number=admission_number,
+            date_of_birth=data['date_of_birth'],
+            gender=data['gender'],
+            phone_number=data['phone'],
+            address=data['address'],
+            admission_date=admission_date,
+            current_class=data['class_level'],
+        )
+        for data, user, admission_number in zip(valid, users, admission_numbers)
+    ], batch_size=BATCH_SIZE)
+    if any(student.pk is None for student in students):
+        ids = dict(Student.objects.filter(admission_number__in=admission_numbers).values_list('admission_number', 'id'))
+        for student in students:
+            student.pk = ids[student.admission_number]
+
+    StudentClass.objects.bulk_create([
+        StudentClass(student=student, class_level=data['class_level'], admission_date=admission_date)
+        for data, student in zip(valid, students)
+        if data['class_level']
+    ], batch_size=BATCH_SIZE)
+    Student.guardians.through.objects.bulk_create([
+        Student.guardians.through(student_id=student.pk, guardian_id=guardian_id)
+        for data, student in zip(valid, students)
+        for guardian_id in data['guardian_ids']
+    ], batch_size=BATCH_SIZE)
+    return students
+
+
+def import_students(uploaded_file, admission_date=None, workers=None, generate_passwords=True):
+    """
+    Register the students listed in an uploaded CSV or XLSX file.
+
+    The file needs first_name, last_name and email columns, and may have
+    username, password, class, gender, date_of_birth, phone, address and
+    guardians (emails or guardian numbers separated by ';') columns. Every
+    row is validated first and invalid rows are reported and skipped.
+    Passwords are hashed across a process pool; rows without one get a
+    generated password, returned in result.credentials. Without
+    `generate_passwords` such rows fail the whole import instead, before
+    anything is saved. Admission numbers are allocated as one block and all
+    records are written with bulk inserts in a single transaction.
+    Returns a StudentImportResult.
+    """
+    result = StudentImportResult()
+    rows = read_rows(uploaded_file)
+
+    header = next(rows, None)
+    if not header:
+        raise StudentImportError('The file is empty.')
+    columns = _columns(header)
+    missing = [field for field in REQUIRED_COLUMNS if field not in columns]
+    if missing:
+        raise StudentImportError(f"The first row must name the {', '.join(missing)} column(s).")
+
+    rows = ((row_number, row) for row_number, row in enumerate(rows, start=2) if any(cell.strip() for cell in row))
+    valid, errors = _validate(rows, columns)
+    for row_number, message in errors:
+        result.add_error(row_number, message)
+    if not valid:
+        return result
+
+    without_password = [data['row_number'] for data in valid if not data['password']]
+    if without_password and not generate_passwords:
+        raise MissingPasswordsError(
+            f"{len(without_password)} row(s) have no password (first: row {without_password[0]}); "
+            "nothing was imported."
+        )
+    generated = {}
+    for index, data in enumerate(valid):
+        if not data['password']:
+            data['password'] = generated[index] = generate_random_password()
+    hashed = hash_passwords([data['password'] for data in valid], workers=workers)
+
+    with transaction.atomic():
+        students = _save(valid, hashed, admission_date or timezone.localdate())
+        # bulk_create sends no signals, so refresh the derived data here
+        index_objects('student', [student.pk for student in students])
+        invalidate_autocomplete()
+        invalidate_dashboard('student', 'studentclass', 'student_guardians')
+
+    result.imported = len(students)
+    result.credentials = [
+        (students[index].admission_number, valid[index]['email'], password)
+        for index, password in generated.items()
+    ]
+    return result
@@ -0,0 +1,111 @@
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery, Sum, DecimalField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Student, FeeStructure, FeePayment, FeeDiscount, FeeFine
+from .dashboard_service import invalidate_dashboard
+
+
+def generate_term_invoices(fee_structure, created_by=None):
+    """
+    Create one pending FeePayment obligation for every student currently in
+    the fee structure's class.
+
+    The rows are produced by a single INSERT ... SELECT, so the cost does not
+    depend on the number of students. Active FeeDiscounts (those whose period
+    covers the fee due date) are summed per student in the same statement and
+    subtracted from the amount due. Students that already have an obligation
+    for this fee structure are skipped, which makes the operation safe to re-run.
+
+    Returns the number of obligations created.
+    """
+    qn = connection.ops.quote_name
+    payment_table = qn(FeePayment._meta.db_table)
+    student_table = qn(Student._meta.db_table)
+    structure_table = qn(FeeStructure._meta.db_table)
+    discount_table = qn(FeeDiscount._meta.db_table)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+
+    discount = (
+        f"COALESCE((SELECT SUM(d.amount) FROM {discount_table} d "
+        f"WHERE d.student_id = s.id AND d.start_date <= fs.due_date "
+        f"AND d.end_date >= fs.due_date), 0)"
+    )
+    sql = (
+        f"INSERT INTO {payment_table} "
+        f"(student_id, fee_structure_id, amount_due, discount_amount, fine_amount, amount_paid, payment_date, "
+        f"payment_method, status, notes, created_by_id, created_at, updated_at) "
+        f"SELECT s.id, fs.id, "
+        f"CASE WHEN {discount} > fs.amount THEN 0 ELSE fs.amount - {discount} END, "
+        f"{discount}, 0, 0, NULL, 'cash', 'pending', '', %s, %s, %s "
+        f"FROM {student_table} s "
+        f"INNER JOIN {structure_table} fs ON fs.id = %s "
+        f"WHERE s.current_class_id = fs.class_level_id "
+        f"AND NOT EXISTS (SELECT 1 FROM {payment_table} p "
+        f"WHERE p.student_id = s.id AND p.fee_structure_id = fs.id)"
+    )
+    params = [created_by.pk if created_by else None, now, now, fee_structure.pk]
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            created = cursor.rowcount
+    if created:
+        # Raw SQL sends no signals, so invalidate the dashboard counters here
+        invalidate_dashboard('feepayment')
+    return created
+
+
+def generate_invoices_for_term(year, term, created_by=None):
+    """
+    Invoice every active fee structure of a term.
+    Returns a dict mapping each FeeStructure to the number of obligations created.
+    """
+    structures = FeeStructure.objects.filter(year=year, term=term, is_active=True)
+    return {
+        structure: generate_term_invoices(structure, created_by=created_by)
+        for structure in structures
+    }
+
+
+def sweep_overdue_payments(today=None):
+    """
+    Mark every outstanding obligation whose fee fell due before `today` as
+    overdue, adding the FeeFines raised against that fee for the student.
+
+    Everything happens in one UPDATE statement: the fines are summed by a
+    correlated subquery and only rows whose status or fine total would change
+    are touched, so re-running the sweep on an unchanged day updates nothing.
+
+    Returns the number of rows changed.
+    """
+    today = today or timezone.now().date()
+    money = DecimalField(max_digits=10, decimal_places=2)
+    fines = Coalesce(
+        Subquery(
+            FeeFine.objects.filter(
+                student=OuterRef('student'),
+                fee_structure=OuterRef('fee_structure'),
+                due_date__lte=today,
+            ).values('student').annotate(total=Sum('amount')).values('total')[:1],
+            output_field=money,
+        ),
+        Decimal('0'),
+        output_field=money,
+    )
+
+    updated = (
+        FeePayment.objects
+        .filter(
+            status__in=FeePayment.OUTSTANDING_STATUSES,
+            fee_structure__due_date__lt=today,
+        )
+        .alias(fines=fines)
+        .filter(amount_paid__lt=F('amount_due') + F('fines'))
+        .exclude(status='overdue', fine_amount=F('fines'))
+        .update(status='overdue', fine_amount=fines, updated_at=timezone.now())
+    )
+    if updated:
+        invalidate_dashboard('feepayment')
+    return updated
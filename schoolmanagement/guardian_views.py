@@ -1,10 +1,24 @@
+import hashlib
+
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import JsonResponse, HttpResponseForbidden
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Q
-from .models import Student, Guardian, Attendance, ExamResult, FeePayment
-from .decorators import guardian_required, role_required
+from django.db.models import Count, Q, Sum
+from .models import Student, Guardian, Attendance, ExamResult, FeePayment, Subject
+from .decorators import guardian_required, replica_reads, role_required
+from .pagination import InvalidCursor, KeysetPaginator
+from .schedule_service import get_schedule
+from .dashboard_service import (
+    dashboard_version, data_last_modified, guardian_dashboard_data, guardian_children_summaries, student_summary,
+    result_data,
+)
+
+ATTENDANCE_PAGE_SIZE = 20
+RESULTS_PAGE_SIZE = 10
 
 @login_required
 def guardian_dashboard(request):
@@ -13,34 +27,15 @@ def guardian_dashboard(request):
     """
     if not hasattr(request.user, 'guardian_profile'):
         messages.error(request, "You don't have guardian permissions.")
-        return redirect('dashboard')
+        return redirect('schoolmanagement:dashboard')
     
     guardian = request.user.guardian_profile
-    students = guardian.get_associated_students()
-    
-    # Get recent attendance for all students
-    recent_attendance = Attendance.objects.filter(
-        student__in=students
-    ).select_related('student').order_by('-date')[:10]
-    
-    # Get upcoming exams for all students
-    upcoming_exams = ExamResult.objects.filter(
-        student__in=students,
-        exam__date__gte=timezone.now().date()
-    ).select_related('exam', 'student').order_by('exam__date')[:5]
-    
-    # Get fee dues
-    fee_dues = FeePayment.objects.filter(
-        student__in=students,
-        status__in=['pending', 'partial']
-    ).select_related('student', 'fee_structure').order_by('due_date')[:5]
+    children = guardian_children_summaries(guardian)
     
     context = {
         'guardian': guardian,
-        'students': students,
-        'recent_attendance': recent_attendance,
-        'upcoming_exams': upcoming_exams,
-        'fee_dues': fee_dues,
+        'children': children,
+        'total_balance': sum(child.balance for child in children),
     }
     
     return render(request, 'guardian/dashboard.html', context)
@@ -57,7 +52,7 @@ def student_detail(request, student_id):
     # Verify that the guardian has access to this student
     if not guardian.students.filter(id=student_id).exists():
         messages.error(request, "You don't have permission to view this student's information.")
-        return redirect('guardian_dashboard')
+        return redirect('schoolmanagement:guardian_dashboard')
     
     # Get attendance summary
     attendance_summary = {
@@ -91,7 +86,7 @@ def student_detail(request, student_id):
     # Get class schedule
     current_class = student.current_class
     if current_class:
-        schedule = current_class.timetable_set.all().order_by('day', 'start_time')
+        schedule = get_schedule('class', current_class.pk)
     else:
         schedule = []
     
@@ -105,10 +100,29 @@ def student_detail(request, student_id):
         'current_class': current_class
     }
     
-    return render(request, 'guardian/student_detail.html', context)
+    return render(request, 'students/student_detail.html', context)
+
+def _attendance_records(request, student):
+    """The student's attendance with the month/status filters of the request applied."""
+    records = Attendance.objects.filter(student=student)
+    month = request.GET.get('month')
+    status = request.GET.get('status')
+    if month:
+        records = records.filter(date__month=month)
+    if status:
+        records = records.filter(status=status)
+    return records, month, status
+
+
+def _attendance_paginator(records):
+    return KeysetPaginator(
+        records.select_related('recorded_by'), ('-date', '-id'), ATTENDANCE_PAGE_SIZE, 'attendance_history'
+    )
+
 
 @login_required
 @guardian_required
+@replica_reads
 def attendance_history(request, student_id):
     """
     View to show attendance history for a student.
@@ -119,36 +133,22 @@ def attendance_history(request, student_id):
     # Verify that the guardian has access to this student
     if not guardian.students.filter(id=student_id).exists():
         messages.error(request, "You don't have permission to view this student's attendance.")
-        return redirect('guardian_dashboard')
+        return redirect('schoolmanagement:guardian_dashboard')
     
-    # Get all attendance records for the student
-    attendance_records = Attendance.objects.filter(
-        student=student
-    ).select_related('recorded_by').order_by('-date')
+    attendance_records, month, status = _attendance_records(request, student)
     
-    # Apply filters if provided
-    month = request.GET.get('month')
-    status = request.GET.get('status')
-    
-    if month:
-        attendance_records = attendance_records.filter(date__month=month)
-    if status:
-        attendance_records = attendance_records.filter(status=status)
-    
-    # Calculate attendance statistics
-    total_days = attendance_records.count()
-    present_days = attendance_records.filter(status='present').count()
-    absent_days = attendance_records.filter(status='absent').count()
-    late_days = attendance_records.filter(status='late').count()
-    excused_days = attendance_records.filter(status='excused').count()
+    # Calculate attendance statistics in one query
+    stats = attendance_records.aggregate(
+        total=Count('id'),
+        **{key: Count('id', filter=Q(status=key)) for key, _ in Attendance.ATTENDANCE_STATUS}
+    )
+    total_days = stats['total']
     
     # Calculate attendance percentage
-    attendance_percentage = (present_days / total_days * 100) if total_days > 0 else 0
+    attendance_percentage = (stats['present'] / total_days * 100) if total_days > 0 else 0
     
-    # Pagination
-    paginator = Paginator(attendance_records, 20)  # Show 20 records per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination: deep pages cost the same as the first
+    page_obj = _attendance_paginator(attendance_records).get_page(request.GET.get('cursor'))
     
     context = {
         'student': student,
@@ -157,18 +157,39 @@ def attendance_history(request, student_id):
         'selected_status': status,
         'attendance_stats': {
             'total': total_days,
-            'present': present_days,
-            'absent': absent_days,
-            'late': late_days,
-            'excused': excused_days,
+            'present': stats['present'],
+            'absent': stats['absent'],
+            'late': stats['late'],
+            'excused': stats['excused'],
             'percentage': attendance_percentage
         }
     }
     
     return render(request, 'guardian/attendance_history.html', context)
 
+
+def _exam_results(request, student):
+    """The student's results with the subject/exam type filters of the request applied."""
+    results = ExamResult.objects.filter(student=student)
+    subject = request.GET.get('subject')
+    exam_type = request.GET.get('exam_type')
+    if subject:
+        results = results.filter(exam__subject__id=subject)
+    if exam_type:
+        results = results.filter(exam__exam_type=exam_type)
+    return results, subject, exam_type
+
+
+def _results_paginator(results):
+    return KeysetPaginator(
+        results.select_related('exam', 'exam__subject', 'exam__class_level'),
+        ('-exam__date', '-id'), RESULTS_PAGE_SIZE, 'exam_results',
+    )
+
+
 @login_required
 @guardian_required
+@replica_reads
 def exam_results(request, student_id):
     """
     View to show exam results for a student.
@@ -179,49 +200,30 @@ def exam_results(request, student_id):
     # Verify that the guardian has access to this student
     if not guardian.students.filter(id=student_id).exists():
         messages.error(request, "You don't have permission to view this student's exam results.")
-        return redirect('guardian_dashboard')
-    
-    # Get all exam results for the student
-    exam_results = ExamResult.objects.filter(
-        student=student
-    ).select_related('exam', 'exam__subject').order_by('-exam__date')
+        return redirect('schoolmanagement:guardian_dashboard')
     
-    # Apply filters if provided
-    subject = request.GET.get('subject')
-    exam_type = request.GET.get('exam_type')
+    exam_results, subject, exam_type = _exam_results(request, student)
     
-    if subject:
-        exam_results = exam_results.filter(exam__subject__id=subject)
-    if exam_type:
-        exam_results = exam_results.filter(exam__exam_type=exam_type)
-    
-    # Calculate performance metrics
-    total_exams = exam_results.count()
-    total_marks = sum(result.marks_obtained for result in exam_results)
-    total_max_marks = sum(result.exam.max_marks for result in exam_results)
+    # Calculate performance metrics and the grade distribution in one query
+    grades = ('A', 'B', 'C', 'D', 'E', 'F')
+    performance = exam_results.aggregate(
+        total_exams=Count('id'),
+        total_marks=Sum('marks_obtained'),
+        total_max_marks=Sum('exam__total_marks'),
+        **{f'grade_{grade}': Count('id', filter=Q(grade=grade)) for grade in grades}
+    )
+    total_max_marks = performance['total_max_marks'] or 0
     
     # Calculate average score
-    avg_score = (total_marks / total_max_marks * 100) if total_max_marks > 0 else 0
-    
-    # Calculate grade distribution
-    grade_counts = {
-        'A': exam_results.filter(grade='A').count(),
-        'B': exam_results.filter(grade='B').count(),
-        'C': exam_results.filter(grade='C').count(),
-        'D': exam_results.filter(grade='D').count(),
-        'E': exam_results.filter(grade='E').count(),
-        'F': exam_results.filter(grade='F').count()
-    }
+    avg_score = (performance['total_marks'] / total_max_marks * 100) if total_max_marks > 0 else 0
     
     # Get distinct subjects for filter
     subjects = Subject.objects.filter(
-        exam__examresult__in=exam_results
+        exams__results__in=exam_results
     ).distinct()
     
-    # Pagination
-    paginator = Paginator(exam_results, 10)  # Show 10 records per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination: deep pages cost the same as the first
+    page_obj = _results_paginator(exam_results).get_page(request.GET.get('cursor'))
     
     context = {
         'student': student,
@@ -230,10 +232,98 @@ def exam_results(request, student_id):
         'selected_subject': subject,
         'selected_exam_type': exam_type,
         'performance': {
-            'total_exams': total_exams,
+            'total_exams': performance['total_exams'],
             'avg_score': avg_score,
-            'grade_counts': grade_counts
+            'grade_counts': {grade: performance[f'grade_{grade}'] for grade in grades}
         }
     }
     
     return render(request, 'guardian/exam_results.html', context)
+
+
+def _history_json(request, paginator, serialize):
+    """One keyset page as JSON, with the cursors of the pages around it."""
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse({
+        'results': [serialize(row) for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@login_required
+@guardian_required
+@replica_reads
+def attendance_history_api(request, student_id):
+    """
+    JSON pages of a student's attendance, newest first. Follow the `next`
+    cursor with ?cursor= for older records.
+    """
+    student = get_object_or_404(Student, id=student_id)
+    records, _, _ = _attendance_records(request, student)
+    return _history_json(request, _attendance_paginator(records), lambda record: {
+        'id': record.pk,
+        'date': record.date,
+        'status': record.status,
+        'remarks': record.remarks,
+    })
+
+
+@login_required
+@guardian_required
+@replica_reads
+def exam_results_api(request, student_id):
+    """
+    JSON pages of a student's exam results, newest exam first. Follow the
+    `next` cursor with ?cursor= for older results.
+    """
+    student = get_object_or_404(Student, id=student_id)
+    results, _, _ = _exam_results(request, student)
+    return _history_json(request, _results_paginator(results), result_data)
+
+
+def _conditional_json(request, students, build_payload):
+    """
+    JSON response validated by ETag and Last-Modified.
+
+    Both come from one aggregate over the students' attendance, results and
+    fee payments, plus the dashboard cache version (which also moves on
+    deletions). When the client's copy is current a 304 is returned without
+    calling `build_payload`.
+    """
+    last_modified = data_last_modified(students)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    version = f"{last_modified.isoformat() if last_modified else ''}:{dashboard_version('guardian')}"
+    etag = quote_etag(hashlib.md5(version.encode()).hexdigest())
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = JsonResponse(build_payload())
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@login_required
+def dashboard_api(request):
+    """
+    JSON version of the guardian dashboard for polling clients.
+    """
+    guardian = getattr(request.user, 'guardian_profile', None)
+    if guardian is None:
+        return HttpResponseForbidden("Only guardians can access this page.")
+    
+    return _conditional_json(request, guardian.students.all(), lambda: guardian_dashboard_data(guardian))
+
+@login_required
+@guardian_required
+def student_summary_api(request, student_id):
+    """
+    JSON summary of one student's attendance, results and fees.
+    """
+    student = get_object_or_404(Student.objects.select_related('user', 'current_class'), id=student_id)
+    return _conditional_json(request, Student.objects.filter(id=student_id), lambda: student_summary(student))
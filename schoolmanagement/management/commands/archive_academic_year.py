@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from schoolmanagement.archive_service import ARCHIVES, BATCH_SIZE, ArchiveError, archive_year
+
+
+class Command(BaseCommand):
+    help = ('Move a closed academic year of attendance, exam results and settled fee payments '
+            'from the live tables to the archive tables')
+
+    def add_arguments(self, parser):
+        parser.add_argument('year', type=int, help='Academic year to archive')
+        parser.add_argument('--kind', action='append', choices=sorted(ARCHIVES),
+                            help='Archive only this kind of record (may be repeated)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows moved per transaction')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        def progress(kind, moved):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{kind}: {moved} row(s) moved')
+
+        try:
+            moved = archive_year(options['year'], options['kind'], options['batch_size'], progress)
+        except ArchiveError as error:
+            raise CommandError(error)
+        for kind, count in moved.items():
+            self.stdout.write(f'{kind}: {count} row(s) archived')
+        self.stdout.write(self.style.SUCCESS(f"Academic year {options['year']} archived"))
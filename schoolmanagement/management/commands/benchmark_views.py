@@ -0,0 +1,76 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment
+
+from schoolmanagement.view_benchmarks import (
+    BenchmarkUsers, build_scenarios, compare, load_baseline, measure, save_baseline, throwaway_database,
+)
+
+
+class Command(BaseCommand):
+    help = ('Time the hot views through the test client and fail when latency or query counts '
+            'regress against the recorded baseline. Run against a generate_synthetic_data database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--baseline', default=os.path.join(settings.BASE_DIR, 'benchmark_baseline.json'),
+                            help='Baseline JSON file to compare with (and write with --save)')
+        parser.add_argument('--save', action='store_true', help='Record this run as the new baseline')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per view')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per view first')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed p95 slowdown over the baseline, as a fraction')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request')
+        parser.add_argument('--only', action='append', help='Run only this view (may be repeated)')
+        parser.add_argument('--password', default='password', help='Password of the student used for the login views')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+        # Lets the test client through ALLOWED_HOSTS and keeps outgoing email in memory
+        setup_test_environment(debug=settings.DEBUG)
+
+        # The login and attendance scenarios write, so run them on a copy
+        with throwaway_database():
+            scenarios, measurements = self.run_scenarios(options)
+
+        if options['save']:
+            save_baseline(options['baseline'], measurements, options['iterations'])
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+
+        baseline = None if options['save'] else load_baseline(options['baseline'])
+        if baseline is None and not options['save']:
+            self.stdout.write(self.style.WARNING(
+                f"No baseline at {options['baseline']}; checking query budgets only. Record one with --save."
+            ))
+        problems = compare(measurements, baseline, scenarios, options['tolerance'])
+        if problems:
+            for name, problem in problems:
+                self.stderr.write(self.style.ERROR(f'{name}: {problem}'))
+            raise CommandError(f'{len(problems)} benchmark regression(s)')
+        self.stdout.write(self.style.SUCCESS('All views within budget'))
+
+    def run_scenarios(self, options):
+        users = BenchmarkUsers()
+        for role in ('admin', 'teacher', 'student', 'guardian'):
+            if users.user(role) is None:
+                self.stderr.write(f'No {role} user to benchmark with; skipping the {role} views')
+        scenarios = build_scenarios(users, options['password'])
+        if options['only']:
+            scenarios = [scenario for scenario in scenarios if scenario.name in options['only']]
+        if not scenarios:
+            raise CommandError('Nothing to benchmark')
+
+        self.stdout.write(f"{'view':32} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8}")
+        measurements = []
+        for scenario in scenarios:
+            measurement = measure(scenario, users, options['iterations'], options['warmup'], options['cold'])
+            measurements.append(measurement)
+            if measurement.p50_ms is None:
+                self.stdout.write(self.style.ERROR(f'{scenario.name:32} returned {measurement.status}'))
+            else:
+                self.stdout.write(
+                    f'{scenario.name:32} {measurement.p50_ms:9.1f} {measurement.p95_ms:9.1f} {measurement.queries:8d}'
+                )
+        return scenarios, measurements
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from schoolmanagement.models import Class
+from schoolmanagement.ranking_service import compute_rankings
+
+
+class Command(BaseCommand):
+    help = 'Compute and store exam, subject and term positions for every class level'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, required=True, help='Academic year')
+        parser.add_argument('--term', type=int, required=True, choices=[1, 2, 3], help='Term')
+
+    def handle(self, *args, **options):
+        total = 0
+        # Rankings are computed per class level, covering all of its streams at once
+        seen = set()
+        for class_level in Class.objects.all():
+            if class_level.name in seen:
+                continue
+            seen.add(class_level.name)
+            count = compute_rankings(class_level, options['year'], options['term'])
+            total += count
+            self.stdout.write(f'{class_level.name}: {count} ranking(s)')
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully stored {total} ranking(s)'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from schoolmanagement.report_cards import ReportCardRun
+
+
+class Command(BaseCommand):
+    help = 'Generate term report card PDFs for one class or the whole school (resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, required=True, help='Academic year')
+        parser.add_argument('--term', type=int, required=True, choices=[1, 2, 3], help='Term')
+        parser.add_argument('--class', type=int, action='append', dest='classes',
+                            help='Only generate for this Class id (may be repeated)')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Number of worker processes (defaults to the CPU count)')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore the progress of a previous run and start over')
+        parser.add_argument('--force', action='store_true', help='Re-render cards even if unchanged')
+
+    def handle(self, *args, **options):
+        run = ReportCardRun(options['year'], options['term'], options['classes'])
+        if options['restart']:
+            run.reset()
+
+        def progress(class_level, result):
+            self.stdout.write(f"{class_level}: {result['rendered']} rendered, {result['cached']} unchanged")
+
+        totals = run.run(workers=options['workers'], force=options['force'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Report cards: {totals['rendered']} rendered, {totals['cached']} unchanged, "
+            f"{totals['skipped_classes']} class(es) already completed"
+        ))
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from schoolmanagement.synthetic_data import SchoolSize, SyntheticDataError, generate_school
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic school (classes, staff, timetable, students, guardians, attendance, exams and fees)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed, sizes and year give the same data')
+        parser.add_argument('--classes', type=int, default=50, help='Number of class streams, spread over Forms 1-4')
+        parser.add_argument('--students', type=int, default=20000, help='Number of students')
+        parser.add_argument('--guardians', type=int, default=30000, help='Number of guardians')
+        parser.add_argument('--exams-per-term', type=int, default=2, help='Exam sittings per subject each term')
+        parser.add_argument('--year', type=int, help='Academic year to generate (default: this year)')
+        parser.add_argument('--until', help='Last day of attendance, results and payments (YYYY-MM-DD, default today)')
+        parser.add_argument('--password', default='password',
+                            help='Password of every generated account, including the superuser admin@school<seed>.example.org')
+
+    def handle(self, *args, **options):
+        until = None
+        if options['until']:
+            until = parse_date(options['until'])
+            if until is None:
+                raise CommandError('--until must be YYYY-MM-DD')
+        if options['classes'] < 1 or options['students'] < 0 or options['guardians'] < 0:
+            raise CommandError('--classes must be at least 1 and --students and --guardians cannot be negative')
+
+        size = SchoolSize(
+            classes=options['classes'],
+            students=options['students'],
+            guardians=options['guardians'],
+            exams_per_term=options['exams_per_term'],
+        )
+        started = time.perf_counter()
+        try:
+            counts = generate_school(
+                size,
+                seed=options['seed'],
+                year=options['year'],
+                until=until,
+                password=options['password'],
+                log=self.stdout.write,
+            )
+        except SyntheticDataError as e:
+            raise CommandError(str(e))
+
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {total} row(s) in {time.perf_counter() - started:.1f}s. '
+            f'Run compute_rankings and rebuild_performance_trends to fill in the derived tables.'
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from schoolmanagement.models import FeeStructure
+from schoolmanagement.fee_service import generate_term_invoices
+
+
+class Command(BaseCommand):
+    help = 'Create pending fee obligations for every student in the classes of the given fee structures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Academic year of the fee structures to invoice')
+        parser.add_argument('--term', type=int, choices=[1, 2, 3], help='Term of the fee structures to invoice')
+        parser.add_argument('--structure', type=int, action='append', dest='structures',
+                            help='Invoice only this FeeStructure id (may be repeated)')
+
+    def handle(self, *args, **options):
+        structures = FeeStructure.objects.filter(is_active=True).select_related('class_level')
+        if options['structures']:
+            structures = structures.filter(pk__in=options['structures'])
+        elif options['year'] and options['term']:
+            structures = structures.filter(year=options['year'], term=options['term'])
+        else:
+            raise CommandError('Provide --year and --term, or one or more --structure ids')
+
+        total = 0
+        for structure in structures:
+            created = generate_term_invoices(structure)
+            total += created
+            self.stdout.write(f'{structure}: {created} obligation(s) created')
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully created {total} fee obligation(s)'))
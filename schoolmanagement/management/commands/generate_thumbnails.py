@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from schoolmanagement.thumbnail_service import backfill, thumbnail_format
+
+
+class Command(BaseCommand):
+    help = 'Make the cached thumbnails of profile pictures uploaded before thumbnails existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Remake the thumbnails of every picture')
+        parser.add_argument('--workers', type=int, help='Threads to resize with (default: THUMBNAIL_WORKERS)')
+
+    def handle(self, *args, **options):
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+
+        missing = []
+
+        def progress(source, thumbnail):
+            if thumbnail is None:
+                missing.append(source)
+                self.stderr.write(f'{source}: file not found')
+
+        started = time.monotonic()
+        count = backfill(force=options['force'], workers=options['workers'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Made {thumbnail_format()} thumbnails of {count - len(missing)} picture(s) '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
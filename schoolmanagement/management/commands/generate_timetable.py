@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from schoolmanagement.models import Class
+from schoolmanagement.timetable_generator import TimetableGenerationError, generate_timetable, save_timetable
+
+
+class Command(BaseCommand):
+    help = 'Generate a clash-free weekly timetable from the class subject assignments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class', dest='class_ids', type=int, action='append',
+                            help='Only regenerate this class id (repeatable); other classes are kept as they are')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for tie-breaking')
+        parser.add_argument('--dry-run', action='store_true', help='Solve without saving the result')
+
+    def handle(self, *args, **options):
+        classes = None
+        if options['class_ids']:
+            classes = list(Class.objects.filter(pk__in=options['class_ids']))
+            if not classes:
+                raise CommandError('No matching classes found')
+
+        started = time.monotonic()
+        try:
+            entries, unplaced = generate_timetable(classes, seed=options['seed'])
+        except TimetableGenerationError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.monotonic() - started
+
+        if unplaced:
+            for class_subject in unplaced:
+                self.stdout.write(f'Could not place a lesson of {class_subject.subject} for {class_subject.class_level}')
+            raise CommandError(f'{len(unplaced)} lesson(s) could not be placed; try another --seed or fewer lessons')
+
+        self.stdout.write(f'Placed {len(entries)} lessons in {elapsed:.1f}s')
+        if options['dry_run']:
+            return
+        try:
+            saved = save_timetable(entries)
+        except TimetableGenerationError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'Saved {saved} timetable entries'))
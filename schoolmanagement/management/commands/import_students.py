@@ -0,0 +1,62 @@
+import csv
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from schoolmanagement.enrollment_import import import_students, MissingPasswordsError, StudentImportError
+
+
+class Command(BaseCommand):
+    help = 'Register the students listed in a CSV or Excel file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='CSV or XLSX file with first_name, last_name and email columns')
+        parser.add_argument('--admission-date', help='Admission date of the intake (YYYY-MM-DD, default today)')
+        parser.add_argument('--workers', type=int, help='Processes used to hash passwords (default: CPU count)')
+        parser.add_argument('--credentials',
+                            help='Write generated passwords to this CSV file; required when rows have no password')
+
+    def handle(self, *args, **options):
+        admission_date = None
+        if options['admission_date']:
+            admission_date = parse_date(options['admission_date'])
+            if admission_date is None:
+                raise CommandError('--admission-date must be YYYY-MM-DD')
+
+        # Opened before importing, so generated passwords always have somewhere to go
+        credentials = None
+        if options['credentials']:
+            try:
+                credentials = open(options['credentials'], 'w', newline='')
+            except OSError as e:
+                raise CommandError(f'Cannot write --credentials: {e}')
+        started = time.perf_counter()
+        try:
+            with open(options['file'], 'rb') as uploaded_file:
+                result = import_students(
+                    uploaded_file, admission_date=admission_date, workers=options['workers'],
+                    generate_passwords=credentials is not None,
+                )
+        except (OSError, StudentImportError) as e:
+            if credentials:
+                credentials.close()
+                os.remove(options['credentials'])
+            if isinstance(e, MissingPasswordsError):
+                raise CommandError(f'{e} Pass --credentials FILE to give them generated passwords.')
+            raise CommandError(str(e))
+
+        for row_number, message in result.errors:
+            self.stderr.write(f'Row {row_number}: {message}')
+        if credentials:
+            with credentials:
+                writer = csv.writer(credentials)
+                writer.writerow(['admission_number', 'email', 'password'])
+                writer.writerows(result.credentials)
+            self.stdout.write(f"{len(result.credentials)} generated password(s) written to {options['credentials']}")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Registered {result.imported} student(s) in {elapsed:.1f}s, {len(result.errors)} row(s) skipped'
+        ))
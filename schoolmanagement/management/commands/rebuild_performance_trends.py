@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from schoolmanagement.models import Student
+from schoolmanagement.trend_service import update_trends
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the performance trend table for every student (normally kept current by signals)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Students processed per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        student_ids = list(Student.objects.order_by('pk').values_list('pk', flat=True))
+        total = 0
+        for start in range(0, len(student_ids), batch_size):
+            total += update_trends(student_ids[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully rebuilt {total} trend row(s) for {len(student_ids)} student(s)'
+        ))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from schoolmanagement.routers import REPLICA_ALIAS, refresh_replica, replica_configured
+
+
+class Command(BaseCommand):
+    help = 'Copy the SQLite primary database to the read replica with the online backup API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--step-pages', type=int, default=-1,
+                            help='Pages copied per step, letting writers in between (default: all at once)')
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError(f"Add a '{REPLICA_ALIAS}' entry to DATABASES first")
+
+        started = time.monotonic()
+        try:
+            path = refresh_replica(options['step_pages'])
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(f'Replica {path} refreshed in {time.monotonic() - started:.1f}s'))
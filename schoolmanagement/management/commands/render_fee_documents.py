@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from schoolmanagement.pdf_service import (
+    render_documents, receipt_jobs, statement_jobs, receipt_payments, statement_guardians
+)
+from schoolmanagement.routers import replica_configured, use_replica
+
+
+class Command(BaseCommand):
+    help = 'Render fee receipts and guardian fee statements to PDF in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--receipts', action='store_true', help='Render fee receipts only')
+        parser.add_argument('--statements', action='store_true', help='Render guardian statements only')
+        parser.add_argument('--year', type=int, help='Limit to fee structures of this year')
+        parser.add_argument('--term', type=int, choices=[1, 2, 3], help='Limit to fee structures of this term')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Number of worker processes (defaults to the CPU count)')
+        parser.add_argument('--force', action='store_true', help='Re-render documents even if unchanged')
+        parser.add_argument('--replica', action='store_true',
+                            help='Read the fee data from the replica database (see refresh_replica)')
+
+    def handle(self, *args, **options):
+        if options['replica'] and not replica_configured():
+            raise CommandError("--replica needs a 'replica' entry in DATABASES")
+        with use_replica(options['replica']):
+            self.render(options)
+
+    def render(self, options):
+        both = not options['receipts'] and not options['statements']
+        year, term = options['year'], options['term']
+
+        if options['receipts'] or both:
+            result = render_documents(
+                receipt_jobs(receipt_payments(year, term)),
+                workers=options['workers'], force=options['force'],
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Receipts: {result['rendered']} rendered, {result['cached']} unchanged"
+            ))
+
+        if options['statements'] or both:
+            result = render_documents(
+                statement_jobs(statement_guardians(year, term)),
+                workers=options['workers'], force=options['force'],
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Statements: {result['rendered']} rendered, {result['cached']} unchanged"
+            ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Show or change the journal mode of an SQLite database. The mode is stored in the file, '
+            'so switching a deployment to WAL is done once, with no other connections open.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('mode', nargs='?', choices=['wal', 'delete'],
+                            help='Journal mode to switch to (default: show the current one)')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError(f"'{options['database']}' is not an SQLite database")
+
+        with connection.cursor() as cursor:
+            if options['mode']:
+                cursor.execute(f"PRAGMA journal_mode = {options['mode']}")
+            else:
+                cursor.execute('PRAGMA journal_mode')
+            mode = cursor.fetchone()[0]
+        if options['mode'] and mode != options['mode']:
+            raise CommandError(f"{connection.settings_dict['NAME']} is still in {mode} mode; "
+                               'stop anything else using it and try again')
+        self.stdout.write(f"{connection.settings_dict['NAME']}: journal_mode={mode}")
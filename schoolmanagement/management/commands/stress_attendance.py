@@ -0,0 +1,52 @@
+import glob
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from schoolmanagement.sqlite_stress import UNTUNED, AttendanceStress, class_registers, copy_database, tuned_profile
+
+
+class Command(BaseCommand):
+    help = ('Stress a copy of the SQLite database with concurrent attendance writers and history readers, '
+            'comparing SQLite defaults with the SQLITE_PRAGMAS and CONN_MAX_AGE settings')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=16, help='Threads saving class registers')
+        parser.add_argument('--readers', type=int, default=4, help='Threads reading attendance history')
+        parser.add_argument('--registers', type=int, default=20, help='Registers saved by each writer')
+        parser.add_argument('--classes', type=int, default=8, help='Number of (largest) classes to mark')
+        parser.add_argument('--profile', choices=['both', 'untuned', 'tuned'], default='both',
+                            help='Which settings to run with')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['writers'] < 1 or options['registers'] < 1:
+            raise CommandError('--writers and --registers must be at least 1')
+        try:
+            registers = class_registers(options['classes'])
+            path = copy_database()
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(f'Stressing a copy of the database at {path}')
+
+        stress = AttendanceStress(
+            path, registers, writers=options['writers'], readers=options['readers'],
+            registers_per_writer=options['registers'], seed=options['seed'],
+        )
+        profiles = [('untuned', UNTUNED), ('tuned', tuned_profile())]
+        if options['profile'] != 'both':
+            profiles = [profile for profile in profiles if profile[0] == options['profile']]
+        try:
+            self.stdout.write(
+                f"{'profile':10} {'seconds':>8} {'commits':>8} {'locked':>7} {'reads':>7} "
+                f"{'read err':>8} {'p50 ms':>8} {'p95 ms':>8} {'conns':>6}"
+            )
+            for label, profile in profiles:
+                result = stress.run(label, profile)
+                self.stdout.write(
+                    f'{result.label:10} {result.seconds:8.2f} {result.commits:8d} {result.locked:7d} '
+                    f'{result.reads:7d} {result.read_errors:8d} {result.p50_ms or 0:8.1f} '
+                    f'{result.p95_ms or 0:8.1f} {result.connections:6d}'
+                )
+        finally:
+            for leftover in glob.glob(f'{glob.escape(path)}*'):
+                os.remove(leftover)
@@ -0,0 +1,15 @@
+import datetime
+from django.core.management.base import BaseCommand
+from schoolmanagement.fee_service import sweep_overdue_payments
+
+
+class Command(BaseCommand):
+    help = 'Mark outstanding fee obligations past their due date as overdue and apply fines (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=datetime.date.fromisoformat,
+                            help='Sweep as of this date (YYYY-MM-DD) instead of today')
+
+    def handle(self, *args, **options):
+        changed = sweep_overdue_payments(today=options['date'])
+        self.stdout.write(self.style.SUCCESS(f'Marked {changed} fee obligation(s) overdue'))
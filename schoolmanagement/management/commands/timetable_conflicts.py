@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from schoolmanagement.timetable_conflicts import school_conflict_report
+
+
+class Command(BaseCommand):
+    help = 'Report teacher, room and class double-bookings across the whole timetable'
+
+    def handle(self, *args, **options):
+        conflicts = school_conflict_report()
+        for conflict in conflicts:
+            self.stdout.write(f'[{conflict.KINDS[conflict.kind]}] {conflict.message}')
+
+        if conflicts:
+            raise CommandError(f'Found {len(conflicts)} timetable conflict(s)')
+        self.stdout.write(self.style.SUCCESS('No timetable conflicts found'))
@@ -0,0 +1,159 @@
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .dashboard_service import invalidate_dashboard
+from .models import Student, ExamResult
+from .ranking_service import invalidate_rankings
+from .statistics_service import invalidate_statistics
+from .trend_service import update_trends
+
+# Check if openpyxl is installed for .xlsx uploads
+try:
+    from openpyxl import load_workbook
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+ADMISSION_COLUMNS = ('admission_number', 'admission_no', 'admission', 'adm_no')
+MARKS_COLUMNS = ('marks', 'marks_obtained', 'score')
+REMARKS_COLUMNS = ('remarks', 'comment', 'comments')
+
+
+class MarksImportError(Exception):
+    """Raised when an upload cannot be read at all (as opposed to a bad row)."""
+
+
+class MarksImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.errors = []
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+    @property
+    def has_errors(self):
+        return bool(self.errors)
+
+
+def _csv_rows(uploaded_file):
+    text = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    finally:
+        text.detach()
+
+
+def _xlsx_rows(uploaded_file):
+    if not OPENPYXL_AVAILABLE:
+        raise MarksImportError('Excel uploads require openpyxl; upload a CSV file instead.')
+    workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield ['' if value is None else str(value) for value in row]
+    finally:
+        workbook.close()
+
+
+def read_rows(uploaded_file):
+    """Stream the rows of an uploaded CSV or XLSX file as lists of strings."""
+    name = getattr(uploaded_file, 'name', '') or ''
+    if name.lower().endswith(('.xlsx', '.xlsm')):
+        return _xlsx_rows(uploaded_file)
+    return _csv_rows(uploaded_file)
+
+
+def _column(header, names):
+    for index, title in enumerate(header):
+        if title.strip().lower().replace(' ', '_') in names:
+            return index
+    return None
+
+
+def import_marks(exam, uploaded_file):
+    """
+    Validate and upsert the marks in an uploaded file for `exam`.
+
+    The file needs an admission number column and a marks column, and may have
+    a remarks column. Rows are streamed and validated in one pass against a
+    prefetched admission number lookup for the exam's class, so no query is
+    made per row. Invalid rows are reported with their row number and skipped;
+    the valid rows are written with a single bulk upsert.
+    Returns a MarksImportResult.
+    """
+    total_marks = Decimal(str(exam.total_marks))
+    if not total_marks.is_finite() or total_marks <= 0:
+        raise MarksImportError(
+            f"The total marks of {exam} must be more than 0; correct the exam before importing marks."
+        )
+
+    result = MarksImportResult()
+    rows = read_rows(uploaded_file)
+
+    header = next(rows, None)
+    if not header:
+        raise MarksImportError('The file is empty.')
+    admission_col = _column(header, ADMISSION_COLUMNS)
+    marks_col = _column(header, MARKS_COLUMNS)
+    remarks_col = _column(header, REMARKS_COLUMNS)
+    if admission_col is None or marks_col is None:
+        raise MarksImportError('The first row must name an admission number column and a marks column.')
+
+    students = {
+        admission_number.upper(): student_id
+        for student_id, admission_number in Student.objects.filter(
+            current_class=exam.class_level, admission_number__isnull=False
+        ).values_list('id', 'admission_number')
+    }
+
+    results = {}
+    for row_number, row in enumerate(rows, start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        admission_number = row[admission_col].strip() if admission_col < len(row) else ''
+        raw_marks = row[marks_col].strip() if marks_col < len(row) else ''
+
+        student_id = students.get(admission_number.upper())
+        if student_id is None:
+            result.add_error(row_number, f"Admission number '{admission_number}' is not in {exam.class_level}.")
+            continue
+        if student_id in results:
+            result.add_error(row_number, f"Admission number '{admission_number}' appears more than once.")
+            continue
+        try:
+            marks = Decimal(raw_marks)
+        except InvalidOperation:
+            result.add_error(row_number, f"Marks '{raw_marks}' is not a number.")
+            continue
+        if not marks.is_finite() or marks < 0 or marks > total_marks:
+            result.add_error(row_number, f"Marks {raw_marks} must be between 0 and {total_marks}.")
+            continue
+
+        marks = marks.quantize(Decimal('0.01'))
+        results[student_id] = ExamResult(
+            exam=exam,
+            student_id=student_id,
+            marks_obtained=marks,
+            grade=ExamResult.calculate_grade(marks / total_marks * 100),
+            remarks=row[remarks_col].strip() if remarks_col is not None and remarks_col < len(row) else '',
+        )
+
+    if results:
+        with transaction.atomic():
+            ExamResult.objects.bulk_create(
+                results.values(),
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['exam', 'student'],
+                update_fields=['marks_obtained', 'grade', 'remarks', 'updated_at'],
+            )
+            # bulk_create sends no signals, so invalidate the derived data here
+            invalidate_statistics([exam.pk])
+            invalidate_rankings(exam)
+            invalidate_dashboard('examresult')
+            update_trends(results.keys())
+        result.imported = len(results)
+    return result
@@ -2,6 +2,8 @@ from django.http import HttpResponseForbidden
 from django.urls import reverse_lazy, resolve
 from django.shortcuts import redirect
 
+from .routers import pin_to_primary
+
 class RoleBasedAccessMiddleware:
     """
     Middleware to handle role-based access control.
@@ -39,6 +41,7 @@ class RoleBasedAccessMiddleware:
             # Student URLs
             'student_dashboard': ['student'],
             'register_student': ['admin'],
+            'import_students': ['admin'],
             'student_profile': ['student'],
             'edit_student': ['admin', 'teacher'],
             'delete_student': ['admin'],
@@ -49,6 +52,10 @@ class RoleBasedAccessMiddleware:
             'edit_guardian': ['admin', 'teacher', 'guardian'],
             'delete_guardian': ['admin'],
             'view_guardian': ['admin', 'teacher', 'guardian'],
+            'guardian_dashboard_api': ['guardian'],
+            'guardian_student_summary_api': ['admin', 'guardian'],
+            'attendance_history_api': ['admin', 'guardian'],
+            'exam_results_api': ['admin', 'guardian'],
             
             # Class URLs
             'class_list': ['admin', 'teacher'],
@@ -57,12 +64,26 @@ class RoleBasedAccessMiddleware:
             'edit_class': ['admin'],
             'delete_class': ['admin'],
             
+            # Timetable URLs
+            'timetable_conflicts': ['admin'],
+            'teacher_schedule': ['admin', 'teacher'],
+            'class_schedule': ['admin', 'teacher', 'student', 'guardian'],
+            'schedule_calendar': ['admin', 'teacher', 'student', 'guardian'],
+            
+            # Search URLs
+            'search': ['admin', 'teacher', 'accountant', 'librarian'],
+            'search_api': ['admin', 'teacher', 'accountant', 'librarian'],
+            'autocomplete_api': ['admin', 'teacher', 'accountant', 'librarian', 'guardian'],
+            
             # Attendance URLs
             'mark_attendance': ['admin', 'teacher'],
             'view_attendance': ['admin', 'teacher', 'guardian'],
             
             # Exam URLs
             'create_exam': ['admin', 'teacher'],
+            'exam_list': ['admin', 'teacher'],
+            'exam_detail': ['admin', 'teacher'],
+            'import_marks': ['admin', 'teacher'],
             'edit_exam': ['admin', 'teacher'],
             'delete_exam': ['admin'],
             'exam_results': ['admin', 'teacher', 'guardian'],
@@ -116,3 +137,21 @@ class RoleBasedAccessMiddleware:
                         return HttpResponseForbidden("You can only view your own students' data.")
         
         return self.get_response(request)
+
+
+class ReplicaPinningMiddleware:
+    """
+    Keeps a session reading from the primary database after it writes, so
+    pages using the replica (see decorators.replica_reads) show the
+    session its own changes. Goes after SessionMiddleware.
+    """
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in self.SAFE_METHODS:
+            pin_to_primary(request)
+        return response
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.1 on 2026-10-19 07:56
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_amount_due(apps, schema_editor):
+    FeePayment = apps.get_model('schoolmanagement', 'FeePayment')
+    FeeStructure = apps.get_model('schoolmanagement', 'FeeStructure')
+    FeePayment.objects.filter(amount_due__isnull=True).update(
+        amount_due=Subquery(
+            FeeStructure.objects.filter(pk=OuterRef('fee_structure_id')).values('amount')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schoolmanagement', '0002_guardian_guardian_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feepayment',
+            name='amount_due',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Amount owed after discounts', max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='feepayment',
+            name='discount_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='feepayment',
+            name='amount_paid',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='feepayment',
+            name='payment_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='feepayment',
+            index=models.Index(fields=['status'], name='schoolmanag_status_7f192d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feepayment',
+            index=models.Index(fields=['fee_structure', 'student'], name='schoolmanag_fee_str_83f6fb_idx'),
+        ),
+        migrations.RunPython(backfill_amount_due, migrations.RunPython.noop),
+    ]
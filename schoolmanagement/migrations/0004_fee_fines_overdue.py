@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-19 07:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schoolmanagement', '0003_feepayment_obligations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feefine',
+            name='fee_structure',
+            field=models.ForeignKey(blank=True, help_text='Fee whose obligation this fine is added to once overdue', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='fines', to='schoolmanagement.feestructure'),
+        ),
+        migrations.AddField(
+            model_name='feepayment',
+            name='fine_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+    ]
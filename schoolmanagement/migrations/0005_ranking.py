@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schoolmanagement', '0004_fee_fines_overdue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ranking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('exam', 'Exam'), ('term', 'Term')], max_length=4)),
+                ('year', models.PositiveIntegerField()),
+                ('term', models.PositiveSmallIntegerField(choices=[(1, 'Term 1'), (2, 'Term 2'), (3, 'Term 3')])),
+                ('score', models.DecimalField(decimal_places=2, help_text='Percentage score', max_digits=6)),
+                ('stream_position', models.PositiveIntegerField(help_text='Position within the class stream')),
+                ('level_position', models.PositiveIntegerField(help_text='Position across all streams of the class level')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('class_level', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='schoolmanagement.class')),
+                ('exam', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='schoolmanagement.exam')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='schoolmanagement.student')),
+                ('subject', models.ForeignKey(blank=True, help_text='Empty for the overall (all subjects) ranking', null=True, on_delete=django.db.models.deletion.CASCADE, to='schoolmanagement.subject')),
+            ],
+            options={
+                'ordering': ['stream_position'],
+                'indexes': [models.Index(fields=['class_level', 'year', 'term', 'scope'], name='schoolmanag_class_l_8352d2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schoolmanagement', '0005_ranking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('result_count', models.PositiveIntegerField(default=0)),
+                ('pass_count', models.PositiveIntegerField(default=0)),
+                ('pass_rate', models.FloatField(default=0, help_text='Percentage of results at or above the passing marks')),
+                ('mean', models.FloatField(blank=True, null=True)),
+                ('median', models.FloatField(blank=True, null=True)),
+                ('std_dev', models.FloatField(blank=True, null=True)),
+                ('minimum', models.FloatField(blank=True, null=True)),
+                ('maximum', models.FloatField(blank=True, null=True)),
+                ('q1', models.FloatField(blank=True, help_text='25th percentile', null=True)),
+                ('q3', models.FloatField(blank=True, help_text='75th percentile', null=True)),
+                ('p90', models.FloatField(blank=True, help_text='90th percentile', null=True)),
+                ('histogram', models.JSONField(default=list, help_text='Result counts per 10% band of total marks')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='schoolmanagement.exam')),
+            ],
+            options={
+                'verbose_name_plural': 'Exam statistics',
+            },
+        ),
+    ]
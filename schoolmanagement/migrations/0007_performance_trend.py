@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schoolmanagement', '0006_exam_statistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerformanceTrend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exam_count', models.PositiveIntegerField(default=0)),
+                ('last_scores', models.JSONField(default=list, help_text='Most recent percentage scores, oldest first')),
+                ('rolling_average', models.FloatField(default=0, help_text='Average of the most recent scores')),
+                ('slope', models.FloatField(default=0, help_text='Change in percentage points per exam over the recent scores')),
+                ('term_year', models.PositiveIntegerField(blank=True, null=True)),
+                ('term', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Term 1'), (2, 'Term 2'), (3, 'Term 3')], null=True)),
+                ('term_average', models.FloatField(blank=True, help_text='Average in the latest term with results', null=True)),
+                ('previous_term_average', models.FloatField(blank=True, null=True)),
+                ('term_change', models.FloatField(blank=True, help_text='term_average minus previous_term_average', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performance_trends', to='schoolmanagement.student')),
+                ('subject', models.ForeignKey(blank=True, help_text='Empty for the trend across all subjects', null=True, on_delete=django.db.models.deletion.CASCADE, to='schoolmanagement.subject')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term_year', 'term', 'term_change'], name='schoolmanag_term_ye_5fcefc_idx'), models.Index(fields=['student', 'subject'], name='schoolmanag_student_d80440_idx')],
+            },
+        ),
+    ]
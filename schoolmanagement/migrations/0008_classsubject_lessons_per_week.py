@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schoolmanagement', '0007_performance_trend'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classsubject',
+            name='lessons_per_week',
+            field=models.PositiveSmallIntegerField(default=4, help_text='Periods per week used by the timetable generator'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schoolmanagement', '0008_classsubject_lessons_per_week'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', 'updated_at'], name='schoolmanag_student_4c0e80_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examresult',
+            index=models.Index(fields=['student', 'updated_at'], name='schoolmanag_student_269233_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feepayment',
+            index=models.Index(fields=['student', 'updated_at'], name='schoolmanag_student_e1fe67_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, OperationalError
+
+SEARCH_TABLE = 'schoolmanagement_search'
+
+
+def create_search_table(apps, schema_editor):
+    # FTS5 is SQLite-only; other databases fall back to LIKE searches
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "name, identifiers, contact, extra, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+        )
+    except OperationalError:
+        # SQLite built without FTS5
+        pass
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schoolmanagement', '0009_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
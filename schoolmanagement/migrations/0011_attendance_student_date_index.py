@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schoolmanagement', '0010_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', 'date'], name='schoolmanag_student_fe8781_idx'),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schoolmanagement', '0011_attendance_student_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField()),
+                ('kind', models.CharField(max_length=20)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('year', 'kind')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedAttendance',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('academic_year', models.PositiveIntegerField()),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('present', 'Present'), ('absent', 'Absent'), ('late', 'Late'), ('excused', 'Excused')], max_length=10)),
+                ('remarks', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('class_level', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='schoolmanagement.class')),
+                ('recorded_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='schoolmanagement.student')),
+            ],
+            options={
+                'verbose_name_plural': 'Archived attendance',
+                'indexes': [models.Index(fields=['student', 'academic_year'], name='schoolmanag_student_ec21f9_idx'), models.Index(fields=['class_level', 'date'], name='schoolmanag_class_l_96bbda_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedExamResult',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('academic_year', models.PositiveIntegerField()),
+                ('marks_obtained', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('grade', models.CharField(blank=True, max_length=2)),
+                ('remarks', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='schoolmanagement.exam')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='schoolmanagement.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', 'academic_year'], name='schoolmanag_student_2a3831_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedFeePayment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('academic_year', models.PositiveIntegerField()),
+                ('amount_due', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('fine_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('amount_paid', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('payment_date', models.DateField(blank=True, null=True)),
+                ('payment_method', models.CharField(choices=[('cash', 'Cash'), ('mpesa', 'M-Pesa'), ('bank_transfer', 'Bank Transfer'), ('cheque', 'Cheque'), ('other', 'Other')], max_length=20)),
+                ('transaction_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('receipt_number', models.CharField(blank=True, db_index=True, max_length=50, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('partial', 'Partially Paid'), ('paid', 'Fully Paid'), ('overdue', 'Overdue'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('fee_structure', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='schoolmanagement.feestructure')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='schoolmanagement.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', 'academic_year'], name='schoolmanag_student_5b0256_idx')],
+            },
+        ),
+    ]
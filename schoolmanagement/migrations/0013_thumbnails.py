@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-19 08:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schoolmanagement', '0012_archive_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Thumbnail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Storage name of the original image', max_length=255, unique=True)),
+                ('digest', models.CharField(help_text='SHA-256 of the original image', max_length=64)),
+                ('format', models.CharField(help_text='File extension of the thumbnails: webp or jpeg', max_length=4)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
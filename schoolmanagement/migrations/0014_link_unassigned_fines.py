@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def link_fines(apps, schema_editor):
+    """
+    Put fines raised before fines were tied to a fee on the obligation they
+    fell due against: the student's fee that fell due last on or before the
+    fine's due date, else their earliest one.
+    """
+    FeeFine = apps.get_model('schoolmanagement', 'FeeFine')
+    FeePayment = apps.get_model('schoolmanagement', 'FeePayment')
+    for fine in FeeFine.objects.filter(fee_structure__isnull=True).iterator():
+        obligations = FeePayment.objects.filter(student_id=fine.student_id).values_list('fee_structure_id', flat=True)
+        fee_structure_id = (
+            obligations.filter(fee_structure__due_date__lte=fine.due_date)
+            .order_by('-fee_structure__due_date', '-pk').first()
+        )
+        if fee_structure_id is None:
+            fee_structure_id = obligations.order_by('fee_structure__due_date', 'pk').first()
+        if fee_structure_id is not None:
+            FeeFine.objects.filter(pk=fine.pk).update(fee_structure_id=fee_structure_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schoolmanagement', '0013_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_fines, migrations.RunPython.noop),
+    ]
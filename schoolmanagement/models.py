@@ -1,4 +1,5 @@
 from django.db import models
+from django.core.exceptions import ValidationError
 from django.contrib.auth.models import AbstractUser, BaseUserManager, Group, Permission
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
@@ -192,9 +193,15 @@ class Timetable(models.Model):
         return f"{self.class_level} - {self.subject} ({self.get_day_display()}) {self.start_time} - {self.end_time}"
     
     def clean(self):
-        """Ensure that start_time is before end_time."""
+        """Ensure that start_time is before end_time and that the class, teacher and room are free."""
         if self.start_time and self.end_time and self.start_time >= self.end_time:
             raise ValidationError('Start time must be before end time')
+        
+        if self.start_time and self.end_time and self.class_level_id and self.teacher_id:
+            from .timetable_conflicts import validate_entry
+            conflicts = validate_entry(self)
+            if conflicts:
+                raise ValidationError([conflict.message for conflict in conflicts])
     
     def save(self, *args, **kwargs):
         self.full_clean()
@@ -373,6 +380,7 @@ class ClassSubject(models.Model):
     class_level = models.ForeignKey('Class', on_delete=models.CASCADE)
     subject = models.ForeignKey('Subject', on_delete=models.CASCADE)
     teacher = models.ForeignKey('Staff', on_delete=models.SET_NULL, null=True, blank=True)
+    lessons_per_week = models.PositiveSmallIntegerField(default=4, help_text='Periods per week used by the timetable generator')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -438,25 +446,27 @@ class ExamResult(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
-    def save(self, *args, **kwargs):
-        # Calculate grade based on marks obtained
-        percentage = (self.marks_obtained / self.exam.total_marks) * 100
-        
+    @staticmethod
+    def calculate_grade(percentage):
+        """Return the letter grade for a percentage score."""
         if percentage >= 90:
-            self.grade = 'A+'
+            return 'A+'
         elif percentage >= 80:
-            self.grade = 'A'
+            return 'A'
         elif percentage >= 70:
-            self.grade = 'B+'
+            return 'B+'
         elif percentage >= 60:
-            self.grade = 'B'
+            return 'B'
         elif percentage >= 50:
-            self.grade = 'C+'
+            return 'C+'
         elif percentage >= 40:
-            self.grade = 'C'
-        else:
-            self.grade = 'F'
-            
+            return 'C'
+        return 'F'
+    
+    def save(self, *args, **kwargs):
+        # Calculate grade based on marks obtained
+        percentage = (self.marks_obtained / self.exam.total_marks) * 100
+        self.grade = self.calculate_grade(percentage)
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -465,6 +475,32 @@ class ExamResult(models.Model):
     class Meta:
         unique_together = ('exam', 'student')
         ordering = ['-exam__date', 'student__user__last_name']
+        indexes = [
+            models.Index(fields=['student', 'updated_at']),
+        ]
+
+class ExamStatistics(models.Model):
+    """Cached distribution summary of an exam's results, rebuilt by statistics_service."""
+    exam = models.OneToOneField(Exam, on_delete=models.CASCADE, related_name='statistics')
+    result_count = models.PositiveIntegerField(default=0)
+    pass_count = models.PositiveIntegerField(default=0)
+    pass_rate = models.FloatField(default=0, help_text='Percentage of results at or above the passing marks')
+    mean = models.FloatField(null=True, blank=True)
+    median = models.FloatField(null=True, blank=True)
+    std_dev = models.FloatField(null=True, blank=True)
+    minimum = models.FloatField(null=True, blank=True)
+    maximum = models.FloatField(null=True, blank=True)
+    q1 = models.FloatField(null=True, blank=True, help_text='25th percentile')
+    q3 = models.FloatField(null=True, blank=True, help_text='75th percentile')
+    p90 = models.FloatField(null=True, blank=True, help_text='90th percentile')
+    histogram = models.JSONField(default=list, help_text='Result counts per 10% band of total marks')
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.exam} statistics"
+    
+    class Meta:
+        verbose_name_plural = 'Exam statistics'
 
 class FeeStructure(models.Model):
     TERM_CHOICES = [
@@ -508,10 +544,19 @@ class FeePayment(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     
+    # Statuses that still carry a balance owed by the student
+    OUTSTANDING_STATUSES = ('pending', 'partial', 'overdue')
+    
+    _loaded_balance = None
+    
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='fee_payments')
     fee_structure = models.ForeignKey(FeeStructure, on_delete=models.CASCADE, related_name='payments')
-    amount_paid = models.DecimalField(max_digits=10, decimal_places=2)
-    payment_date = models.DateField()
+    amount_due = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                     help_text='Amount owed after discounts')
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    fine_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    payment_date = models.DateField(null=True, blank=True)
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS, default='cash')
     transaction_id = models.CharField(max_length=100, blank=True, null=True)
     receipt_number = models.CharField(max_length=50, unique=True, blank=True, null=True)
@@ -526,21 +571,46 @@ class FeePayment(models.Model):
         if not self.receipt_number:
             self.receipt_number = f"RCPT-{self.id:06d}" if self.id else None
         
+        if self.amount_due is None:
+            self.amount_due = self.fee_structure.amount - self.discount_amount
+        
         # Update payment status based on amount paid
-        if self.amount_paid >= self.fee_structure.amount:
+        if self.amount_paid >= self.amount_due + self.fine_amount:
             self.status = 'paid'
+        elif self.status == 'overdue' and self._loaded_balance == self.balance():
+            # Marked by the overdue sweep and nothing was paid since: still overdue
+            pass
         elif self.amount_paid > 0:
             self.status = 'partial'
         else:
             self.status = 'pending'
             
         super().save(*args, **kwargs)
+        self._loaded_balance = self.balance()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_balance = instance.balance()
+        return instance
+    
+    def balance(self):
+        """Amount still owed, fines included; None for a row loaded without its amounts."""
+        deferred = self.get_deferred_fields()
+        if deferred & {'amount_due', 'fine_amount', 'amount_paid'} or self.amount_due is None:
+            return None
+        return self.amount_due + self.fine_amount - self.amount_paid
     
     def __str__(self):
         return f"{self.student} - {self.fee_structure}: ${self.amount_paid}"
     
     class Meta:
         ordering = ['-payment_date', 'student__user__last_name']
+        indexes = [
+            models.Index(fields=['status']),
+            models.Index(fields=['fee_structure', 'student']),
+            models.Index(fields=['student', 'updated_at']),
+        ]
 
 
 class Attendance(models.Model):
@@ -567,6 +637,10 @@ class Attendance(models.Model):
         verbose_name_plural = 'Attendance'
         unique_together = ('student', 'class_level', 'date')
         ordering = ['-date', 'student__user__last_name']
+        indexes = [
+            models.Index(fields=['student', 'updated_at']),
+            models.Index(fields=['student', 'date']),
+        ]
 
 class FeeDiscount(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
@@ -580,10 +654,171 @@ class FeeDiscount(models.Model):
 
 class FeeFine(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    fee_structure = models.ForeignKey(FeeStructure, on_delete=models.CASCADE, null=True, blank=True,
+                                      related_name='fines',
+                                      help_text='Fee whose obligation this fine is added to once overdue')
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.TextField()
     due_date = models.DateField()
     created_date = models.DateField(auto_now_add=True)
     
+    def save(self, *args, **kwargs):
+        # Fines raised without a fee go on the obligation they fell due against
+        if self.fee_structure_id is None:
+            self.fee_structure_id = fine_fee_structure(self.student_id, self.due_date)
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.student} - {self.amount}"
+
+
+def fine_fee_structure(student_id, due_date):
+    """
+    The fee a fine is charged on: the student's obligation that fell due
+    last on or before the fine's due date, else their earliest one.
+    """
+    obligations = FeePayment.objects.filter(student_id=student_id).order_by()
+    earlier = obligations.filter(fee_structure__due_date__lte=due_date).order_by('-fee_structure__due_date', '-pk')
+    found = earlier.values_list('fee_structure_id', flat=True).first()
+    if found is None:
+        found = obligations.order_by('fee_structure__due_date', 'pk').values_list('fee_structure_id', flat=True).first()
+    return found
+
+class Ranking(models.Model):
+    """Stored class positions, rebuilt by ranking_service when results change."""
+    SCOPE_CHOICES = [
+        ('exam', 'Exam'),
+        ('term', 'Term'),
+    ]
+    
+    scope = models.CharField(max_length=4, choices=SCOPE_CHOICES)
+    class_level = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='rankings')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='rankings')
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, null=True, blank=True, related_name='rankings')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, null=True, blank=True,
+                                help_text='Empty for the overall (all subjects) ranking')
+    year = models.PositiveIntegerField()
+    term = models.PositiveSmallIntegerField(choices=FeeStructure.TERM_CHOICES)
+    score = models.DecimalField(max_digits=6, decimal_places=2, help_text='Percentage score')
+    stream_position = models.PositiveIntegerField(help_text='Position within the class stream')
+    level_position = models.PositiveIntegerField(help_text='Position across all streams of the class level')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.student} - {self.get_scope_display()} {self.stream_position} ({self.score}%)"
+    
+    class Meta:
+        ordering = ['stream_position']
+        indexes = [
+            models.Index(fields=['class_level', 'year', 'term', 'scope']),
+        ]
+
+class PerformanceTrend(models.Model):
+    """Per-student, per-subject performance trend, kept current by trend_service."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='performance_trends')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, null=True, blank=True,
+                                help_text='Empty for the trend across all subjects')
+    exam_count = models.PositiveIntegerField(default=0)
+    last_scores = models.JSONField(default=list, help_text='Most recent percentage scores, oldest first')
+    rolling_average = models.FloatField(default=0, help_text='Average of the most recent scores')
+    slope = models.FloatField(default=0, help_text='Change in percentage points per exam over the recent scores')
+    term_year = models.PositiveIntegerField(null=True, blank=True)
+    term = models.PositiveSmallIntegerField(choices=FeeStructure.TERM_CHOICES, null=True, blank=True)
+    term_average = models.FloatField(null=True, blank=True, help_text='Average in the latest term with results')
+    previous_term_average = models.FloatField(null=True, blank=True)
+    term_change = models.FloatField(null=True, blank=True, help_text='term_average minus previous_term_average')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.student} - {self.subject or 'All subjects'}: {self.rolling_average:.1f}%"
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['term_year', 'term', 'term_change']),
+            models.Index(fields=['student', 'subject']),
+        ]
+
+class ArchivedAttendance(models.Model):
+    """Attendance of a closed academic year, moved out of the live table by archive_service."""
+    id = models.BigIntegerField(primary_key=True)
+    academic_year = models.PositiveIntegerField()
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='+')
+    class_level = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='+')
+    date = models.DateField()
+    status = models.CharField(max_length=10, choices=Attendance.ATTENDANCE_STATUS)
+    remarks = models.TextField(blank=True)
+    recorded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name_plural = 'Archived attendance'
+        indexes = [
+            models.Index(fields=['student', 'academic_year']),
+            models.Index(fields=['class_level', 'date']),
+        ]
+
+class ArchivedExamResult(models.Model):
+    """Exam result of a closed academic year, moved out of the live table by archive_service."""
+    id = models.BigIntegerField(primary_key=True)
+    academic_year = models.PositiveIntegerField()
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='+')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='+')
+    marks_obtained = models.DecimalField(max_digits=5, decimal_places=2)
+    grade = models.CharField(max_length=2, blank=True)
+    remarks = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'academic_year']),
+        ]
+
+class ArchivedFeePayment(models.Model):
+    """Settled fee payment of a closed academic year, moved out of the live table by archive_service."""
+    id = models.BigIntegerField(primary_key=True)
+    academic_year = models.PositiveIntegerField()
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='+')
+    fee_structure = models.ForeignKey(FeeStructure, on_delete=models.CASCADE, related_name='+')
+    amount_due = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    fine_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    payment_date = models.DateField(null=True, blank=True)
+    payment_method = models.CharField(max_length=20, choices=FeePayment.PAYMENT_METHODS)
+    transaction_id = models.CharField(max_length=100, blank=True, null=True)
+    receipt_number = models.CharField(max_length=50, blank=True, null=True, db_index=True)
+    status = models.CharField(max_length=20, choices=FeePayment.PAYMENT_STATUS)
+    notes = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'academic_year']),
+        ]
+
+class ArchivedYear(models.Model):
+    """An academic year whose rows of one kind ('attendance', 'examresult' or 'feepayment') are archived."""
+    year = models.PositiveIntegerField()
+    kind = models.CharField(max_length=20)
+    rows = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.kind} {self.year}: {self.rows} rows"
+    
+    class Meta:
+        unique_together = ('year', 'kind')
+
+class Thumbnail(models.Model):
+    """Resized copies of an uploaded image, stored under a hash of its content by thumbnail_service."""
+    source = models.CharField(max_length=255, unique=True, help_text='Storage name of the original image')
+    digest = models.CharField(max_length=64, help_text='SHA-256 of the original image')
+    format = models.CharField(max_length=4, help_text='File extension of the thumbnails: webp or jpeg')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.source} ({self.format})"
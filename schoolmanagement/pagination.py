@@ -0,0 +1,131 @@
+from functools import reduce
+
+from django.core import signing
+from django.db.models import Q
+
+CURSOR_SALT = 'schoolmanagement.pagination.cursor'
+
+
+class InvalidCursor(Exception):
+    """Raised for a cursor that was tampered with or made for another listing."""
+
+
+def _key_value(obj, field):
+    value = reduce(getattr, field.split('__'), obj)
+    # Dates go through the cursor as ISO strings; the ORM parses them back when filtering
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class KeysetPage:
+    """One page of a KeysetPaginator; iterates like a Paginator page."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Seek pagination over `queryset` in the order of `ordering`, e.g.
+    ('-date', '-id'). Each page filters on the key of the row it starts
+    after instead of using OFFSET, and no COUNT is run, so every page
+    costs about the same as the first.
+
+    The keys must be non-null and the last one unique (normally the id).
+    Cursors are signed with `name`, so a cursor from one listing is
+    rejected by another and clients cannot forge one.
+    """
+
+    def __init__(self, queryset, ordering, per_page, name):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.name = name
+
+    def _fields(self, reverse=False):
+        fields = []
+        for key in self.ordering:
+            descending = key.startswith('-')
+            fields.append((key.lstrip('-'), descending != reverse))
+        return fields
+
+    def _after(self, values, reverse=False):
+        """Q for the rows that come after `values` in this order (before it when `reverse`)."""
+        condition = Q()
+        equal = Q()
+        for (field, descending), value in zip(self._fields(reverse), values):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def _ordered(self, reverse=False):
+        return self.queryset.order_by(*[
+            f"{'-' if descending else ''}{field}" for field, descending in self._fields(reverse)
+        ])
+
+    def encode(self, obj, direction):
+        values = [_key_value(obj, field) for field, _ in self._fields()]
+        return signing.dumps({'k': values, 'd': direction}, salt=f'{CURSOR_SALT}:{self.name}', compress=True)
+
+    def decode(self, cursor):
+        try:
+            data = signing.loads(cursor, salt=f'{CURSOR_SALT}:{self.name}')
+        except signing.BadSignature:
+            raise InvalidCursor('The page link is not valid.')
+        if not isinstance(data, dict) or len(data.get('k') or ()) != len(self.ordering) or data.get('d') not in ('n', 'p'):
+            raise InvalidCursor('The page link is not valid.')
+        return data['k'], data['d']
+
+    def page(self, cursor=None):
+        """
+        The page a cursor from next_cursor/previous_cursor points to, or
+        the first page. Raises InvalidCursor for a bad cursor.
+        """
+        if not cursor:
+            rows = list(self._ordered()[:self.per_page + 1])
+            more, rows = len(rows) > self.per_page, rows[:self.per_page]
+            return KeysetPage(rows, next_cursor=self.encode(rows[-1], 'n') if more else None)
+
+        values, direction = self.decode(cursor)
+        backwards = direction == 'p'
+        rows = list(self._ordered(reverse=backwards).filter(self._after(values, reverse=backwards))[:self.per_page + 1])
+        more, rows = len(rows) > self.per_page, rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            return KeysetPage(
+                rows,
+                next_cursor=self.encode(rows[-1], 'n') if rows else None,
+                previous_cursor=self.encode(rows[0], 'p') if more else None,
+            )
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode(rows[-1], 'n') if more else None,
+            previous_cursor=self.encode(rows[0], 'p') if rows else None,
+        )
+
+    def get_page(self, cursor=None):
+        """Like page(), but falls back to the first page for a bad cursor."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
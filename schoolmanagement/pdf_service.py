@@ -0,0 +1,340 @@
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from io import BytesIO
+
+import django
+from django.conf import settings
+from django.db.models import Prefetch
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+from .models import FeePayment, Guardian, Student
+
+# Bump when a layout changes so that cached documents are re-rendered
+LAYOUT_VERSION = 1
+
+DOCUMENTS_DIR = 'documents'
+
+
+def _money(value):
+    return f"{Decimal(value):,.2f}"
+
+
+def _balance(payment):
+    due = payment.amount_due if payment.amount_due is not None else payment.fee_structure.amount
+    return max(due + payment.fine_amount - payment.amount_paid, Decimal('0'))
+
+
+# ---------------------------------------------------------------------------
+# Payloads: plain, picklable dicts built from the ORM in the parent process
+# ---------------------------------------------------------------------------
+
+def receipt_key(payment):
+    return payment.receipt_number or f"RCPT-{payment.pk:06d}"
+
+
+def receipt_payload(payment):
+    """Return the data printed on a fee receipt. Expects student__user,
+    student__current_class and fee_structure to be selected."""
+    student = payment.student
+    structure = payment.fee_structure
+    return {
+        'receipt_number': receipt_key(payment),
+        'student': student.get_full_name(),
+        'admission_number': student.admission_number or student.student_id,
+        'class': str(student.current_class) if student.current_class else 'Not assigned',
+        'fee': structure.name,
+        'term': f"Term {structure.term}, {structure.year}",
+        'amount_due': str(payment.amount_due if payment.amount_due is not None else structure.amount),
+        'discount': str(payment.discount_amount),
+        'fine': str(payment.fine_amount),
+        'amount_paid': str(payment.amount_paid),
+        'balance': str(_balance(payment)),
+        'payment_date': payment.payment_date.isoformat() if payment.payment_date else '',
+        'payment_method': payment.get_payment_method_display(),
+        'transaction_id': payment.transaction_id or '',
+        'status': payment.get_status_display(),
+    }
+
+
+def statement_key(guardian):
+    return guardian.guardian_number or f"GDN-{guardian.pk:06d}"
+
+
+def statement_payload(guardian):
+    """Return the fee statement for all of a guardian's children. Expects the
+    guardian to come from statement_guardians() so nothing is queried here."""
+    children = []
+    total = Decimal('0')
+    for student in guardian.students.all():
+        lines = []
+        child_balance = Decimal('0')
+        for payment in student.fee_payments.all():
+            structure = payment.fee_structure
+            balance = _balance(payment)
+            child_balance += balance
+            lines.append({
+                'fee': structure.name,
+                'term': f"Term {structure.term}, {structure.year}",
+                'due_date': structure.due_date.isoformat(),
+                'amount_due': str(payment.amount_due if payment.amount_due is not None else structure.amount),
+                'fine': str(payment.fine_amount),
+                'amount_paid': str(payment.amount_paid),
+                'balance': str(balance),
+                'status': payment.get_status_display(),
+            })
+        total += child_balance
+        children.append({
+            'name': student.get_full_name(),
+            'admission_number': student.admission_number or student.student_id,
+            'class': str(student.current_class) if student.current_class else 'Not assigned',
+            'lines': lines,
+            'balance': str(child_balance),
+        })
+    return {
+        'guardian': f"{guardian.first_name} {guardian.last_name}",
+        'guardian_number': statement_key(guardian),
+        'address': guardian.address,
+        'children': children,
+        'total_balance': str(total),
+    }
+
+
+def receipt_payments(year=None, term=None):
+    """Payments that have money recorded against them, ready for receipt_payload()."""
+    payments = FeePayment.objects.filter(amount_paid__gt=0).select_related(
+        'student__user', 'student__current_class', 'fee_structure'
+    ).order_by('pk')
+    if year:
+        payments = payments.filter(fee_structure__year=year)
+    if term:
+        payments = payments.filter(fee_structure__term=term)
+    return payments
+
+
+def statement_guardians(year=None, term=None):
+    """Guardians with their children and fee obligations prefetched in a fixed number of queries."""
+    payments = FeePayment.objects.select_related('fee_structure').order_by(
+        'fee_structure__year', 'fee_structure__term', 'fee_structure__due_date'
+    )
+    if year:
+        payments = payments.filter(fee_structure__year=year)
+    if term:
+        payments = payments.filter(fee_structure__term=term)
+    students = Student.objects.select_related('user', 'current_class').prefetch_related(
+        Prefetch('fee_payments', queryset=payments)
+    )
+    return Guardian.objects.filter(students__isnull=False).distinct().prefetch_related(
+        Prefetch('students', queryset=students)
+    ).order_by('pk')
+
+
+# ---------------------------------------------------------------------------
+# Rendering: runs in worker processes, touches no database
+# ---------------------------------------------------------------------------
+
+def _school_name():
+    return getattr(settings, 'SCHOOL_NAME', 'School Management System')
+
+
+def _table(rows, col_widths=None, header=True):
+    table = Table(rows, colWidths=col_widths, hAlign='LEFT')
+    style = [
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]
+    if header:
+        style += [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#007b5e')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ]
+    table.setStyle(TableStyle(style))
+    return table
+
+
+def _build_pdf(title, story):
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, title=title,
+                            leftMargin=15 * mm, rightMargin=15 * mm,
+                            topMargin=15 * mm, bottomMargin=15 * mm)
+    styles = getSampleStyleSheet()
+    doc.build([
+        Paragraph(_school_name(), styles['Title']),
+        Paragraph(title, styles['Heading2']),
+        Spacer(1, 4 * mm),
+    ] + story)
+    return buffer.getvalue()
+
+
+def render_receipt(payload):
+    """Render a fee receipt payload to PDF bytes."""
+    rows = [
+        ['Receipt Number', payload['receipt_number']],
+        ['Student', payload['student']],
+        ['Admission Number', payload['admission_number']],
+        ['Class', payload['class']],
+        ['Fee', f"{payload['fee']} ({payload['term']})"],
+        ['Amount Due', _money(payload['amount_due'])],
+        ['Discount', _money(payload['discount'])],
+        ['Fine', _money(payload['fine'])],
+        ['Amount Paid', _money(payload['amount_paid'])],
+        ['Balance', _money(payload['balance'])],
+        ['Payment Date', payload['payment_date']],
+        ['Payment Method', payload['payment_method']],
+        ['Transaction ID', payload['transaction_id']],
+        ['Status', payload['status']],
+    ]
+    return _build_pdf('Fee Receipt', [_table(rows, col_widths=[50 * mm, 110 * mm], header=False)])
+
+
+def render_statement(payload):
+    """Render a guardian fee statement payload to PDF bytes."""
+    styles = getSampleStyleSheet()
+    story = [
+        Paragraph(f"{payload['guardian']} ({payload['guardian_number']})", styles['Normal']),
+        Paragraph(payload['address'] or '', styles['Normal']),
+        Spacer(1, 4 * mm),
+    ]
+    for child in payload['children']:
+        story.append(Paragraph(
+            f"{child['name']} - {child['admission_number']} - {child['class']}", styles['Heading4']
+        ))
+        rows = [['Fee', 'Term', 'Due Date', 'Amount Due', 'Fine', 'Paid', 'Balance', 'Status']]
+        for line in child['lines']:
+            rows.append([
+                line['fee'], line['term'], line['due_date'], _money(line['amount_due']),
+                _money(line['fine']), _money(line['amount_paid']), _money(line['balance']), line['status'],
+            ])
+        rows.append(['', '', '', '', '', 'Balance', _money(child['balance']), ''])
+        story += [_table(rows), Spacer(1, 4 * mm)]
+    story.append(Paragraph(f"Total balance due: {_money(payload['total_balance'])}", styles['Heading3']))
+    return _build_pdf('Fee Statement', story)
+
+
+def render_report_card(payload):
+    """Render a term report card payload to PDF bytes."""
+    styles = getSampleStyleSheet()
+    attendance = payload['attendance']
+    details = [
+        ['Student', payload['student'], 'Admission Number', payload['admission_number']],
+        ['Class', payload['class'], 'Term', payload['term']],
+        ['Average', f"{payload['average']}%", 'Grade', payload['grade']],
+        ['Position', f"{payload['position'] or '-'} of {payload['class_size']}", '', ''],
+    ]
+    rows = [['Subject', 'Exams', 'Score (%)', 'Grade']]
+    for subject in payload['subjects']:
+        exams = ', '.join(f"{exam['name']}: {exam['marks']}/{exam['total']}" for exam in subject['exams'])
+        rows.append([subject['subject'], Paragraph(exams, styles['BodyText']),
+                     subject['percentage'], subject['grade']])
+    attendance_rows = [
+        ['Present', 'Late', 'Absent', 'Excused', 'Days Recorded', 'Attendance (%)'],
+        [attendance['present'], attendance['late'], attendance['absent'], attendance['excused'],
+         attendance['total'], attendance['percentage']],
+    ]
+    story = [
+        _table(details, col_widths=[30 * mm, 55 * mm, 35 * mm, 40 * mm], header=False),
+        Spacer(1, 5 * mm),
+        Paragraph('Academic Performance', styles['Heading3']),
+        _table(rows, col_widths=[40 * mm, 80 * mm, 20 * mm, 20 * mm]),
+        Spacer(1, 5 * mm),
+        Paragraph('Attendance', styles['Heading3']),
+        _table(attendance_rows),
+    ]
+    return _build_pdf('Report Card', story)
+
+
+RENDERERS = {
+    'receipt': render_receipt,
+    'statement': render_statement,
+    'report_card': render_report_card,
+}
+
+
+def _render_job(job):
+    kind, payload, path = job
+    content = RENDERERS[kind](payload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as handle:
+        handle.write(content)
+    os.replace(tmp_path, path)
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Batch driver
+# ---------------------------------------------------------------------------
+
+def content_hash(kind, payload):
+    """Hash of everything that ends up on the page, used as the cache key."""
+    data = json.dumps([LAYOUT_VERSION, kind, payload], sort_keys=True, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def document_path(kind, key, digest):
+    return os.path.join(settings.MEDIA_ROOT, DOCUMENTS_DIR, f"{kind}s", f"{key}-{digest[:16]}.pdf")
+
+
+def _remove_stale(path, key):
+    for old in glob.glob(os.path.join(os.path.dirname(path), f"{glob.escape(key)}-*.pdf")):
+        if old != path:
+            os.remove(old)
+
+
+def render_pool(workers=None):
+    """Process pool for render_documents(), for callers that render several batches."""
+    return ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+
+
+def render_documents(jobs, workers=None, force=False, pool=None):
+    """
+    Render (kind, key, payload) jobs to MEDIA_ROOT across a process pool.
+
+    A document whose content hash already exists on disk is skipped unless
+    `force` is set. Superseded versions of a re-rendered document are removed.
+    An existing `pool` from render_pool() is used if given, otherwise one is
+    started for this batch. Returns a dict with the number of documents
+    rendered and served from cache.
+    """
+    pending = []
+    keys = {}
+    cached = 0
+    for kind, key, payload in jobs:
+        path = document_path(kind, key, content_hash(kind, payload))
+        if not force and os.path.exists(path):
+            cached += 1
+            continue
+        pending.append((kind, payload, path))
+        keys[path] = key
+
+    rendered = 0
+    if pending:
+        own_pool = pool is None
+        if own_pool:
+            pool = render_pool(workers)
+        try:
+            for path in pool.map(_render_job, pending, chunksize=max(1, len(pending) // 64)):
+                _remove_stale(path, keys[path])
+                rendered += 1
+        finally:
+            if own_pool:
+                pool.shutdown()
+    return {'rendered': rendered, 'cached': cached}
+
+
+def receipt_jobs(payments):
+    for payment in payments.iterator(chunk_size=2000):
+        yield 'receipt', receipt_key(payment), receipt_payload(payment)
+
+
+def statement_jobs(guardians):
+    for guardian in guardians:
+        yield 'statement', statement_key(guardian), statement_payload(guardian)
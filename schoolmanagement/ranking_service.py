@@ -0,0 +1,199 @@
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Sum, Window
+from django.db.models.functions import Cast, Rank, Round
+
+from .archive_service import archived_years, history
+from .models import Class, ExamResult, Ranking
+from .utils import get_term_dates, get_term_for_date
+
+
+def _percentage(obtained, total):
+    return Round(Cast(obtained, FloatField()) * 100.0 / Cast(total, FloatField()), 2)
+
+
+def _exact_percentage(obtained, total):
+    """Decimal counterpart of _percentage(), rounded half away from zero like SQL ROUND()."""
+    return float((obtained * 100 / total).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+
+
+def competition_ranks(groups, scores):
+    """
+    Vectorised competition ranking (1, 2, 2, 4) of `scores`, highest first,
+    restarting within each group. `groups` are hashable partition keys.
+    Returns a numpy array of positions aligned with the input.
+    """
+    if not len(scores):
+        return np.array([], dtype=int)
+    codes = {}
+    group_ids = np.fromiter((codes.setdefault(g, len(codes)) for g in groups), dtype=np.int64, count=len(groups))
+    scores = np.asarray(scores, dtype=float)
+
+    order = np.lexsort((-scores, group_ids))
+    sorted_groups = group_ids[order]
+    sorted_scores = scores[order]
+    index = np.arange(len(order))
+
+    group_start = np.ones(len(order), dtype=bool)
+    group_start[1:] = sorted_groups[1:] != sorted_groups[:-1]
+    value_start = group_start.copy()
+    value_start[1:] |= sorted_scores[1:] != sorted_scores[:-1]
+
+    first_in_group = np.maximum.accumulate(np.where(group_start, index, 0))
+    first_with_score = np.maximum.accumulate(np.where(value_start, index, 0))
+    ranks = np.empty(len(order), dtype=int)
+    ranks[order] = first_with_score - first_in_group + 1
+    return ranks
+
+
+def _ranked(rows, stream_keys, level_keys):
+    """
+    Add stream_position and level_position to a values() queryset of scores,
+    or to a list of score dicts.
+
+    Uses RANK() window functions when the database supports them, otherwise
+    fetches the scores and ranks them with competition_ranks().
+    """
+    if connection.features.supports_over_clause and not isinstance(rows, list):
+        return list(rows.annotate(
+            stream_position=Window(
+                Rank(), partition_by=[F(key) for key in stream_keys], order_by=F('score').desc()
+            ),
+            level_position=Window(
+                Rank(), partition_by=[F(key) for key in level_keys] or None, order_by=F('score').desc()
+            ),
+        ))
+
+    rows = list(rows)
+    scores = [row['score'] for row in rows]
+    stream = competition_ranks([tuple(row[key] for key in stream_keys) for row in rows], scores)
+    level = competition_ranks([tuple(row[key] for key in level_keys) for row in rows], scores)
+    for row, stream_position, level_position in zip(rows, stream, level):
+        row['stream_position'] = int(stream_position)
+        row['level_position'] = int(level_position)
+    return rows
+
+
+def _archived_scores(class_level, year, start, end):
+    """
+    The per-exam, per-subject and overall score rows of a term in an archived
+    year, as lists shaped like the values() rows of compute_rankings. The
+    results are split between the live and archive tables, so they are
+    summed here rather than in SQL.
+    """
+    rows = history(
+        'examresult',
+        ('student_id', 'exam_id', 'exam__name', 'exam__subject_id', 'exam__class_level_id',
+         'marks_obtained', 'exam__total_marks'),
+        year=year, exam__class_level__name=class_level.name, exam__date__range=(start, end),
+    )
+    per_exam = []
+    subject_sums = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    overall_sums = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    for student_id, exam_id, exam_name, subject_id, stream_id, obtained, total in rows:
+        if not total:
+            continue
+        per_exam.append({
+            'student_id': student_id, 'exam_id': exam_id, 'exam__name': exam_name,
+            'exam__subject_id': subject_id, 'exam__class_level_id': stream_id,
+            'score': _exact_percentage(obtained, total),
+        })
+        for sums in (subject_sums[student_id, subject_id, stream_id], overall_sums[student_id, stream_id]):
+            sums[0] += obtained
+            sums[1] += total
+
+    per_subject = [
+        {'student_id': student_id, 'exam__subject_id': subject_id, 'exam__class_level_id': stream_id,
+         'score': _exact_percentage(obtained, total)}
+        for (student_id, subject_id, stream_id), (obtained, total) in subject_sums.items()
+    ]
+    overall = [
+        {'student_id': student_id, 'exam__class_level_id': stream_id, 'score': _exact_percentage(obtained, total)}
+        for (student_id, stream_id), (obtained, total) in overall_sums.items()
+    ]
+    return per_exam, per_subject, overall
+
+
+def compute_rankings(class_level, year, term):
+    """
+    Rebuild the stored rankings of a term for every stream of a class level.
+
+    Ranks all streams sharing the class name together so that each row carries
+    both its stream position and its position across the level. Three ranked
+    queries cover the per-exam, per-subject and overall term rankings. Terms
+    of archived years are ranked from the live and archived results together.
+    Returns the number of Ranking rows stored.
+    """
+    start, end = get_term_dates(year, term)
+    if year in archived_years('examresult'):
+        per_exam, per_subject, overall = _archived_scores(class_level, year, start, end)
+    else:
+        results = ExamResult.objects.filter(
+            exam__class_level__name=class_level.name, exam__date__range=(start, end)
+        ).order_by()
+        per_exam = results.values(
+            'student_id', 'exam_id', 'exam__name', 'exam__subject_id', 'exam__class_level_id'
+        ).annotate(score=_percentage('marks_obtained', 'exam__total_marks'))
+        per_subject = results.values('student_id', 'exam__subject_id', 'exam__class_level_id').annotate(
+            score=_percentage(Sum('marks_obtained'), Sum('exam__total_marks'))
+        )
+        overall = results.values('student_id', 'exam__class_level_id').annotate(
+            score=_percentage(Sum('marks_obtained'), Sum('exam__total_marks'))
+        )
+
+    per_exam = _ranked(per_exam, stream_keys=['exam_id'], level_keys=['exam__name', 'exam__subject_id'])
+    per_subject = _ranked(
+        per_subject, stream_keys=['exam__class_level_id', 'exam__subject_id'], level_keys=['exam__subject_id']
+    )
+    overall = _ranked(overall, stream_keys=['exam__class_level_id'], level_keys=[])
+
+    rankings = []
+    for scope, rows in (('exam', per_exam), ('term', per_subject), ('term', overall)):
+        for row in rows:
+            rankings.append(Ranking(
+                scope=scope,
+                class_level_id=row['exam__class_level_id'],
+                student_id=row['student_id'],
+                exam_id=row.get('exam_id'),
+                subject_id=row.get('exam__subject_id'),
+                year=year,
+                term=term,
+                score=round(row['score'], 2),
+                stream_position=row['stream_position'],
+                level_position=row['level_position'],
+            ))
+
+    with transaction.atomic():
+        Ranking.objects.filter(class_level__name=class_level.name, year=year, term=term).delete()
+        Ranking.objects.bulk_create(rankings, batch_size=1000)
+    return len(rankings)
+
+
+def get_rankings(class_level, year, term, scope='term', subject=None, exam=None):
+    """
+    Return the stored rankings of a class, computing them first if they were
+    invalidated. Defaults to the overall term ranking; pass `subject` for a
+    subject ranking or `exam` for a single exam.
+    """
+    rankings = Ranking.objects.filter(class_level=class_level, year=year, term=term)
+    if not rankings.exists():
+        compute_rankings(class_level, year, term)
+
+    rankings = rankings.filter(scope='exam' if exam else scope).select_related('student__user')
+    if exam:
+        return rankings.filter(exam=exam)
+    return rankings.filter(subject=subject)
+
+
+def invalidate_rankings(exam):
+    """Drop the stored rankings affected by a change to an exam or its results."""
+    year_term = get_term_for_date(exam.date)
+    if year_term is None:
+        return
+    year, term = year_term
+    Ranking.objects.filter(
+        class_level__in=Class.objects.filter(name=exam.class_level.name), year=year, term=term
+    ).delete()
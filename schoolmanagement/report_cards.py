@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+
+from .archive_service import history, history_counts
+from .models import Class, Student, ExamResult
+from .pdf_service import DOCUMENTS_DIR, render_documents, render_pool
+from .ranking_service import competition_ranks
+from .utils import get_term_dates
+
+
+def _percent(part, whole):
+    if not whole:
+        return Decimal('0.0')
+    return (Decimal(part) * 100 / Decimal(whole)).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
+
+
+def class_report_data(class_level, year, term):
+    """
+    Build the report card payload of every student in a class for a term.
+
+    Uses three queries regardless of class size: the class roster, all of the
+    class's exam results in the term and the attendance counts grouped by
+    student and status. Everything else is computed in memory. Results and
+    attendance of an archived year are read from the archive tables as well.
+    Returns a list of (key, payload) pairs.
+    """
+    start, end = get_term_dates(year, term)
+    students = list(
+        Student.objects.filter(current_class=class_level).select_related('user')
+    )
+
+    results = history(
+        'examresult',
+        ('exam__date', 'student_id', 'exam__subject__name', 'exam__name', 'marks_obtained', 'exam__total_marks'),
+        year=year, exam__class_level=class_level, exam__date__range=(start, end),
+    ).order_by('exam__date')
+    marks = defaultdict(lambda: defaultdict(list))
+    for _, student_id, subject, exam_name, obtained, total in results:
+        marks[student_id][subject].append((exam_name, obtained, total))
+
+    attendance = defaultdict(lambda: defaultdict(int))
+    rows = history_counts(
+        'attendance', ('student_id', 'status'), year=year, class_level=class_level, date__range=(start, end)
+    )
+    for (student_id, status), days in rows.items():
+        attendance[student_id][status] = days
+
+    sections = {}
+    averages = {}
+    for student in students:
+        subjects = []
+        obtained_sum = Decimal('0')
+        total_sum = Decimal('0')
+        for subject in sorted(marks[student.pk]):
+            exams = marks[student.pk][subject]
+            obtained = sum(exam[1] for exam in exams)
+            total = sum(exam[2] for exam in exams)
+            percentage = _percent(obtained, total)
+            obtained_sum += obtained
+            total_sum += total
+            subjects.append({
+                'subject': subject,
+                'exams': [
+                    {'name': name, 'marks': str(got), 'total': str(out_of)}
+                    for name, got, out_of in exams
+                ],
+                'percentage': str(percentage),
+                'grade': ExamResult.calculate_grade(percentage),
+            })
+        counts = attendance[student.pk]
+        days = sum(counts.values())
+        sections[student.pk] = {
+            'subjects': subjects,
+            'attendance': {
+                'present': counts['present'],
+                'late': counts['late'],
+                'absent': counts['absent'],
+                'excused': counts['excused'],
+                'total': days,
+                'percentage': str(_percent(counts['present'] + counts['late'], days)),
+            },
+        }
+        if total_sum:
+            averages[student.pk] = _percent(obtained_sum, total_sum)
+
+    ranked = list(averages)
+    ranks = competition_ranks([class_level.pk] * len(ranked), [averages[pk] for pk in ranked])
+    positions = dict(zip(ranked, ranks.tolist()))
+    reports = []
+    for student in students:
+        average = averages.get(student.pk, Decimal('0.0'))
+        admission_number = student.admission_number or student.student_id
+        payload = {
+            'student': student.get_full_name(),
+            'admission_number': admission_number,
+            'class': str(class_level),
+            'term': f"Term {term}, {year}",
+            'average': str(average),
+            'grade': ExamResult.calculate_grade(average) if student.pk in averages else '-',
+            'position': positions.get(student.pk),
+            'class_size': len(students),
+            **sections[student.pk],
+        }
+        reports.append((f"{year}-T{term}-{admission_number}", payload))
+    return reports
+
+
+class ReportCardRun:
+    """
+    A resumable report card run for one term, over the classes with
+    `class_ids` (defaults to every class).
+
+    Classes are processed one at a time and recorded in a progress file under
+    MEDIA_ROOT once their cards are written, so re-running an interrupted run
+    skips the classes that were finished. Within a partly finished class the
+    content-hash cache of render_documents() skips cards already on disk.
+    The progress file is removed once a run gets through all its classes, so
+    later runs check every card again and pick up corrected marks. Each
+    selection of classes has a progress file of its own, so a run for one
+    class leaves an interrupted run for the whole school to resume.
+    """
+
+    def __init__(self, year, term, class_ids=None):
+        self.year = year
+        self.term = term
+        self.class_ids = sorted(set(class_ids)) if class_ids else None
+        if self.class_ids is None:
+            selection = 'all'
+        else:
+            selection = hashlib.md5(','.join(map(str, self.class_ids)).encode()).hexdigest()[:12]
+        self.progress_path = os.path.join(
+            settings.MEDIA_ROOT, DOCUMENTS_DIR, 'report_cards', f".progress-{year}-T{term}-{selection}.json"
+        )
+        self.completed = self._load_progress()
+
+    def _load_progress(self):
+        try:
+            with open(self.progress_path) as handle:
+                return set(json.load(handle))
+        except FileNotFoundError:
+            return set()
+
+    def _save_progress(self):
+        os.makedirs(os.path.dirname(self.progress_path), exist_ok=True)
+        tmp_path = f"{self.progress_path}.tmp"
+        with open(tmp_path, 'w') as handle:
+            json.dump(sorted(self.completed), handle)
+        os.replace(tmp_path, self.progress_path)
+
+    def reset(self):
+        self.completed = set()
+        if os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
+
+    def run(self, workers=None, force=False, progress=None):
+        """
+        Generate the report cards of the run's classes.
+        `progress` is called with (class, result) after each class.
+        Returns the totals of rendered and cached cards.
+        """
+        classes = Class.objects.all()
+        if self.class_ids is not None:
+            classes = classes.filter(pk__in=self.class_ids)
+        totals = {'rendered': 0, 'cached': 0, 'skipped_classes': 0}
+        with render_pool(workers) as pool:
+            for class_level in classes:
+                if class_level.pk in self.completed and not force:
+                    totals['skipped_classes'] += 1
+                    continue
+                jobs = (
+                    ('report_card', key, payload)
+                    for key, payload in class_report_data(class_level, self.year, self.term)
+                )
+                result = render_documents(jobs, force=force, pool=pool)
+                totals['rendered'] += result['rendered']
+                totals['cached'] += result['cached']
+                self.completed.add(class_level.pk)
+                self._save_progress()
+                if progress:
+                    progress(class_level, result)
+        self.reset()
+        return totals
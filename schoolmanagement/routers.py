@@ -0,0 +1,123 @@
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = 'replica'
+
+# Session key holding the time of the session's last write request
+PIN_SESSION_KEY = '_db_written_at'
+
+# How long a session reads from the primary after a write, for replicas
+# whose snapshot time cannot be read (anything but a local SQLite copy)
+DEFAULT_PIN_SECONDS = 60
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def use_replica(enabled=True):
+    """Send the reads made inside this block to the replica, when there is one."""
+    token = _replica_reads.set(enabled and replica_configured())
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Writes, and reads outside use_replica(), go to the primary. The replica
+    holds a copy of the same data, so relations between the two are allowed,
+    but it is never migrated: it gets its schema from the snapshot.
+    """
+
+    def db_for_read(self, model, **hints):
+        return REPLICA_ALIAS if _replica_reads.get() else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
+
+
+def _sqlite_replica_path():
+    config = settings.DATABASES.get(REPLICA_ALIAS, {})
+    if config.get('ENGINE') != 'django.db.backends.sqlite3':
+        return None
+    return str(config['NAME'])
+
+
+def replica_synced_at():
+    """When the replica's data was copied from the primary, or None if unknown."""
+    path = _sqlite_replica_path()
+    try:
+        return os.path.getmtime(path) if path else None
+    except OSError:
+        return None
+
+
+def pin_to_primary(request):
+    """Read this session's own writes: keep it on the primary until the replica catches up."""
+    if hasattr(request, 'session'):
+        request.session[PIN_SESSION_KEY] = time.time()
+
+
+def pinned_to_primary(request):
+    written_at = getattr(request, 'session', {}).get(PIN_SESSION_KEY)
+    if written_at is None:
+        return False
+    synced_at = replica_synced_at()
+    if synced_at is None:
+        pin_seconds = getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS)
+        return time.time() - written_at < pin_seconds
+    return written_at >= synced_at
+
+
+def refresh_replica(step_pages=-1):
+    """
+    Snapshot the SQLite primary into the replica file with the online
+    backup API. The copy is written next to the replica and moved over
+    it, so readers never see a half-written file; its modification time
+    is set to when the snapshot started, which is what replica_synced_at()
+    and the session pinning go by.
+
+    `step_pages` copies that many pages per step, letting other
+    connections write in between (a write restarts the copy); -1 copies
+    everything in one step. Returns the replica path.
+    """
+    if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+        raise ValueError('Only an SQLite primary can be copied to a replica this way.')
+    path = _sqlite_replica_path()
+    if path is None:
+        raise ValueError(f"DATABASES['{REPLICA_ALIAS}'] must be an SQLite database.")
+    if os.path.abspath(path) == os.path.abspath(str(settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'])):
+        raise ValueError('The replica cannot be the primary database file.')
+
+    connections[REPLICA_ALIAS].close()
+    primary = connections[DEFAULT_DB_ALIAS]
+    primary.ensure_connection()
+    started = time.time()
+    partial = f'{path}.partial'
+    target = sqlite3.connect(partial)
+    try:
+        primary.connection.backup(target, pages=step_pages)
+        # A WAL-mode copy would leave -wal files that a later snapshot could be mixed with
+        target.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        target.close()
+    os.utime(partial, (started, started))
+    os.replace(partial, path)
+    return path
@@ -0,0 +1,143 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Timetable
+from .utils import bump_cache_version, get_cache_version
+
+DAYS = [day for day, _ in Timetable.DAY_CHOICES]
+DAY_INDEX = {day: index for index, day in enumerate(DAYS)}
+
+# iCalendar weekday codes, in Timetable.DAY_CHOICES order
+ICAL_DAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA']
+
+
+def build_schedules():
+    """
+    Build the weekly schedule of every class and teacher from one query.
+
+    Returns {('class', class_id): [...], ('teacher', staff_id): [...]}, each
+    schedule a list of plain dicts sorted by day and start time so that it
+    can be cached and searched without touching the database.
+    """
+    entries = Timetable.objects.select_related('class_level', 'subject', 'teacher__user').order_by('start_time')
+    schedules = defaultdict(list)
+    for entry in entries:
+        if entry.day not in DAY_INDEX:
+            continue
+        lesson = {
+            'id': entry.pk,
+            'day': entry.day,
+            'day_index': DAY_INDEX[entry.day],
+            'day_name': entry.get_day_display(),
+            'period': entry.period,
+            'start_time': entry.start_time,
+            'end_time': entry.end_time,
+            'subject': entry.subject.name,
+            'subject_code': entry.subject.code,
+            'class_id': entry.class_level_id,
+            'class_name': str(entry.class_level),
+            'teacher_id': entry.teacher_id,
+            'teacher_name': entry.teacher.user.get_full_name() or entry.teacher.user.username,
+            'room': entry.room,
+        }
+        schedules['class', entry.class_level_id].append(lesson)
+        schedules['teacher', entry.teacher_id].append(lesson)
+    for lessons in schedules.values():
+        lessons.sort(key=lambda lesson: (lesson['day_index'], lesson['start_time']))
+    return schedules
+
+
+def get_schedule(kind, owner_id):
+    """
+    Cached weekly schedule of a class (`kind='class'`) or teacher
+    (`kind='teacher'`). A miss rebuilds and caches every schedule at once,
+    so the database is read once per timetable change rather than per request.
+    """
+    version = get_cache_version('schedules')
+    key = f'schedule:{version}:{kind}:{owner_id}'
+    schedule = cache.get(key)
+    if schedule is not None:
+        return schedule
+    # Owners with no lessons have no key of their own; the index of owners
+    # tells an empty schedule apart from one that was evicted
+    owners = cache.get(f'schedule:{version}:owners')
+    if owners is not None and (kind, owner_id) not in owners:
+        return []
+
+    schedules = build_schedules()
+    values = {f'schedule:{version}:{k}:{owner}': lessons for (k, owner), lessons in schedules.items()}
+    values[f'schedule:{version}:owners'] = frozenset(schedules)
+    cache.set_many(values, None)
+    return schedules.get((kind, owner_id), [])
+
+
+def invalidate_schedules():
+    """Mark every cached schedule stale after the timetable changes."""
+    bump_cache_version('schedules')
+
+
+def current_and_next(schedule, moment=None):
+    """
+    Return (current, next) lessons of a schedule at `moment` (default now):
+    the lesson in progress, if any, and the first one starting after it,
+    wrapping round to the next week.
+    """
+    if not schedule:
+        return None, None
+    moment = timezone.localtime(moment) if moment else timezone.localtime()
+    now = (moment.weekday(), moment.time())
+    position = bisect_right(schedule, now, key=lambda lesson: (lesson['day_index'], lesson['start_time']))
+
+    current = None
+    if position:
+        lesson = schedule[position - 1]
+        if lesson['day_index'] == now[0] and lesson['end_time'] > now[1]:
+            current = lesson
+    upcoming = schedule[position] if position < len(schedule) else schedule[0]
+    return current, upcoming
+
+
+def _ical_text(value):
+    return str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def schedule_ical(schedule, name):
+    """
+    Render a schedule as an iCalendar feed of weekly recurring events,
+    starting from the current week. Times are floating local times.
+    """
+    today = timezone.localdate()
+    monday = today - timedelta(days=today.weekday())
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%SZ')
+
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//School Management System//Timetable//EN',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{_ical_text(name)}',
+    ]
+    for lesson in schedule:
+        day = monday + timedelta(days=lesson['day_index'])
+        start = datetime.combine(day, lesson['start_time'])
+        end = datetime.combine(day, lesson['end_time'])
+        summary = f"{lesson['subject']} - {lesson['class_name']}"
+        lines += [
+            'BEGIN:VEVENT',
+            f"UID:timetable-{lesson['id']}@schoolmanagement",
+            f'DTSTAMP:{stamp}',
+            f"DTSTART:{start.strftime('%Y%m%dT%H%M%S')}",
+            f"DTEND:{end.strftime('%Y%m%dT%H%M%S')}",
+            f"RRULE:FREQ=WEEKLY;BYDAY={ICAL_DAYS[lesson['day_index']]}",
+            f'SUMMARY:{_ical_text(summary)}',
+            f"DESCRIPTION:{_ical_text(lesson['teacher_name'])}",
+        ]
+        if lesson['room']:
+            lines.append(f"LOCATION:{_ical_text(lesson['room'])}")
+        lines.append('END:VEVENT')
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(lines) + '\r\n'
@@ -0,0 +1,248 @@
+import re
+from collections import namedtuple
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Student, Staff, Guardian
+
+# FTS5 virtual table created by migration 0010 on SQLite
+SEARCH_TABLE = 'schoolmanagement_search'
+
+# Each indexed person is one row whose rowid encodes what it points at:
+# rowid = pk * KIND_SLOTS + kind code. Updates and deletes are then rowid
+# lookups rather than scans of the index.
+KINDS = {'student': 1, 'staff': 2, 'guardian': 3}
+KIND_NAMES = {code: kind for kind, code in KINDS.items()}
+KIND_SLOTS = 4
+
+# bm25() column weights: name, identifiers, contact, extra
+COLUMN_WEIGHTS = (10.0, 8.0, 3.0, 1.0)
+
+INDEX_BATCH_SIZE = 2000
+
+SearchResult = namedtuple('SearchResult', ['kind', 'object_id', 'name', 'identifiers', 'extra', 'score'])
+
+_fts_available = None
+
+
+def fts_available():
+    """Whether the FTS5 search table exists on the default database."""
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = connection.vendor == 'sqlite' and SEARCH_TABLE in connection.introspection.table_names()
+    return _fts_available
+
+
+def _rowid(kind, pk):
+    return pk * KIND_SLOTS + KINDS[kind]
+
+
+def _join(*values):
+    return ' '.join(str(value) for value in values if value)
+
+
+def _student_document(student):
+    user = student.user
+    return (
+        _rowid('student', student.pk),
+        _join(user.first_name, user.last_name),
+        _join(student.admission_number, student.student_id, user.username),
+        _join(user.email, student.phone_number, user.phone),
+        str(student.current_class) if student.current_class_id else '',
+    )
+
+
+def _staff_document(staff):
+    user = staff.user
+    return (
+        _rowid('staff', staff.pk),
+        _join(user.first_name, user.last_name),
+        _join(staff.staff_id, user.username),
+        _join(user.email, staff.phone, user.phone),
+        staff.get_role_display(),
+    )
+
+
+def _guardian_document(guardian):
+    return (
+        _rowid('guardian', guardian.pk),
+        _join(guardian.first_name, guardian.last_name),
+        _join(guardian.guardian_number, guardian.user.username if guardian.user_id else ''),
+        _join(guardian.email, guardian.phone),
+        guardian.get_relationship_display(),
+    )
+
+
+DOCUMENTS = {
+    'student': (Student.objects.select_related('user', 'current_class'), _student_document),
+    'staff': (Staff.objects.select_related('user'), _staff_document),
+    'guardian': (Guardian.objects.select_related('user'), _guardian_document),
+}
+
+
+def _write(rows, delete_ids):
+    table = connection.ops.quote_name(SEARCH_TABLE)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(delete_ids), 500):
+            batch = delete_ids[start:start + 500]
+            cursor.execute(f"DELETE FROM {table} WHERE rowid IN ({', '.join(['%s'] * len(batch))})", batch)
+        if rows:
+            cursor.executemany(
+                f"INSERT INTO {table} (rowid, name, identifiers, contact, extra) VALUES (%s, %s, %s, %s, %s)",
+                rows,
+            )
+
+
+def index_objects(kind, pks):
+    """(Re)index the people of one kind with the given primary keys, dropping any that no longer exist."""
+    if not fts_available():
+        return
+    pks = list(pks)
+    if not pks:
+        return
+    queryset, document = DOCUMENTS[kind]
+    rows = [document(obj) for obj in queryset.filter(pk__in=pks)]
+    _write(rows, [_rowid(kind, pk) for pk in pks])
+
+
+def remove_object(kind, pk):
+    if fts_available():
+        _write([], [_rowid(kind, pk)])
+
+
+def rebuild_index():
+    """
+    Rebuild the whole index from the Student, Staff and Guardian tables.
+    Returns {kind: rows indexed}.
+    """
+    if not fts_available():
+        return {}
+    table = connection.ops.quote_name(SEARCH_TABLE)
+    counts = {}
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table}")
+        for kind, (queryset, document) in DOCUMENTS.items():
+            counts[kind] = 0
+            batch = []
+            for obj in queryset.order_by('pk').iterator(chunk_size=INDEX_BATCH_SIZE):
+                batch.append(document(obj))
+                if len(batch) >= INDEX_BATCH_SIZE:
+                    _write(batch, [])
+                    counts[kind] += len(batch)
+                    batch = []
+            _write(batch, [])
+            counts[kind] += len(batch)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+    return counts
+
+
+def _match_expression(query):
+    """
+    Turn free text into an FTS5 query: every word must match, as a prefix.
+    Words are quoted, so identifiers like ADM-2024-0001 become phrase prefixes.
+    """
+    words = [word.replace('"', '""') for word in re.findall(r'[^\s"]+', query)]
+    return ' AND '.join(f'"{word}"*' for word in words)
+
+
+def _fts_search(query, kinds, limit):
+    expression = _match_expression(query)
+    if not expression:
+        return []
+    table = connection.ops.quote_name(SEARCH_TABLE)
+    sql = (
+        f"SELECT rowid, name, identifiers, extra, bm25({table}, {', '.join(map(str, COLUMN_WEIGHTS))}) AS score "
+        f"FROM {table} WHERE {table} MATCH %s"
+    )
+    params = [expression]
+    if kinds:
+        codes = [KINDS[kind] for kind in kinds]
+        sql += f" AND (rowid %% {KIND_SLOTS}) IN ({', '.join(['%s'] * len(codes))})"
+        params += codes
+    sql += " ORDER BY score"
+    if limit:
+        sql += " LIMIT %s"
+        params.append(limit)
+
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(sql, params)
+        except OperationalError:
+            # Malformed query syntax; treat as no match rather than an error page
+            return []
+        rows = cursor.fetchall()
+    return [
+        SearchResult(KIND_NAMES[rowid % KIND_SLOTS], rowid // KIND_SLOTS, name, identifiers, extra, score)
+        for rowid, name, identifiers, extra, score in rows
+    ]
+
+
+FALLBACK_FIELDS = {
+    'student': ['user__first_name', 'user__last_name', 'user__username', 'user__email',
+                'admission_number', 'student_id', 'phone_number'],
+    'staff': ['user__first_name', 'user__last_name', 'user__username', 'user__email', 'staff_id', 'phone'],
+    'guardian': ['first_name', 'last_name', 'email', 'phone', 'guardian_number'],
+}
+
+
+def _fallback_queryset(words, kind):
+    """The people of one kind matching every word somewhere, by LIKE."""
+    queryset, _ = DOCUMENTS[kind]
+    for word in words:
+        match = Q()
+        for field in FALLBACK_FIELDS[kind]:
+            match |= Q(**{f'{field}__icontains': word})
+        queryset = queryset.filter(match)
+    return queryset
+
+
+def _fallback_search(query, kinds, limit):
+    """LIKE-based search for databases without the FTS5 table."""
+    words = query.split()
+    if not words:
+        return []
+    results = []
+    for kind in kinds or KINDS:
+        _, document = DOCUMENTS[kind]
+        queryset = _fallback_queryset(words, kind)
+        for obj in queryset[:limit] if limit else queryset:
+            _, name, identifiers, _, extra = document(obj)
+            results.append(SearchResult(kind, obj.pk, name, identifiers, extra, 0.0))
+    return results[:limit] if limit else results
+
+
+def search(query, kinds=None, limit=50):
+    """
+    Search students, staff and guardians by name, email, phone, admission,
+    staff or guardian number and class. Returns SearchResults, best first.
+    `kinds` limits the search to some of 'student', 'staff' and 'guardian'.
+    """
+    query = (query or '').strip()
+    if not query:
+        return []
+    if fts_available():
+        return _fts_search(query, kinds, limit)
+    return _fallback_search(query, kinds, limit)
+
+
+def search_filter(query, kind):
+    """
+    Q matching every person of one kind that the query finds, for
+    filtering querysets such as admin changelists. The matches stay in
+    the database as a subquery, so there is no cap on their number.
+    """
+    query = (query or '').strip()
+    if not fts_available():
+        return Q(pk__in=_fallback_queryset(query.split(), kind).values('pk'))
+    expression = _match_expression(query)
+    if not expression:
+        return Q(pk__in=[])
+    table = connection.ops.quote_name(SEARCH_TABLE)
+    return Q(pk__in=RawSQL(
+        f"SELECT rowid / {KIND_SLOTS} FROM {table} WHERE {table} MATCH %s AND rowid %% {KIND_SLOTS} = %s",
+        (expression, KINDS[kind]),
+    ))
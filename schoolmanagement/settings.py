@@ -39,6 +39,7 @@ AUTHENTICATION_BACKENDS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'schoolmanagement.middleware.ReplicaPinningMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -78,8 +79,67 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Keep connections open across requests, checking them before reuse
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
+# Read replica for reports, exports and history pages (views decorated with
+# replica_reads). Locally it is an SQLite snapshot of the primary made by
+# `manage.py refresh_replica`; run that before enabling it, and again (e.g.
+# from cron) to bring it up to date. Sessions read from the primary after
+# they write until the next refresh.
+# DATABASES['replica'] = {
+#     'ENGINE': 'django.db.backends.sqlite3',
+#     'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+#     # A refresh replaces the file, which open connections would not see
+#     'CONN_MAX_AGE': 0,
+#     # The snapshot stays in rollback-journal mode; see routers.refresh_replica
+#     'PRAGMAS': {'busy_timeout': 5000, 'mmap_size': 268435456, 'cache_size': -65536},
+#     'TEST': {'MIRROR': 'default'},
+# }
+DATABASE_ROUTERS = ['schoolmanagement.routers.ReplicaRouter']
+
+# PRAGMAs run on every new SQLite connection (signals.configure_sqlite_connection);
+# a database can override them with a 'PRAGMAS' entry of its own. busy_timeout
+# (ms) makes writers queue for the lock instead of failing with "database is
+# locked".
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'mmap_size': 268435456,  # 256 MB
+    'cache_size': -65536,  # Negative means KiB: 64 MB
+}
+# The journal mode is stored in the database file, so it is not set per
+# connection: run `manage.py sqlite_journal_mode wal` once on a deployment's
+# database. WAL lets readers work while a teacher saves a register. These are
+# added on connections to a database in WAL mode.
+SQLITE_WAL_PRAGMAS = {
+    'synchronous': 'normal',  # Cannot corrupt in WAL mode; a power cut may lose the last commits
+}
+
+
+# Cache for dashboard metrics and timetable schedules. Entries are invalidated
+# by signals, so every worker process must share the same cache: the
+# local-memory cache only suits a single process (e.g. runserver); with several
+# workers use the file-based cache below or a shared cache server.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'schoolmanagement',
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+        },
+    }
+}
+# CACHES = {
+#     'default': {
+#         'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#         'LOCATION': os.path.join(BASE_DIR, 'cache'),
+#         'OPTIONS': {
+#             'MAX_ENTRIES': 2000,
+#         },
+#     }
+# }
 
 
 # Password validation
@@ -115,6 +175,31 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Background threads making profile picture thumbnails (see thumbnail_service)
+THUMBNAIL_WORKERS = 2
+
+# Academic calendar: ((start month, start day), (end month, end day)) of each term
+ACADEMIC_TERMS = {
+    1: ((1, 1), (4, 30)),
+    2: ((5, 1), (8, 31)),
+    3: ((9, 1), (12, 31)),
+}
+
+# Timetable periods: period number -> (start time, end time)
+TIMETABLE_PERIOD_TIMES = {
+    '1': ('08:00', '08:40'),
+    '2': ('08:40', '09:20'),
+    '3': ('09:20', '10:00'),
+    '4': ('10:30', '11:10'),
+    '5': ('11:10', '11:50'),
+    '6': ('11:50', '12:30'),
+    '7': ('14:00', '14:40'),
+    '8': ('14:40', '15:20'),
+}
+
+# Subjects that must be taught in a specialist room: subject code -> list of rooms
+TIMETABLE_SUBJECT_ROOMS = {}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Student, Staff, Guardian
+from django.conf import settings
+from .models import Student, Staff, Guardian, FeeStructure, Exam, ExamResult, Timetable, Class
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -26,3 +28,261 @@ def save_user_profile(sender, instance, **kwargs):
         instance.staff.save()
     elif hasattr(instance, 'guardian'):
         instance.guardian.save()
+
+@receiver(post_save, sender=FeeStructure)
+def invoice_new_fee_structure(sender, instance, created, **kwargs):
+    """
+    Signal to raise pending fee obligations for the whole class
+    when a new active FeeStructure is created.
+    """
+    if created and instance.is_active:
+        from .fee_service import generate_term_invoices
+        generate_term_invoices(instance)
+
+@receiver(post_save, sender=ExamResult)
+@receiver(post_delete, sender=ExamResult)
+def invalidate_result_rankings(sender, instance, **kwargs):
+    """
+    Signal to drop the stored class rankings of an exam's term
+    whenever one of its results changes.
+    """
+    from .ranking_service import invalidate_rankings
+    invalidate_rankings(instance.exam)
+
+@receiver(pre_save, sender=Exam)
+def remember_exam_term(sender, instance, raw=False, **kwargs):
+    """
+    Signal to note the date and class an exam had before this save, so
+    the rankings of the term it leaves can be dropped as well.
+    """
+    if instance.pk and not raw:
+        instance._previous_term = Exam.objects.filter(pk=instance.pk).only('date', 'class_level').first()
+
+@receiver(post_save, sender=Exam)
+def invalidate_exam_rankings(sender, instance, created, **kwargs):
+    """
+    Signal to drop the stored class rankings when an exam's
+    date or marks change, in its old term too if it moved.
+    """
+    if not created:
+        from .ranking_service import invalidate_rankings
+        invalidate_rankings(instance)
+        previous = getattr(instance, '_previous_term', None)
+        if previous and (previous.date, previous.class_level_id) != (instance.date, instance.class_level_id):
+            invalidate_rankings(previous)
+
+@receiver(post_save, sender=ExamResult)
+@receiver(post_delete, sender=ExamResult)
+def invalidate_result_statistics(sender, instance, **kwargs):
+    """
+    Signal to drop the cached statistics of an exam whenever
+    one of its results changes.
+    """
+    from .statistics_service import invalidate_statistics
+    invalidate_statistics([instance.exam_id])
+
+@receiver(post_save, sender=Exam)
+def invalidate_exam_statistics(sender, instance, created, **kwargs):
+    """
+    Signal to drop the cached statistics when an exam's total
+    or passing marks change.
+    """
+    if not created:
+        from .statistics_service import invalidate_statistics
+        invalidate_statistics([instance.pk])
+
+@receiver(post_save, sender=ExamResult)
+@receiver(post_delete, sender=ExamResult)
+def update_result_trends(sender, instance, **kwargs):
+    """
+    Signal to refresh the student's performance trends
+    whenever one of their results changes.
+    """
+    from .trend_service import update_trends
+    update_trends([instance.student_id])
+
+@receiver(post_save, sender=Exam)
+def update_exam_trends(sender, instance, created, **kwargs):
+    """
+    Signal to refresh the trends of every student who sat an exam
+    when its date or total marks change.
+    """
+    if not created:
+        from .trend_service import update_trends
+        update_trends(instance.results.values_list('student_id', flat=True))
+
+@receiver(post_save, sender=Timetable)
+@receiver(post_delete, sender=Timetable)
+def invalidate_timetable_schedules(sender, instance, **kwargs):
+    """
+    Signal to mark the cached class and teacher schedules stale
+    whenever a timetable entry changes.
+    """
+    from .schedule_service import invalidate_schedules
+    invalidate_schedules()
+
+@receiver(post_save)
+@receiver(post_delete)
+@receiver(m2m_changed)
+def invalidate_dashboard_metrics(sender, action=None, **kwargs):
+    """
+    Signal to mark cached dashboard data and fragments built on the
+    changed model (or many-to-many link) stale.
+    """
+    from .dashboard_service import DASHBOARD_MODELS, invalidate_dashboard
+    if action and not action.startswith('post_'):
+        return
+    meta = sender._meta
+    if meta.app_label == 'schoolmanagement' and meta.model_name in DASHBOARD_MODELS:
+        invalidate_dashboard(meta.model_name)
+
+SEARCH_KINDS = {Student: 'student', Staff: 'staff', Guardian: 'guardian'}
+
+# User fields copied into the search index entries of the user's profiles
+SEARCH_USER_FIELDS = {'first_name', 'last_name', 'username', 'email', 'phone'}
+# User fields shown in the autocomplete entries of the user's profiles
+AUTOCOMPLETE_USER_FIELDS = {'first_name', 'last_name', 'username'}
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Staff)
+@receiver(post_save, sender=Guardian)
+def index_person(sender, instance, **kwargs):
+    """
+    Signal to refresh a student, staff member or guardian
+    in the full-text search index.
+    """
+    from .search_service import index_objects
+    index_objects(SEARCH_KINDS[sender], [instance.pk])
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Staff)
+@receiver(post_delete, sender=Guardian)
+def unindex_person(sender, instance, **kwargs):
+    """
+    Signal to drop a deleted person from the full-text search index.
+    """
+    from .search_service import remove_object
+    remove_object(SEARCH_KINDS[sender], instance.pk)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def index_user_profiles(sender, instance, created, **kwargs):
+    """
+    Signal to refresh the search index entries of a user's profiles
+    when their name, username or email changes.
+    """
+    update_fields = kwargs.get('update_fields')
+    if created or (update_fields is not None and not SEARCH_USER_FIELDS & update_fields):
+        # e.g. the last_login update on every login
+        return
+    from .search_service import index_objects
+    for model, kind in SEARCH_KINDS.items():
+        index_objects(kind, model.objects.filter(user=instance).values_list('pk', flat=True))
+
+@receiver(post_save, sender=Class)
+def index_class_students(sender, instance, created, **kwargs):
+    """
+    Signal to refresh the indexed class name of a renamed class's students.
+    """
+    if not created:
+        from .search_service import index_objects
+        index_objects('student', instance.current_students.values_list('pk', flat=True))
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Staff)
+@receiver(post_save, sender=Guardian)
+def refresh_autocomplete_person(sender, instance, **kwargs):
+    """
+    Signal to update a saved student, staff member or guardian
+    in the in-memory autocomplete index.
+    """
+    from .autocomplete_service import refresh_person
+    refresh_person(SEARCH_KINDS[sender], instance.pk)
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Staff)
+@receiver(post_delete, sender=Guardian)
+def remove_autocomplete_person(sender, instance, **kwargs):
+    """
+    Signal to drop a deleted person from the autocomplete index.
+    """
+    from .autocomplete_service import remove_person
+    remove_person(SEARCH_KINDS[sender], instance.pk)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def refresh_autocomplete_user(sender, instance, created, **kwargs):
+    """
+    Signal to update the autocomplete entries of a user's
+    student or staff profile when their name changes.
+    """
+    update_fields = kwargs.get('update_fields')
+    if created or (update_fields is not None and not AUTOCOMPLETE_USER_FIELDS & update_fields):
+        return
+    from .autocomplete_service import refresh_person
+    for model, kind in SEARCH_KINDS.items():
+        if model is not Guardian:
+            for pk in model.objects.filter(user=instance).values_list('pk', flat=True):
+                refresh_person(kind, pk)
+
+@receiver(m2m_changed, sender=Student.guardians.through)
+def refresh_autocomplete_guardians(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Signal to update which guardians may look up a student
+    when guardians are linked to or unlinked from students.
+    """
+    if not action.startswith('post_'):
+        return
+    from .autocomplete_service import invalidate_autocomplete, refresh_person
+    if action == 'post_clear' and reverse:
+        # The cleared guardian's students are no longer known here
+        invalidate_autocomplete()
+        return
+    student_ids = pk_set if reverse else [instance.pk]
+    for pk in student_ids or ():
+        refresh_person('student', pk)
+
+@receiver(post_save, sender=Class)
+def refresh_autocomplete_class(sender, instance, created, **kwargs):
+    """
+    Signal to reload the autocomplete index when a class is renamed,
+    since every student entry shows its class.
+    """
+    if not created:
+        from .autocomplete_service import invalidate_autocomplete
+        invalidate_autocomplete()
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """
+    Signal to apply the SQLite PRAGMAs from settings to each new connection:
+    the database's own 'PRAGMAS' entry if it has one, else SQLITE_PRAGMAS,
+    plus SQLITE_WAL_PRAGMAS when the file is in WAL mode. The journal mode
+    itself is left to `manage.py sqlite_journal_mode`.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    with connection.cursor() as cursor:
+        if pragmas is None:
+            pragmas = dict(getattr(settings, 'SQLITE_PRAGMAS', {}))
+            cursor.execute('PRAGMA journal_mode')
+            if cursor.fetchone()[0] == 'wal':
+                pragmas.update(getattr(settings, 'SQLITE_WAL_PRAGMAS', {}))
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Staff)
+def make_profile_thumbnails(sender, instance, update_fields=None, **kwargs):
+    """
+    Signal to make thumbnails of a new or changed profile picture
+    in the background once the save commits.
+    """
+    if update_fields is not None and 'profile_picture' not in update_fields:
+        return
+    picture = instance.profile_picture
+    if not picture:
+        return
+    from .thumbnail_service import schedule_thumbnails, thumbnail_of
+    if thumbnail_of(picture.name) is None:
+        schedule_thumbnails(picture.name)
@@ -0,0 +1,188 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.db.backends.signals import connection_created
+
+from .models import Attendance, StudentClass
+
+# SQLite's own defaults with Django's: rollback journal, full sync, the
+# sqlite3 module's 5 s busy handler and a new connection per request
+UNTUNED = {'pragmas': {'journal_mode': 'delete', 'synchronous': 'full'}, 'conn_max_age': 0}
+
+# Registers are marked for days from here on, clear of any real attendance
+FIRST_DAY = date(2100, 1, 1)
+
+StressResult = namedtuple('StressResult', [
+    'label', 'seconds', 'commits', 'locked', 'reads', 'read_errors', 'p50_ms', 'p95_ms', 'connections',
+])
+
+
+def tuned_profile():
+    """
+    The PRAGMAs and connection reuse configured in settings for the default
+    database, once it has been switched to WAL with `sqlite_journal_mode`.
+    """
+    default = settings.DATABASES[DEFAULT_DB_ALIAS]
+    pragmas = default.get('PRAGMAS') or {
+        **getattr(settings, 'SQLITE_PRAGMAS', {}), **getattr(settings, 'SQLITE_WAL_PRAGMAS', {}),
+    }
+    return {
+        'pragmas': {'journal_mode': 'wal', **pragmas},
+        'conn_max_age': default.get('CONN_MAX_AGE', 0),
+    }
+
+
+def copy_database(directory=None):
+    """Snapshot the SQLite default database into a temporary file, so the test never touches real data."""
+    primary = connections[DEFAULT_DB_ALIAS]
+    if primary.vendor != 'sqlite':
+        raise ValueError('The attendance stress test runs on SQLite only.')
+    primary.ensure_connection()
+    handle, path = tempfile.mkstemp(suffix='.sqlite3', dir=directory)
+    os.close(handle)
+    target = sqlite3.connect(path)
+    try:
+        primary.connection.backup(target)
+    finally:
+        target.close()
+    return path
+
+
+def class_registers(count):
+    """(class id, student ids) of the `count` largest classes: the registers teachers mark."""
+    registers = {}
+    for class_id, student_id in StudentClass.objects.filter(is_active=True).values_list('class_level_id', 'student_id'):
+        registers.setdefault(class_id, []).append(student_id)
+    largest = sorted(registers.items(), key=lambda item: -len(item[1]))[:count]
+    if not largest:
+        raise ValueError('No classes with students to mark; run generate_synthetic_data first.')
+    return largest
+
+
+class AttendanceStress:
+    """
+    Writer threads save whole class registers the way mark_attendance does
+    (one upsert per register, in a transaction) while reader threads page
+    through attendance history. After each transaction a thread ends its
+    "request", so its connection is closed or kept as CONN_MAX_AGE says.
+    Each run() gets a database alias of its own on the copied file.
+    """
+
+    def __init__(self, path, registers, writers=8, readers=2, registers_per_writer=20, seed=0):
+        self.path = path
+        self.registers = registers
+        self.writers = writers
+        self.readers = readers
+        self.registers_per_writer = registers_per_writer
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._first_day = FIRST_DAY
+
+    def _add_alias(self, label, profile):
+        alias = f'attendance_stress_{label}'
+        connections.settings[alias] = {
+            **connections.settings[DEFAULT_DB_ALIAS],
+            'NAME': self.path,
+            'CONN_MAX_AGE': profile['conn_max_age'],
+            'CONN_HEALTH_CHECKS': profile['conn_max_age'] != 0,
+            'PRAGMAS': profile['pragmas'],
+        }
+        # Changing the journal mode needs the only connection to the file
+        connections[alias].ensure_connection()
+        connections[alias].close()
+        return alias
+
+    def _count(self, stats, key, value=1):
+        with self._lock:
+            stats[key] += value
+
+    def _writer(self, alias, number, first_day, stats):
+        rng = random.Random(self.seed * 1000 + number)
+        statuses = [status for status, _ in Attendance.ATTENDANCE_STATUS]
+        for run in range(self.registers_per_writer):
+            class_id, student_ids = rng.choice(self.registers)
+            day = first_day + timedelta(days=number * self.registers_per_writer + run)
+            records = [
+                Attendance(student_id=student_id, class_level_id=class_id, date=day, status=rng.choice(statuses))
+                for student_id in student_ids
+            ]
+            started = time.perf_counter()
+            try:
+                with transaction.atomic(using=alias):
+                    Attendance.objects.using(alias).bulk_create(
+                        records,
+                        update_conflicts=True,
+                        unique_fields=['student', 'class_level', 'date'],
+                        update_fields=['status', 'updated_at'],
+                    )
+            except OperationalError:
+                self._count(stats, 'locked')
+            else:
+                with self._lock:
+                    stats['latencies'].append((time.perf_counter() - started) * 1000)
+            connections[alias].close_if_unusable_or_obsolete()
+        connections[alias].close()
+
+    def _reader(self, alias, stop, stats):
+        rng = random.Random(self.seed)
+        while not stop.is_set():
+            _, student_ids = rng.choice(self.registers)
+            try:
+                list(Attendance.objects.using(alias).filter(student_id=rng.choice(student_ids)).order_by('-date', '-id')[:20])
+                self._count(stats, 'reads')
+            except OperationalError:
+                self._count(stats, 'read_errors')
+            connections[alias].close_if_unusable_or_obsolete()
+        connections[alias].close()
+
+    def run(self, label, profile):
+        """
+        Run every thread once against the copy with `profile`. Each run marks
+        days of its own, so every run inserts as many rows. Returns a StressResult.
+        """
+        alias = self._add_alias(label, profile)
+        first_day = self._first_day
+        self._first_day += timedelta(days=self.writers * self.registers_per_writer)
+        stats = {'locked': 0, 'latencies': [], 'reads': 0, 'read_errors': 0, 'connections': 0}
+
+        def count_connection(sender, connection, **kwargs):
+            if connection.alias == alias:
+                self._count(stats, 'connections')
+
+        stop = threading.Event()
+        writers = [
+            threading.Thread(target=self._writer, args=(alias, number, first_day, stats))
+            for number in range(self.writers)
+        ]
+        readers = [threading.Thread(target=self._reader, args=(alias, stop, stats)) for _ in range(self.readers)]
+        connection_created.connect(count_connection, weak=False)
+        started = time.perf_counter()
+        try:
+            for thread in readers + writers:
+                thread.start()
+            for thread in writers:
+                thread.join()
+            stop.set()
+            for thread in readers:
+                thread.join()
+        finally:
+            connection_created.disconnect(count_connection)
+        seconds = time.perf_counter() - started
+
+        latencies = sorted(stats['latencies'])
+
+        def percentile(fraction):
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))], 1) if latencies else None
+
+        return StressResult(
+            label, round(seconds, 2), len(latencies), stats['locked'], stats['reads'], stats['read_errors'],
+            percentile(0.5), percentile(0.95), stats['connections'],
+        )
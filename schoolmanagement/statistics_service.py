@@ -0,0 +1,83 @@
+import numpy as np
+from django.db import transaction
+
+from .archive_service import history
+from .models import ExamStatistics
+
+# Width of a histogram bucket as a percentage of the exam's total marks
+HISTOGRAM_BUCKET = 10
+
+
+def _summarise(exam, marks):
+    """Build an unsaved ExamStatistics for `exam` from a numpy array of marks."""
+    stats = ExamStatistics(exam=exam, result_count=len(marks))
+    total = float(exam.total_marks)
+    buckets = 100 // HISTOGRAM_BUCKET
+    if not len(marks):
+        stats.histogram = [0] * buckets
+        return stats
+
+    q1, median, q3, p90 = np.percentile(marks, [25, 50, 75, 90])
+    stats.pass_count = int(np.count_nonzero(marks >= float(exam.passing_marks)))
+    stats.pass_rate = round(stats.pass_count * 100 / len(marks), 2)
+    stats.mean = round(float(marks.mean()), 2)
+    stats.median = round(float(median), 2)
+    stats.std_dev = round(float(marks.std()), 2)
+    stats.minimum = float(marks.min())
+    stats.maximum = float(marks.max())
+    stats.q1 = round(float(q1), 2)
+    stats.q3 = round(float(q3), 2)
+    stats.p90 = round(float(p90), 2)
+    counts, _ = np.histogram(marks * 100 / total if total else marks, bins=buckets, range=(0, 100))
+    stats.histogram = counts.tolist()
+    return stats
+
+
+def compute_statistics(exams):
+    """
+    Compute and store statistics for `exams` from a single values_list fetch
+    of all their marks, live or archived. Returns {exam_id: ExamStatistics}.
+    """
+    exams = {exam.pk: exam for exam in exams}
+    if not exams:
+        return {}
+    rows = history('examresult', ('exam_id', 'marks_obtained'), exam_id__in=exams).order_by('exam_id')
+    data = np.array([(exam_id, float(marks)) for exam_id, marks in rows], dtype=float).reshape(-1, 2)
+
+    # Rows arrive sorted by exam, so each exam's marks are one contiguous slice
+    exam_ids, starts = np.unique(data[:, 0], return_index=True)
+    bounds = dict(zip(exam_ids.astype(int).tolist(), zip(starts, list(starts[1:]) + [len(data)])))
+
+    statistics = {}
+    for exam_id, exam in exams.items():
+        start, end = bounds.get(exam_id, (0, 0))
+        statistics[exam_id] = _summarise(exam, data[start:end, 1])
+
+    with transaction.atomic():
+        ExamStatistics.objects.filter(exam_id__in=exams).delete()
+        ExamStatistics.objects.bulk_create(statistics.values())
+    return statistics
+
+
+def get_statistics(exams):
+    """
+    Return {exam_id: ExamStatistics} for `exams`, reading the cache table and
+    computing only the exams whose statistics were invalidated.
+    """
+    exams = list(exams)
+    cached = {
+        stats.exam_id: stats
+        for stats in ExamStatistics.objects.filter(exam__in=exams)
+    }
+    missing = [exam for exam in exams if exam.pk not in cached]
+    cached.update(compute_statistics(missing))
+    return cached
+
+
+def get_exam_statistics(exam):
+    return get_statistics([exam])[exam.pk]
+
+
+def invalidate_statistics(exam_ids):
+    """Drop cached statistics for the given exam ids after their results change."""
+    ExamStatistics.objects.filter(exam_id__in=exam_ids).delete()
@@ -0,0 +1,507 @@
+import random
+import time
+from datetime import date, time as clock, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .autocomplete_service import invalidate_autocomplete
+from .dashboard_service import DASHBOARD_MODELS, invalidate_dashboard
+from .models import (
+    Attendance, Class, ClassSubject, Exam, ExamResult, FeePayment, FeeStructure,
+    Guardian, Staff, Student, StudentClass, Subject,
+)
+from .search_service import rebuild_index
+from .timetable_generator import generate_timetable, save_timetable
+from .utils import get_term_dates, next_sequence_number
+
+User = get_user_model()
+
+FIRST_NAMES = [
+    'Achieng', 'Akinyi', 'Amani', 'Baraka', 'Brian', 'Cynthia', 'Daniel', 'Esther', 'Faith', 'Grace',
+    'Hassan', 'Imani', 'James', 'Joy', 'Kamau', 'Kevin', 'Lilian', 'Mercy', 'Mohamed', 'Mwangi',
+    'Naliaka', 'Nekesa', 'Njeri', 'Otieno', 'Peter', 'Purity', 'Rehema', 'Samuel', 'Sharon', 'Tabitha',
+    'Wanjiku', 'Wafula', 'Yusuf', 'Zawadi', 'Collins', 'Dorcas', 'Evans', 'Halima', 'Ian', 'Moses',
+]
+LAST_NAMES = [
+    'Achieng', 'Barasa', 'Chege', 'Cheruiyot', 'Gitau', 'Hassan', 'Kariuki', 'Kimani', 'Kipchoge', 'Kiprono',
+    'Kamau', 'Korir', 'Macharia', 'Maina', 'Mutua', 'Mwangi', 'Njoroge', 'Ochieng', 'Odhiambo', 'Omondi',
+    'Onyango', 'Otieno', 'Owino', 'Rotich', 'Ruto', 'Wafula', 'Wambua', 'Wanjala', 'Waweru', 'Were',
+]
+STREAMS = [
+    'East', 'West', 'North', 'South', 'Red', 'Blue', 'Green', 'Yellow', 'Gold', 'Silver',
+    'Lion', 'Eagle', 'Falcon', 'Cheetah', 'Zebra', 'Kudu', 'Rhino', 'Impala', 'Heron', 'Crane',
+]
+# (name, code, core?) - every class takes the core subjects and ELECTIVES_PER_CLASS others
+SUBJECTS = [
+    ('Mathematics', 'MAT', True), ('English', 'ENG', True), ('Kiswahili', 'KIS', True),
+    ('Biology', 'BIO', True), ('Chemistry', 'CHE', True), ('Physics', 'PHY', False),
+    ('History', 'HIS', False), ('Geography', 'GEO', False), ('Christian Religious Education', 'CRE', False),
+    ('Business Studies', 'BST', False), ('Agriculture', 'AGR', False), ('Computer Studies', 'CMP', False),
+]
+ELECTIVES_PER_CLASS = 2
+CORE_LESSONS = 6
+ELECTIVE_LESSONS = 5
+# Teachers are given classes up to this many periods a week
+TEACHER_LOAD = 30
+
+ATTENDANCE_WEIGHTS = (('present', 0.92), ('late', 0.04), ('absent', 0.03), ('excused', 0.01))
+PAYMENT_METHODS = ['mpesa', 'mpesa', 'mpesa', 'bank_transfer', 'cash', 'cheque']
+
+CHUNK_SIZE = 5000
+
+
+class SyntheticDataError(Exception):
+    """Raised when a synthetic school cannot be generated into the current database."""
+
+
+class SchoolSize:
+    """How much data to generate."""
+
+    def __init__(self, classes=50, students=20000, guardians=30000, exams_per_term=2):
+        self.classes = classes
+        self.students = students
+        self.guardians = guardians
+        self.exams_per_term = exams_per_term
+
+
+def _chunks(rows, size=CHUNK_SIZE):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _insert(model, rows):
+    """bulk_create an iterable of unsaved objects in chunks, in one transaction. Returns the row count."""
+    count = 0
+    with transaction.atomic():
+        for chunk in _chunks(rows):
+            model.objects.bulk_create(chunk)
+            count += len(chunk)
+    return count
+
+
+def _create(model, objects):
+    """Like _insert(), for objects whose primary keys are needed afterwards. Returns the objects."""
+    objects = list(objects)
+    _insert(model, objects)
+    return objects
+
+
+def _insert_values(model, fields, rows):
+    """
+    Insert tuples of database-ready values for `fields` with executemany.
+    Used for the tables with millions of rows, where building model instances
+    for bulk_create costs more than the inserts. Auto timestamps are filled in
+    with the time of the call. Returns the row count.
+    """
+    opts = model._meta
+    stamps = [
+        field for field in opts.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    now = stamps[0].get_db_prep_save(timezone.now(), connection) if stamps else None
+    columns = [opts.get_field(name).column for name in fields] + [field.column for field in stamps]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        connection.ops.quote_name(opts.db_table),
+        ', '.join(connection.ops.quote_name(column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    count = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for chunk in _chunks(rows):
+            cursor.executemany(sql, [row + (now,) * len(stamps) for row in chunk])
+            count += len(chunk)
+    return count
+
+
+def school_days(year, until=None):
+    """Weekdays in the teaching part of each term; the last month of a term is holiday."""
+    days = []
+    for term in (1, 2, 3):
+        start, end = get_term_dates(year, term)
+        day = start
+        while day <= end and (until is None or day <= until):
+            if day.weekday() < 5 and day.month != end.month:
+                days.append((term, day))
+            day += timedelta(days=1)
+    return days
+
+
+class SchoolGenerator:
+    """
+    Builds a synthetic school with bulk inserts. Everything is drawn from a
+    random.Random seeded with `seed`, so the same seed, size and year give
+    the same school. Attendance, results and payments stop at `until`.
+    """
+
+    def __init__(self, size, seed=0, year=None, until=None, password='password', log=None):
+        self.size = size
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.year = year or timezone.localdate().year
+        self.until = until or min(timezone.localdate(), date(self.year, 12, 31))
+        self.domain = f'school{seed}.example.org'
+        # One hash for every account: hashing per user would take longer than the rest of the run
+        self.password = make_password(password)
+        self.log = log or (lambda message: None)
+        self.counts = {}
+
+    def _step(self, name, function):
+        started = time.perf_counter()
+        result = function()
+        self.log(f'{name}: {self.counts.get(name, 0)} row(s) in {time.perf_counter() - started:.1f}s')
+        return result
+
+    def _name(self):
+        return self.random.choice(FIRST_NAMES), self.random.choice(LAST_NAMES)
+
+    def _users(self, kind, names, roles):
+        now = timezone.now()
+        return _create(User, [
+            User(
+                username=f'{kind}{index}@{self.domain}',
+                email=f'{first.lower()}.{last.lower()}.{kind}{index}@{self.domain}',
+                first_name=first,
+                last_name=last,
+                role=role,
+                password=self.password,
+                date_joined=now,
+            )
+            for index, ((first, last), role) in enumerate(zip(names, roles), start=1)
+        ])
+
+    def generate(self):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise SyntheticDataError('The database must return primary keys from bulk inserts.')
+        if User.objects.filter(username__endswith=f'@{self.domain}').exists():
+            raise SyntheticDataError(f'A school was already generated with seed {self.seed}; use another seed.')
+        self._step('admin', self.create_admin)
+        self._step('subjects', self.create_subjects)
+        self._step('classes', self.create_classes)
+        self._step('staff', self.create_staff)
+        self._step('timetable', self.create_timetable)
+        self._step('guardians', self.create_guardians)
+        self._step('students', self.create_students)
+        self._step('attendance', self.create_attendance)
+        self._step('exam results', self.create_exams)
+        self._step('fee payments', self.create_fees)
+        self._step('search index', self.refresh_derived_data)
+        return self.counts
+
+    def create_admin(self):
+        """A superuser, admin@<domain>, for the admin site and the admin dashboard."""
+        User.objects.create(
+            username=f'admin@{self.domain}',
+            email=f'admin@{self.domain}',
+            first_name='School',
+            last_name='Administrator',
+            role='admin',
+            is_staff=True,
+            is_superuser=True,
+            password=self.password,
+            date_joined=timezone.now(),
+        )
+        self.counts['admin'] = 1
+
+    def create_subjects(self):
+        existing = {subject.code: subject for subject in Subject.objects.filter(code__in=[code for _, code, _ in SUBJECTS])}
+        missing = [Subject(name=name, code=code) for name, code, _ in SUBJECTS if code not in existing]
+        for subject in _create(Subject, missing):
+            existing[subject.code] = subject
+        self.subjects = [existing[code] for _, code, _ in SUBJECTS]
+        self.core = [subject for subject, (_, _, core) in zip(self.subjects, SUBJECTS) if core]
+        self.electives = [subject for subject, (_, _, core) in zip(self.subjects, SUBJECTS) if not core]
+        self.counts['subjects'] = len(missing)
+
+    def create_classes(self):
+        classes = []
+        for index in range(self.size.classes):
+            level, stream = index % 4 + 1, index // 4
+            suffix = f' {stream // len(STREAMS) + 1}' if stream >= len(STREAMS) else ''
+            classes.append(Class(
+                name=f'Form {level}',
+                stream=f'{STREAMS[stream % len(STREAMS)]}{suffix}',
+                description=f'Synthetic class (seed {self.seed})',
+            ))
+        self.classes = _create(Class, classes)
+        self.counts['classes'] = len(self.classes)
+
+    def create_staff(self):
+        """Teachers for every class subject at TEACHER_LOAD periods each, plus office staff."""
+        class_subjects = []
+        for class_level in self.classes:
+            subjects = [(subject, CORE_LESSONS) for subject in self.core]
+            subjects += [(subject, ELECTIVE_LESSONS) for subject in self.random.sample(self.electives, ELECTIVES_PER_CLASS)]
+            class_subjects += [(class_level, subject, lessons) for subject, lessons in subjects]
+
+        # Give each subject's classes to as few teachers as the load allows:
+        # teacher_of[i] indexes `teaching`, the subject of each teacher
+        teaching, teacher_of, load = [], [], {}
+        for class_level, subject, lessons in class_subjects:
+            teacher, periods = load.get(subject.pk, (None, TEACHER_LOAD))
+            if periods + lessons > TEACHER_LOAD:
+                teacher, periods = len(teaching), 0
+                teaching.append(subject)
+            load[subject.pk] = (teacher, periods + lessons)
+            teacher_of.append(teacher)
+
+        roles = ['teacher'] * len(teaching) + ['admin', 'accountant', 'accountant', 'librarian']
+        users = self._users('staff', [self._name() for _ in roles], roles)
+        prefix = f'STF-{self.year}-'
+        start = next_sequence_number(Staff.objects.all(), 'staff_id', prefix)
+        staff = _create(Staff, [
+            Staff(
+                user=user,
+                staff_id=f'{prefix}{start + index:04d}',
+                role=user.role,
+                gender=self.random.choice('MF'),
+                date_joined=date(self.year - self.random.randint(0, 15), self.random.randint(1, 12), 1),
+            )
+            for index, user in enumerate(users)
+        ])
+        self.teachers = staff[:len(teaching)]
+        self.office = staff[len(teaching):]
+        Staff.subjects.through.objects.bulk_create([
+            Staff.subjects.through(staff_id=teacher.pk, subject_id=subject.pk)
+            for teacher, subject in zip(self.teachers, teaching)
+        ])
+
+        _insert(ClassSubject, (
+            ClassSubject(class_level=class_level, subject=subject, teacher=self.teachers[teacher], lessons_per_week=lessons)
+            for (class_level, subject, lessons), teacher in zip(class_subjects, teacher_of)
+        ))
+        self.class_subjects = {}
+        for (class_level, subject, _), teacher in zip(class_subjects, teacher_of):
+            self.class_subjects.setdefault(class_level.pk, []).append((subject, self.teachers[teacher]))
+        self.counts['staff'] = len(staff)
+
+    def create_timetable(self):
+        entries, unplaced = generate_timetable(classes=self.classes, seed=self.seed)
+        save_timetable(entries)
+        if unplaced:
+            self.log(f'timetable: {len(unplaced)} lesson(s) could not be placed')
+        self.counts['timetable'] = len(entries)
+
+    def create_guardians(self):
+        names = [self._name() for _ in range(self.size.guardians)]
+        users = self._users('guardian', names, ['guardian'] * len(names))
+        prefix = f'GDN-{self.year}-'
+        start = next_sequence_number(Guardian.objects.all(), 'guardian_number', prefix)
+        relationships = ['mother', 'father', 'mother', 'father', 'aunt', 'uncle', 'grandmother', 'other']
+        self.guardians = _create(Guardian, [
+            Guardian(
+                user=user,
+                guardian_number=f'{prefix}{start + index:04d}',
+                first_name=user.first_name,
+                last_name=user.last_name,
+                email=user.email,
+                phone=f'07{self.random.randint(0, 99999999):08d}',
+                address=f'P.O. Box {self.random.randint(1, 9999)}',
+                relationship=self.random.choice(relationships),
+                is_primary=index % 2 == 0,
+            )
+            for index, user in enumerate(users)
+        ])
+        self.counts['guardians'] = len(self.guardians)
+
+    def create_students(self):
+        names = [self._name() for _ in range(self.size.students)]
+        users = self._users('student', names, ['student'] * len(names))
+        by_level = {}
+        for class_level in self.classes:
+            by_level.setdefault(int(class_level.name.split()[-1]), []).append(class_level)
+
+        # Form N students were admitted N - 1 years ago, numbered per admission year
+        next_number = {}
+        students = []
+        for index, user in enumerate(users):
+            level = index % 4 + 1
+            classes = by_level.get(level) or self.classes
+            class_level = classes[(index // 4) % len(classes)]
+            admitted = self.year - level + 1
+            if admitted not in next_number:
+                next_number[admitted] = next_sequence_number(Student.objects.all(), 'admission_number', f'ADM-{admitted}-')
+            admission_number = f'ADM-{admitted}-{next_number[admitted]:04d}'
+            next_number[admitted] += 1
+            students.append(Student(
+                user=user,
+                student_id=admission_number,
+                admission_number=admission_number,
+                date_of_birth=date(admitted - 14, self.random.randint(1, 12), self.random.randint(1, 28)),
+                gender=self.random.choice('MF'),
+                admission_date=date(admitted, 1, 10),
+                current_class=class_level,
+            ))
+        self.students = _create(Student, students)
+        _insert(StudentClass, (
+            StudentClass(student=student, class_level_id=student.current_class_id, admission_date=student.admission_date)
+            for student in self.students
+        ))
+
+        # Every guardian gets at least one child; some children get a second guardian or share one with a sibling
+        links = set()
+        guardian_count = len(self.guardians)
+        for index, student in enumerate(self.students):
+            if guardian_count:
+                links.add((student.pk, self.guardians[index % guardian_count].pk))
+        for index in range(len(self.students), guardian_count):
+            links.add((self.random.choice(self.students).pk, self.guardians[index].pk))
+        for _ in range(len(self.students) // 10):
+            if guardian_count:
+                links.add((self.random.choice(self.students).pk, self.random.choice(self.guardians).pk))
+        Through = Student.guardians.through
+        _insert(Through, (Through(student_id=student_id, guardian_id=guardian_id) for student_id, guardian_id in sorted(links)))
+
+        # A per-student ability keeps each student's marks and attendance consistent
+        self.ability = {student.pk: self.random.gauss(0, 1) for student in self.students}
+        self.counts['students'] = len(self.students)
+
+    def _recorders(self):
+        return {
+            class_id: subjects[0][1].user_id
+            for class_id, subjects in self.class_subjects.items()
+        }
+
+    def create_attendance(self):
+        recorders = self._recorders()
+        statuses = [status for status, _ in ATTENDANCE_WEIGHTS]
+        weights = [weight for _, weight in ATTENDANCE_WEIGHTS]
+        choices = self.random.choices
+        date_field = Attendance._meta.get_field('date')
+        days = [date_field.get_db_prep_save(day, connection) for _, day in school_days(self.year, self.until)]
+
+        def rows():
+            for student in self.students:
+                class_id = student.current_class_id
+                recorder = recorders.get(class_id)
+                # Weaker students miss a little more school
+                absence = max(0.2, 1 - self.ability[student.pk] * 0.5)
+                student_weights = [weights[0]] + [weight * absence for weight in weights[1:]]
+                for day, status in zip(days, choices(statuses, student_weights, k=len(days))):
+                    yield (student.pk, class_id, day, status, '', recorder)
+
+        self.counts['attendance'] = _insert_values(
+            Attendance, ['student', 'class_level', 'date', 'status', 'remarks', 'recorded_by'], rows()
+        )
+
+    def create_exams(self):
+        exams = []
+        for term in (1, 2, 3):
+            days = [day for exam_term, day in school_days(self.year) if exam_term == term]
+            for sitting in range(self.size.exams_per_term):
+                day = days[min(len(days) - 1, (sitting + 1) * len(days) // (self.size.exams_per_term + 1))]
+                exam_type = 'final' if sitting == self.size.exams_per_term - 1 else 'midterm'
+                for class_level in self.classes:
+                    for offset, (subject, _) in enumerate(self.class_subjects.get(class_level.pk, [])):
+                        exam_day = day + timedelta(days=offset % 3)
+                        exams.append(Exam(
+                            name=f'Term {term} {exam_type.title()} {self.year}',
+                            exam_type=exam_type,
+                            class_level=class_level,
+                            subject=subject,
+                            date=exam_day,
+                            start_time=clock(9, 0),
+                            end_time=clock(11, 0),
+                        ))
+        exams = _create(Exam, exams)
+        self.counts['exams'] = len(exams)
+
+        taken = [exam for exam in exams if exam.date <= self.until]
+        by_class = {}
+        for exam in taken:
+            by_class.setdefault(exam.class_level_id, []).append(exam)
+        difficulty = {exam.pk: self.random.gauss(0, 6) for exam in taken}
+        marks_field = ExamResult._meta.get_field('marks_obtained')
+
+        def rows():
+            for student in self.students:
+                ability = self.ability[student.pk]
+                for exam in by_class.get(student.current_class_id, ()):
+                    score = 58 + ability * 14 + difficulty[exam.pk] + self.random.gauss(0, 8)
+                    marks = Decimal(str(round(min(100.0, max(0.0, score)), 2)))
+                    grade = ExamResult.calculate_grade(marks)
+                    yield (exam.pk, student.pk, marks_field.get_db_prep_save(marks, connection), grade, '')
+
+        self.counts['exam results'] = _insert_values(
+            ExamResult, ['exam', 'student', 'marks_obtained', 'grade', 'remarks'], rows()
+        )
+
+    def create_fees(self):
+        structures = []
+        for term in (1, 2, 3):
+            start, _ = get_term_dates(self.year, term)
+            if start > self.until:
+                continue
+            for class_level in self.classes:
+                level = int(class_level.name.split()[-1])
+                structures.append(FeeStructure(
+                    name=f'Term {term} Tuition',
+                    class_level=class_level,
+                    amount=Decimal(15000 + 2500 * level),
+                    due_date=start + timedelta(days=30),
+                    term=term,
+                    year=self.year,
+                ))
+        structures = _create(FeeStructure, structures)
+        by_class = {}
+        for structure in structures:
+            by_class.setdefault(structure.class_level_id, []).append(structure)
+        clerks = [staff.user_id for staff in self.office if staff.role == 'accountant'] or [None]
+        receipt_prefix = f'SYN{self.seed}-{self.year}-'
+
+        def rows():
+            receipt = 0
+            for student in self.students:
+                # Stronger students' families tend to pay more reliably too
+                reliability = 0.75 + self.ability[student.pk] * 0.1
+                for structure in by_class.get(student.current_class_id, ()):
+                    draw = self.random.random()
+                    if draw < reliability:
+                        paid = structure.amount
+                    elif draw < reliability + 0.15:
+                        paid = (structure.amount * Decimal(self.random.randint(20, 80)) / 100).quantize(Decimal('1'))
+                    else:
+                        paid = Decimal('0')
+                    if paid >= structure.amount:
+                        status = 'paid'
+                    elif paid > 0:
+                        status = 'partial'
+                    else:
+                        status = 'overdue' if structure.due_date < self.until else 'pending'
+                    payment_date = receipt_number = None
+                    if paid:
+                        receipt += 1
+                        receipt_number = f'{receipt_prefix}{receipt:07d}'
+                        payment_date = min(self.until, structure.due_date - timedelta(days=self.random.randint(-20, 25)))
+                    yield FeePayment(
+                        student_id=student.pk,
+                        fee_structure_id=structure.pk,
+                        amount_due=structure.amount,
+                        amount_paid=paid,
+                        payment_date=payment_date,
+                        payment_method=self.random.choice(PAYMENT_METHODS),
+                        receipt_number=receipt_number,
+                        status=status,
+                        created_by_id=self.random.choice(clerks),
+                    )
+
+        self.counts['fee payments'] = _insert(FeePayment, rows())
+
+    def refresh_derived_data(self):
+        # bulk_create sends no signals, so refresh what they would have kept up to date
+        self.counts['search index'] = sum(rebuild_index().values())
+        invalidate_autocomplete()
+        invalidate_dashboard(*DASHBOARD_MODELS)
+
+
+def generate_school(size, seed=0, year=None, until=None, password='password', log=None):
+    """Generate a synthetic school and return {step: rows created}. See SchoolGenerator."""
+    return SchoolGenerator(size, seed=seed, year=year, until=until, password=password, log=log).generate()
@@ -0,0 +1,15 @@
+from django import template
+
+from ..thumbnail_service import thumbnail_url
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail(image, size='small'):
+    """
+    URL of a cached thumbnail of an image field, e.g.
+    {{ student.profile_picture|thumbnail:'medium' }}. Shows the original
+    until the thumbnail has been made.
+    """
+    return thumbnail_url(image, size)
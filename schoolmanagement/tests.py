@@ -0,0 +1,223 @@
+import glob
+import os
+from datetime import time, timedelta
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .dashboard_service import guardian_children_summaries
+from .models import (
+    Attendance, Class, Exam, ExamResult, FeePayment, FeeStructure, Guardian, Student, StudentClass, Subject, User,
+)
+from .pagination import InvalidCursor, KeysetPaginator
+from .sqlite_stress import UNTUNED, AttendanceStress, class_registers, copy_database, tuned_profile
+
+
+class GuardianChildrenSummariesTests(TestCase):
+    """The guardian dashboard must not run extra queries per child."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.localdate()
+        cls.class_level = Class.objects.create(name='Form 1', stream='East')
+        cls.subject = Subject.objects.create(name='Mathematics', code='MAT')
+        cls.past_exam = Exam.objects.create(
+            name='Opener', class_level=cls.class_level, subject=cls.subject,
+            date=cls.today - timedelta(days=7), start_time=time(8), end_time=time(10), total_marks=Decimal('100'),
+        )
+        Exam.objects.create(
+            name='Midterm', class_level=cls.class_level, subject=cls.subject,
+            date=cls.today + timedelta(days=7), start_time=time(8), end_time=time(10),
+        )
+        cls.fee_structure = FeeStructure.objects.create(
+            name='Tuition', class_level=cls.class_level, amount=Decimal('1000'),
+            due_date=cls.today, term=1, year=cls.today.year,
+        )
+        cls.guardian = Guardian.objects.create(
+            first_name='Grace', last_name='Otieno', email='grace.otieno@example.org',
+            phone='0700000000', address='P.O. Box 1',
+        )
+
+    def add_child(self, number):
+        user = User.objects.create_user(
+            email=f'child{number}@example.org', username=f'child{number}', password='password',
+            first_name=f'Child {number}', last_name='Otieno',
+        )
+        student = Student.objects.create(
+            user=user, student_id=f'ADM-{number:04d}', current_class=self.class_level,
+        )
+        student.guardians.add(self.guardian)
+        for days in range(3):
+            Attendance.objects.create(
+                student=student, class_level=self.class_level, date=self.today - timedelta(days=days),
+            )
+        ExamResult.objects.create(exam=self.past_exam, student=student, marks_obtained=Decimal('65'))
+        FeePayment.objects.create(student=student, fee_structure=self.fee_structure, amount_paid=Decimal('200'))
+
+    def summary_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            summaries = guardian_children_summaries(self.guardian)
+            for summary in summaries:
+                # Everything the dashboard template reads from a summary
+                [record.class_level.name for record in summary.recent_attendance]
+                [result.exam.subject.name for result in summary.recent_results]
+                [exam.subject.name for exam in summary.upcoming_exams]
+                [fee.fee_structure.name for fee in summary.fee_dues]
+                summary.student.user.get_full_name()
+                str(summary.student.current_class)
+        return len(queries), summaries
+
+    def test_query_count_does_not_grow_with_children(self):
+        self.add_child(1)
+        one_child, summaries = self.summary_queries()
+        self.assertEqual(len(summaries), 1)
+
+        for number in range(2, 11):
+            self.add_child(number)
+        with self.assertNumQueries(one_child):
+            _, summaries = self.summary_queries()
+        self.assertEqual(len(summaries), 10)
+        for summary in summaries:
+            self.assertEqual(len(summary.recent_results), 1)
+            self.assertEqual(len(summary.fee_dues), 1)
+            self.assertEqual(summary.attendance_summary['total'], 3)
+
+
+class GuardianSummaryApiTests(TestCase):
+    """The guardian summary API's ETag must change when a listed result is deleted."""
+
+    def setUp(self):
+        today = timezone.localdate()
+        class_level = Class.objects.create(name='Form 2', stream='West')
+        subject = Subject.objects.create(name='English', code='ENG')
+        user = User.objects.create_user(
+            email='pupil@example.org', username='pupil', password='password', first_name='Pupil', last_name='Kamau',
+        )
+        self.student = Student.objects.create(user=user, student_id='ADM-0100', current_class=class_level)
+        self.results = []
+        for days in (21, 14, 7):
+            exam = Exam.objects.create(
+                name=f'Quiz {days}', class_level=class_level, subject=subject,
+                date=today - timedelta(days=days), start_time=time(8), end_time=time(9), total_marks=Decimal('100'),
+            )
+            self.results.append(ExamResult.objects.create(exam=exam, student=self.student, marks_obtained=Decimal('70')))
+        guardian_user = User.objects.create_user(
+            email='parent@example.org', username='parent', password='password', role='guardian',
+        )
+        guardian = Guardian.objects.create(
+            user=guardian_user, first_name='Parent', last_name='Kamau', email='parent@example.org',
+            phone='0711111111', address='P.O. Box 2',
+        )
+        self.student.guardians.add(guardian)
+        self.client.force_login(guardian_user)
+        self.url = reverse('schoolmanagement:guardian_student_summary_api', args=[self.student.pk])
+
+    def test_deleting_an_older_result_changes_the_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Not the newest row, so the latest updated_at stays the same
+        self.results[0].delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['recent_results']), 2)
+
+
+class KeysetPaginatorTests(TestCase):
+    """Cursor pages must visit every row once, in order, including rows that tie on the date."""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        class_level = Class.objects.create(name='Form 4', stream='North')
+        # Three students share each date, so most page boundaries fall inside a tie
+        for number in range(3):
+            user = User.objects.create_user(
+                email=f'pager{number}@example.org', username=f'pager{number}', password='password',
+            )
+            student = Student.objects.create(user=user, student_id=f'ADM-02{number:02d}', current_class=class_level)
+            for days in range(3):
+                Attendance.objects.create(student=student, class_level=class_level, date=today - timedelta(days=days))
+
+    def paginator(self, queryset=None, name='attendance_history'):
+        queryset = Attendance.objects.all() if queryset is None else queryset
+        return KeysetPaginator(queryset, ('-date', '-id'), 2, name)
+
+    def test_cursors_walk_forward_and_back_through_ties(self):
+        expected = list(Attendance.objects.order_by('-date', '-id').values_list('pk', flat=True))
+        paginator = self.paginator()
+
+        pages = [paginator.page()]
+        self.assertFalse(pages[0].has_previous())
+        # Bounded, so a cursor that repeats a page fails instead of looping
+        while pages[-1].has_next() and len(pages) < 9:
+            pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertEqual([[record.pk for record in page] for page in pages], [expected[i:i + 2] for i in range(0, 9, 2)])
+
+        backwards = [pages[-1]]
+        while backwards[-1].has_previous() and len(backwards) < 9:
+            backwards.append(paginator.page(backwards[-1].previous_cursor))
+        self.assertEqual(
+            [[record.pk for record in page] for page in backwards],
+            [[record.pk for record in page] for page in reversed(pages)],
+        )
+        self.assertTrue(backwards[-1].has_next())
+
+    def test_empty_first_page(self):
+        page = self.paginator(Attendance.objects.none()).page()
+        self.assertFalse(page)
+        self.assertFalse(page.has_other_pages())
+
+    def test_cursor_from_another_listing_is_rejected(self):
+        cursor = self.paginator().page().next_cursor
+        other = self.paginator(name='exam_results')
+        with self.assertRaises(InvalidCursor):
+            other.page(cursor)
+        with self.assertRaises(InvalidCursor):
+            self.paginator().page(cursor[:-2])
+        self.assertEqual(list(other.get_page(cursor)), list(other.page()))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'The attendance stress test runs on SQLite only.')
+class AttendanceStressTests(TransactionTestCase):
+    """The tuned SQLite settings must fail fewer register saves than SQLite's defaults."""
+
+    def setUp(self):
+        today = timezone.localdate()
+        for number in range(2):
+            class_level = Class.objects.create(name='Form 3', stream=f'Stream {number}')
+            for index in range(30):
+                user = User.objects.create_user(
+                    email=f'stress{number}-{index}@example.org', username=f'stress{number}-{index}',
+                )
+                student = Student.objects.create(
+                    user=user, student_id=f'ADM-{number}{index:03d}', current_class=class_level,
+                )
+                StudentClass.objects.create(student=student, class_level=class_level, admission_date=today)
+        self.path = copy_database()
+
+    def tearDown(self):
+        for alias in [alias for alias in connections.settings if alias.startswith('attendance_stress_')]:
+            connections[alias].close()
+            del connections.settings[alias]
+        for leftover in glob.glob(f'{glob.escape(self.path)}*'):
+            os.remove(leftover)
+
+    def test_tuned_profile_has_fewer_locked_saves(self):
+        stress = AttendanceStress(self.path, class_registers(2), writers=4, readers=2, registers_per_writer=5)
+        # SQLite itself does not wait for locks at all; the sqlite3 module's 5 s
+        # wait only hides the contention at this small scale
+        untuned = stress.run('untuned', {**UNTUNED, 'pragmas': {**UNTUNED['pragmas'], 'busy_timeout': 0}})
+        tuned = stress.run('tuned', tuned_profile())
+
+        self.assertGreater(untuned.locked, 0)
+        self.assertLess(tuned.locked, untuned.locked)
+        self.assertEqual(tuned.commits + tuned.locked, 4 * 5)
@@ -0,0 +1,200 @@
+import hashlib
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.urls import reverse
+from PIL import Image, ImageOps, features
+
+from .models import Staff, Student, Thumbnail, User
+
+logger = logging.getLogger(__name__)
+
+# Square thumbnails, in pixels: twice the largest size each is shown at, for high-DPI screens
+THUMBNAIL_SIZES = {
+    'small': 96,  # Avatars in the navigation, rosters and lists
+    'medium': 320,  # Profile pages
+}
+THUMBNAIL_DIR = 'thumbnails'
+THUMBNAIL_QUALITY = 80
+# Change to regenerate every thumbnail, e.g. after changing the sizes or quality
+THUMBNAIL_VERSION = 1
+
+CACHE_TIMEOUT = 60 * 60 * 24
+# Cached for pictures with no thumbnails yet, so pages showing them do not
+# query on every render. Scheduling or making the thumbnails replaces it;
+# the short timeout covers caches that other processes cannot see.
+NOT_YET = 'not-yet'
+NOT_YET_TIMEOUT = 60 * 5
+
+CONTENT_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+# Thumbnails never change once written, so browsers may keep them for a year
+CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+NAME_PATTERN = re.compile(r'^[0-9a-f]{32}-(?P<size>[a-z]+)\.(?P<extension>webp|jpeg)$')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def thumbnail_format():
+    return 'webp' if features.check('webp') else 'jpeg'
+
+
+def thumbnail_name(digest, size, extension):
+    """File name of a thumbnail; the same image always gets the same name, so it never changes."""
+    return f"{digest[:32]}-{size}.{extension}"
+
+
+def open_thumbnail(name):
+    """(file, content type) of a stored thumbnail. Raises FileNotFoundError for any other name."""
+    match = NAME_PATTERN.match(name)
+    if match is None or match['size'] not in THUMBNAIL_SIZES:
+        raise FileNotFoundError(name)
+    return default_storage.open(f'{THUMBNAIL_DIR}/{name}', 'rb'), CONTENT_TYPES[match['extension']]
+
+
+def _cache_key(source):
+    return f'thumbnail:{hashlib.md5(source.encode()).hexdigest()}'
+
+
+def _render(image, size, extension):
+    """One square thumbnail of an opened image, as encoded bytes."""
+    thumbnail = ImageOps.fit(image, (THUMBNAIL_SIZES[size],) * 2, Image.Resampling.LANCZOS)
+    if extension == 'jpeg' and thumbnail.mode != 'RGB':
+        thumbnail = thumbnail.convert('RGB')
+    output = BytesIO()
+    if extension == 'webp':
+        thumbnail.save(output, 'WEBP', quality=THUMBNAIL_QUALITY, method=4)
+    else:
+        thumbnail.save(output, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def generate_thumbnails(source, force=False):
+    """
+    Make every size of thumbnail for the image stored as `source` and
+    record it. Thumbnails of an identical image already on disk are
+    reused. Returns the Thumbnail, or None if there is no such file.
+    """
+    try:
+        with default_storage.open(source, 'rb') as original:
+            content = original.read()
+    except FileNotFoundError:
+        return None
+    digest = hashlib.sha256(f'{THUMBNAIL_VERSION}:'.encode() + content).hexdigest()
+    extension = thumbnail_format()
+
+    names = {size: f'{THUMBNAIL_DIR}/{thumbnail_name(digest, size, extension)}' for size in THUMBNAIL_SIZES}
+    missing = [size for size, name in names.items() if force or not default_storage.exists(name)]
+    if missing:
+        with Image.open(BytesIO(content)) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+            for size in missing:
+                if default_storage.exists(names[size]):
+                    default_storage.delete(names[size])
+                default_storage.save(names[size], ContentFile(_render(image, size, extension)))
+
+    thumbnail, _ = Thumbnail.objects.update_or_create(
+        source=source, defaults={'digest': digest, 'format': extension}
+    )
+    cache.set(_cache_key(source), (digest, extension), CACHE_TIMEOUT)
+    return thumbnail
+
+
+def _run(source):
+    try:
+        generate_thumbnails(source)
+    except Exception:
+        logger.exception('Could not make thumbnails of %s', source)
+    finally:
+        # Worker threads have connections of their own; do not leave them open
+        connection.close()
+
+
+def get_pool():
+    """The process-wide pool of threads making thumbnails. Pillow releases the GIL while it resizes."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2), thread_name_prefix='thumbnails',
+            )
+    return _pool
+
+
+def schedule_thumbnails(source):
+    """Make the thumbnails of `source` in the background once the current transaction commits."""
+    if source:
+        cache.delete(_cache_key(source))
+        transaction.on_commit(lambda: get_pool().submit(_run, source))
+
+
+def thumbnail_of(source):
+    """(digest, extension) of the thumbnails of `source`, or None if they have not been made yet."""
+    key = _cache_key(source)
+    found = cache.get(key)
+    if found is None:
+        found = Thumbnail.objects.filter(source=source).values_list('digest', 'format').first()
+        if found is None:
+            cache.set(key, NOT_YET, NOT_YET_TIMEOUT)
+            return None
+        cache.set(key, found, CACHE_TIMEOUT)
+    elif found == NOT_YET:
+        return None
+    return tuple(found)
+
+
+def thumbnail_url(image, size='small'):
+    """
+    URL of a thumbnail of an image field's file, falling back to the full
+    image until the thumbnail exists. Empty for an empty field.
+    """
+    if not image:
+        return ''
+    found = thumbnail_of(image.name)
+    if found is None:
+        return image.url
+    digest, extension = found
+    return reverse('schoolmanagement:thumbnail', args=[thumbnail_name(digest, size, extension)])
+
+
+def pictures():
+    """Storage names of every profile picture in use."""
+    names = set()
+    for model in (User, Staff, Student):
+        names.update(model.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+                     .values_list('profile_picture', flat=True))
+    return sorted(names)
+
+
+def backfill(force=False, workers=None, progress=None):
+    """
+    Make the thumbnails of every profile picture that has none (all of
+    them with `force`) across a thread pool. `progress(source, thumbnail)`
+    is called as each finishes. Returns the number of images processed.
+    """
+    done = set() if force else set(Thumbnail.objects.values_list('source', flat=True))
+    pending = [source for source in pictures() if source not in done]
+
+    def work(source):
+        try:
+            return source, generate_thumbnails(source, force=force)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=workers or getattr(settings, 'THUMBNAIL_WORKERS', 2)) as pool:
+        for source, thumbnail in pool.map(work, pending):
+            if progress:
+                progress(source, thumbnail)
+    return len(pending)
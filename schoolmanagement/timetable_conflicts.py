@@ -0,0 +1,168 @@
+from bisect import insort
+from collections import defaultdict, namedtuple
+
+from django.db.models import Q
+
+from .models import Timetable
+
+
+def _clock(value):
+    return value.strftime('%H:%M') if hasattr(value, 'strftime') else str(value)[:5]
+
+
+class Conflict(namedtuple('Conflict', ['kind', 'entry', 'other'])):
+    """Two timetable entries that overlap on the same day for one class, teacher or room."""
+
+    KINDS = {
+        'class': 'Class',
+        'teacher': 'Teacher',
+        'room': 'Room',
+    }
+
+    @property
+    def message(self):
+        entry, other = self.entry, self.other
+        if self.kind == 'class':
+            who = str(entry.class_level)
+        elif self.kind == 'teacher':
+            who = str(entry.teacher)
+        else:
+            who = f"Room {entry.room}"
+        return (
+            f"{who} is double-booked on {entry.get_day_display()}: "
+            f"{entry.subject} {_clock(entry.start_time)}-{_clock(entry.end_time)} overlaps "
+            f"{other.subject} for {other.class_level} {_clock(other.start_time)}-{_clock(other.end_time)}"
+        )
+
+
+class IntervalIndex:
+    """Time intervals kept sorted by start time, answering overlap queries."""
+
+    def __init__(self):
+        self._intervals = []
+
+    def add(self, start, end, entry):
+        insort(self._intervals, (start, end, id(entry), entry))
+
+    def overlapping(self, start, end):
+        """Entries whose [start, end) interval overlaps the given one."""
+        found = []
+        for other_start, other_end, _, entry in self._intervals:
+            if other_start >= end:
+                break
+            if other_end > start:
+                found.append(entry)
+        return found
+
+
+def _room_key(room):
+    return room.strip().lower() if room else None
+
+
+_to_time = Timetable._meta.get_field('start_time').to_python
+
+
+def _interval(entry):
+    return _to_time(entry.start_time), _to_time(entry.end_time)
+
+
+class ConflictIndex:
+    """
+    In-memory interval indexes of timetable entries per class, teacher and
+    room for each day. Adding n entries and checking each one on the way in
+    finds every conflict in a single pass.
+    """
+
+    def __init__(self, entries=()):
+        self._indexes = defaultdict(IntervalIndex)
+        for entry in entries:
+            self.add(entry)
+
+    def _keys(self, entry):
+        keys = [('class', entry.class_level_id), ('teacher', entry.teacher_id)]
+        room = _room_key(entry.room)
+        if room:
+            keys.append(('room', room))
+        return [(kind, value, entry.day) for kind, value in keys]
+
+    def add(self, entry):
+        start, end = _interval(entry)
+        for key in self._keys(entry):
+            self._indexes[key].add(start, end, entry)
+
+    def conflicts_for(self, entry):
+        """Conflicts between `entry` and the entries already in the index."""
+        start, end = _interval(entry)
+        conflicts = []
+        for key in self._keys(entry):
+            index = self._indexes.get(key)
+            if index is None:
+                continue
+            for other in index.overlapping(start, end):
+                if other is entry or (entry.pk and other.pk == entry.pk):
+                    continue
+                conflicts.append(Conflict(key[0], entry, other))
+        return conflicts
+
+
+def find_conflicts(entries):
+    """Return every conflict among `entries`, each pair reported once."""
+    index = ConflictIndex()
+    conflicts = []
+    for entry in entries:
+        conflicts.extend(index.conflicts_for(entry))
+        index.add(entry)
+    return conflicts
+
+
+def _existing_entries(entries, exclude_pks=()):
+    """
+    Saved entries that could clash with `entries`: those on the same days
+    sharing a class, teacher or room. Loaded with one query.
+    """
+    days = {entry.day for entry in entries}
+    classes = {entry.class_level_id for entry in entries}
+    teachers = {entry.teacher_id for entry in entries}
+    rooms = {entry.room.strip() for entry in entries if entry.room and entry.room.strip()}
+
+    match = Q(class_level_id__in=classes) | Q(teacher_id__in=teachers)
+    for room in rooms:
+        match |= Q(room__iexact=room)
+    return Timetable.objects.filter(match, day__in=days).exclude(
+        pk__in=[pk for pk in exclude_pks if pk]
+    ).select_related('class_level', 'subject', 'teacher__user')
+
+
+def validate_entries(entries, replace_existing=False):
+    """
+    Check a batch of (usually unsaved) entries against each other and against
+    the saved timetable in one pass. With `replace_existing`, saved entries of
+    the classes in the batch are ignored because the batch replaces them.
+    Returns the list of conflicts; an empty list means the batch is clash-free.
+    """
+    entries = list(entries)
+    if not entries:
+        return []
+    existing = _existing_entries(entries, exclude_pks=[entry.pk for entry in entries])
+    if replace_existing:
+        existing = existing.exclude(class_level_id__in={entry.class_level_id for entry in entries})
+
+    index = ConflictIndex(existing)
+    conflicts = []
+    for entry in entries:
+        conflicts.extend(index.conflicts_for(entry))
+        index.add(entry)
+    return conflicts
+
+
+def validate_entry(entry):
+    """Conflicts between a single entry and the saved timetable."""
+    return validate_entries([entry])
+
+
+def school_conflict_report():
+    """Every conflict in the saved timetable, from a single query."""
+    entries = Timetable.objects.select_related('class_level', 'subject', 'teacher__user').order_by(
+        'day', 'start_time'
+    )
+    return find_conflicts(entries)
@@ -0,0 +1,237 @@
+import heapq
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import ClassSubject, Timetable
+from .schedule_service import invalidate_schedules
+from .timetable_conflicts import _to_time, validate_entries
+
+DAYS = [day for day, _ in Timetable.DAY_CHOICES]
+PERIODS = [period for period, _ in Timetable.PERIOD_CHOICES]
+SLOTS = [(day, period) for day in range(len(DAYS)) for period in range(len(PERIODS))]
+
+# Eviction steps allowed per lesson before the search gives up
+MAX_STEPS_PER_LESSON = 200
+
+
+class TimetableGenerationError(Exception):
+    """Raised when the lessons asked for cannot fit in the weekly grid."""
+
+
+class Lesson:
+    """One period of a ClassSubject that still has to be given a slot (and room)."""
+
+    __slots__ = ('class_subject', 'class_id', 'subject_id', 'teacher_id', 'rooms', 'daily_limit',
+                 'slot', 'room', 'evictions')
+
+    def __init__(self, class_subject, rooms):
+        self.class_subject = class_subject
+        self.class_id = class_subject.class_level_id
+        self.subject_id = class_subject.subject_id
+        self.teacher_id = class_subject.teacher_id
+        self.rooms = rooms
+        # Spread the subject over the week: at most ceil(lessons / days) per day
+        self.daily_limit = -(-class_subject.lessons_per_week // len(DAYS))
+        self.slot = None
+        self.room = None
+        self.evictions = 0
+
+
+class TimetableSolver:
+    """
+    Place lessons on the day x period grid so that no class, teacher or room
+    is booked twice in the same slot.
+
+    Lessons are placed most-constrained first. Each one goes into the slot
+    that displaces the fewest (and least often displaced) lessons already
+    placed; displaced lessons go back on the queue. Slots of teachers and
+    rooms taken by classes outside the run are passed in as `blocked` and
+    are never used.
+    """
+
+    def __init__(self, lessons, blocked=(), seed=0):
+        self.lessons = lessons
+        self.blocked = set(blocked)
+        self.random = random.Random(seed)
+        self.at = {}
+        self.daily = defaultdict(int)
+
+    def _keys(self, lesson, slot, room):
+        keys = [('class', lesson.class_id, slot), ('teacher', lesson.teacher_id, slot)]
+        if room:
+            keys.append(('room', room, slot))
+        return keys
+
+    def _place(self, lesson, slot, room):
+        lesson.slot, lesson.room = slot, room
+        for key in self._keys(lesson, slot, room):
+            self.at[key] = lesson
+        self.daily[lesson.class_id, lesson.subject_id, slot[0]] += 1
+
+    def _remove(self, lesson):
+        for key in self._keys(lesson, lesson.slot, lesson.room):
+            del self.at[key]
+        self.daily[lesson.class_id, lesson.subject_id, lesson.slot[0]] -= 1
+        lesson.slot = lesson.room = None
+        lesson.evictions += 1
+
+    def _best_move(self, lesson):
+        best, best_cost = None, None
+        for slot in SLOTS:
+            if ('teacher', lesson.teacher_id, slot) in self.blocked:
+                continue
+            if self.daily[lesson.class_id, lesson.subject_id, slot[0]] >= lesson.daily_limit:
+                continue
+            for room in lesson.rooms:
+                if room and ('room', room, slot) in self.blocked:
+                    continue
+                displaced = {
+                    self.at[key] for key in self._keys(lesson, slot, room) if key in self.at
+                }
+                cost = sum(1 + other.evictions for other in displaced) + self.random.random()
+                if best_cost is None or cost < best_cost:
+                    best, best_cost = (slot, room, displaced), cost
+        return best
+
+    def _difficulty(self, lesson, load):
+        return (-len(lesson.rooms) if lesson.rooms != (None,) else 0) - load[lesson.teacher_id]
+
+    def solve(self, max_steps=None):
+        """Place every lesson. Returns the lessons that could not be placed."""
+        load = defaultdict(int)
+        for lesson in self.lessons:
+            load[lesson.teacher_id] += 1
+        queue = [(self._difficulty(lesson, load), index, lesson) for index, lesson in enumerate(self.lessons)]
+        heapq.heapify(queue)
+
+        steps = max_steps or MAX_STEPS_PER_LESSON * max(len(self.lessons), 1)
+        unplaced = []
+        counter = len(queue)
+        while queue and steps > 0:
+            steps -= 1
+            _, _, lesson = heapq.heappop(queue)
+            move = self._best_move(lesson)
+            if move is None:
+                unplaced.append(lesson)
+                continue
+            slot, room, displaced = move
+            for other in displaced:
+                self._remove(other)
+                counter += 1
+                heapq.heappush(queue, (self._difficulty(other, load), counter, other))
+            self._place(lesson, slot, room)
+        return unplaced + [lesson for _, _, lesson in queue]
+
+
+def _lessons(class_subjects, subject_rooms):
+    lessons = []
+    for class_subject in class_subjects:
+        rooms = tuple(subject_rooms.get(class_subject.subject.code, ())) or (None,)
+        lessons.extend(Lesson(class_subject, rooms) for _ in range(class_subject.lessons_per_week))
+    return lessons
+
+
+def _check_capacity(lessons):
+    """Fail fast when a class or teacher has more lessons than the week has periods."""
+    per_class, per_teacher = defaultdict(int), defaultdict(int)
+    for lesson in lessons:
+        per_class[lesson.class_subject.class_level] += 1
+        per_teacher[lesson.class_subject.teacher] += 1
+    problems = [
+        f"{owner} has {count} lessons but the week only has {len(SLOTS)} periods"
+        for owner, count in list(per_class.items()) + list(per_teacher.items())
+        if count > len(SLOTS)
+    ]
+    if problems:
+        raise TimetableGenerationError('; '.join(problems))
+
+
+def _blocked_slots(class_ids, teacher_ids, subject_rooms):
+    """Teacher and room slots already taken by the saved timetable of other classes."""
+    day_index = {day: index for index, day in enumerate(DAYS)}
+    period_index = {period: index for index, period in enumerate(PERIODS)}
+    rooms = {room for options in subject_rooms.values() for room in options}
+    blocked = set()
+    entries = Timetable.objects.exclude(class_level_id__in=class_ids).values_list('teacher_id', 'room', 'day', 'period')
+    for teacher_id, room, day, period in entries:
+        if day not in day_index or period not in period_index:
+            continue
+        slot = (day_index[day], period_index[period])
+        if teacher_id in teacher_ids:
+            blocked.add(('teacher', teacher_id, slot))
+        if room in rooms:
+            blocked.add(('room', room, slot))
+    return blocked
+
+
+def generate_timetable(classes=None, seed=0):
+    """
+    Build the weekly timetable for `classes` (all classes by default) from
+    their ClassSubject rows, taking `lessons_per_week` periods of each.
+    Subjects listed in settings.TIMETABLE_SUBJECT_ROOMS are put in one of
+    their rooms; period times come from settings.TIMETABLE_PERIOD_TIMES.
+
+    Returns (entries, unplaced): unsaved Timetable entries and the
+    ClassSubjects of any lessons that could not be fitted in.
+    """
+    subject_rooms = getattr(settings, 'TIMETABLE_SUBJECT_ROOMS', {})
+    class_subjects = ClassSubject.objects.filter(lessons_per_week__gt=0).select_related(
+        'class_level', 'subject', 'teacher__user'
+    ).order_by('class_level_id', 'subject_id')
+    if classes is not None:
+        class_subjects = class_subjects.filter(class_level__in=classes)
+
+    missing_teacher = [cs for cs in class_subjects if cs.teacher_id is None]
+    if missing_teacher:
+        raise TimetableGenerationError(
+            'No teacher assigned for ' + ', '.join(f"{cs.subject} in {cs.class_level}" for cs in missing_teacher)
+        )
+
+    lessons = _lessons(class_subjects, subject_rooms)
+    _check_capacity(lessons)
+    blocked = _blocked_slots(
+        {lesson.class_id for lesson in lessons}, {lesson.teacher_id for lesson in lessons}, subject_rooms
+    )
+    unplaced = TimetableSolver(lessons, blocked, seed=seed).solve()
+
+    times = {
+        period: (_to_time(start), _to_time(end))
+        for period, (start, end) in settings.TIMETABLE_PERIOD_TIMES.items()
+    }
+    entries = []
+    for lesson in lessons:
+        if lesson.slot is None:
+            continue
+        day, period = DAYS[lesson.slot[0]], PERIODS[lesson.slot[1]]
+        start_time, end_time = times[period]
+        entries.append(Timetable(
+            class_level_id=lesson.class_id,
+            subject_id=lesson.subject_id,
+            teacher_id=lesson.teacher_id,
+            day=day,
+            period=period,
+            start_time=start_time,
+            end_time=end_time,
+            room=lesson.room or '',
+        ))
+    return entries, [lesson.class_subject for lesson in unplaced]
+
+
+def save_timetable(entries):
+    """
+    Replace the saved timetable of the classes in `entries` with `entries`,
+    in one transaction. The batch is checked against the rest of the saved
+    timetable first; raises TimetableGenerationError on any clash.
+    """
+    conflicts = validate_entries(entries, replace_existing=True)
+    if conflicts:
+        raise TimetableGenerationError('; '.join(conflict.message for conflict in conflicts[:10]))
+    with transaction.atomic():
+        Timetable.objects.filter(class_level_id__in={entry.class_level_id for entry in entries}).delete()
+        Timetable.objects.bulk_create(entries, batch_size=500)
+        # bulk_create sends no signals, so invalidate the cached schedules here
+        invalidate_schedules()
+    return len(entries)
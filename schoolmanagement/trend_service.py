@@ -0,0 +1,97 @@
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+
+from .archive_service import history
+from .models import PerformanceTrend
+from .utils import get_term_for_date
+
+# Number of most recent scores the rolling average and slope are taken over
+TREND_WINDOW = 5
+
+
+def _trend(student_id, subject_id, history):
+    """Build an unsaved PerformanceTrend from a date-ordered list of (date, percentage)."""
+    scores = np.array([score for _, score in history], dtype=float)
+    recent = scores[-TREND_WINDOW:]
+    trend = PerformanceTrend(
+        student_id=student_id,
+        subject_id=subject_id,
+        exam_count=len(scores),
+        last_scores=[round(float(score), 2) for score in recent],
+        rolling_average=round(float(recent.mean()), 2),
+        slope=round(float(np.polyfit(np.arange(len(recent)), recent, 1)[0]), 2) if len(recent) > 1 else 0.0,
+    )
+
+    by_term = defaultdict(list)
+    for day, score in history:
+        year_term = get_term_for_date(day)
+        if year_term:
+            by_term[year_term].append(score)
+    if by_term:
+        terms = sorted(by_term)
+        trend.term_year, trend.term = terms[-1]
+        trend.term_average = round(float(np.mean(by_term[terms[-1]])), 2)
+        if len(terms) > 1:
+            trend.previous_term_average = round(float(np.mean(by_term[terms[-2]])), 2)
+            trend.term_change = round(trend.term_average - trend.previous_term_average, 2)
+    return trend
+
+
+def update_trends(student_ids):
+    """
+    Rebuild the trend rows of the given students from their own exam history.
+
+    Only these students' results are read, in one query, so the cost depends on
+    how many students changed rather than on the size of ExamResult. Results of
+    archived years are read as well, so the history survives archiving. Called
+    from the ExamResult signals for single saves and directly after bulk imports.
+    Returns the number of trend rows written.
+    """
+    student_ids = set(student_ids)
+    if not student_ids:
+        return 0
+    rows = history(
+        'examresult',
+        ('exam__date', 'exam__start_time', 'student_id', 'exam__subject_id', 'marks_obtained', 'exam__total_marks'),
+        student_id__in=student_ids,
+    ).order_by('exam__date', 'exam__start_time')
+
+    histories = defaultdict(list)
+    for day, _, student_id, subject_id, obtained, total in rows:
+        if not total:
+            continue
+        percentage = float(obtained) * 100 / float(total)
+        histories[(student_id, subject_id)].append((day, percentage))
+        histories[(student_id, None)].append((day, percentage))
+
+    trends = [_trend(student_id, subject_id, history) for (student_id, subject_id), history in histories.items()]
+    with transaction.atomic():
+        PerformanceTrend.objects.filter(student_id__in=student_ids).delete()
+        PerformanceTrend.objects.bulk_create(trends, batch_size=1000)
+    return len(trends)
+
+
+def trend_cohort(year, term, min_change=None, max_change=None, subject=None, class_level=None):
+    """
+    Trend rows for a term whose change against the previous term lies within
+    the given bounds, e.g. max_change=-10 for "average dropped by more than 10
+    points". `subject=None` compares averages across all subjects. Served from
+    the (term_year, term, term_change) index rather than the results table.
+    """
+    trends = PerformanceTrend.objects.filter(
+        term_year=year, term=term, subject=subject, term_change__isnull=False
+    )
+    if min_change is not None:
+        trends = trends.filter(term_change__gte=min_change)
+    if max_change is not None:
+        trends = trends.filter(term_change__lte=max_change)
+    if class_level is not None:
+        trends = trends.filter(student__current_class=class_level)
+    return trends.select_related('student__user', 'subject').order_by('term_change')
+
+
+def declining_students(year, term, drop=10, subject=None, class_level=None):
+    """Trend rows of students whose term average fell by more than `drop` points."""
+    return trend_cohort(year, term, subject=subject, class_level=class_level).filter(term_change__lt=-drop)
@@ -4,7 +4,7 @@ from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 from django.urls import path, include, reverse_lazy
 
-from . import views
+from . import views, guardian_views
 # from .views import (
 #     CustomLoginView,
 #     CustomPasswordResetForm, 
@@ -22,7 +22,7 @@ urlpatterns = [
     
     # Password Reset URLs
     path('password_reset/', auth_views.PasswordResetView.as_view(
-        template_name='auth/password_reset_form.html',
+        template_name='auth/password_reset.html',
         email_template_name='auth/password_reset_email.html',
         subject_template_name='auth/password_reset_subject.txt',
         success_url=reverse_lazy('schoolmanagement:password_reset_done')
@@ -44,41 +44,39 @@ urlpatterns = [
     # Dashboard
     path('dashboard/', views.dashboard, name='dashboard'),
     
-    # Profiles
-    path('profile/', views.profile_view, name='profile'),
-    path('profile/student/', views.student_profile, name='student_profile'),
-    path('profile/student/<int:student_id>/', views.student_detail, name='student_detail'),
-    path('profile/student/<int:student_id>/add_guardian/', views.add_guardian, name='add_guardian'),
-    path('profile/staff/', views.staff_profile, name='staff_profile'),
-    
     # Guardian URLs
-    path('guardian/', views.guardian_dashboard, name='guardian_dashboard'),
-    path('guardian/student/<int:student_id>/', views.student_detail, name='guardian_student_detail'),
-    path('guardian/attendance/<int:student_id>/', views.attendance_history, name='attendance_history'),
-    path('guardian/exams/<int:student_id>/', views.exam_results, name='exam_results'),
-    path('guardian/fees/<int:student_id>/', views.fee_payments, name='fee_payments'),
+    path('guardian/', guardian_views.guardian_dashboard, name='guardian_dashboard'),
+    path('guardian/student/<int:student_id>/', guardian_views.student_detail, name='guardian_student_detail'),
+    path('guardian/attendance/<int:student_id>/', guardian_views.attendance_history, name='attendance_history'),
+    path('guardian/exams/<int:student_id>/', guardian_views.exam_results, name='exam_results'),
+    path('api/guardian/dashboard/', guardian_views.dashboard_api, name='guardian_dashboard_api'),
+    path('api/guardian/student/<int:student_id>/', guardian_views.student_summary_api, name='guardian_student_summary_api'),
+    path('api/guardian/attendance/<int:student_id>/', guardian_views.attendance_history_api, name='attendance_history_api'),
+    path('api/guardian/exams/<int:student_id>/', guardian_views.exam_results_api, name='exam_results_api'),
     
     # Registration
-    path('register/student/', views.register_student, name='register_student'),
-    path('register/staff/', views.register_staff, name='register_staff'),
+    path('students/import/', views.import_students, name='import_students'),
     
     # Academics
-    path('exam/create/', views.create_exam, name='create_exam'),
-    
-    # Fees
-    path('fee/create/', views.create_fee_structure, name='create_fee_structure'),
+    path('exams/', views.exam_list, name='exam_list'),
+    path('exam/<int:exam_id>/', views.exam_detail, name='exam_detail'),
+    path('exam/<int:exam_id>/import-marks/', views.import_marks, name='import_marks'),
     
     # Attendance
     path('attendance/mark/<int:class_id>/', views.mark_attendance, name='mark_attendance'),
     
-    # Classes
-    path('class/<int:class_id>/', views.class_detail, name='class_detail'),
+    # Timetable
+    path('timetable/conflicts/', views.timetable_conflicts, name='timetable_conflicts'),
+    path('timetable/teacher/', views.teacher_schedule, name='teacher_schedule'),
+    path('timetable/teacher/<int:staff_id>/', views.teacher_schedule, name='teacher_schedule'),
+    path('timetable/class/<int:class_id>/', views.class_schedule, name='class_schedule'),
+    path('timetable/<str:kind>/<int:owner_id>/calendar.ics', views.schedule_calendar, name='schedule_calendar'),
+    
+    # Profile picture thumbnails
+    path('thumbnails/<str:name>', views.thumbnail, name='thumbnail'),
     
-    # Staff Management
-    path('staff/', views.staff_list, name='staff_list'),
-    path('staff/<int:staff_id>/', views.view_staff, name='view_staff'),
-    path('staff/<int:staff_id>/edit/', views.edit_staff, name='edit_staff'),
-    path('staff/<int:staff_id>/delete/', views.delete_staff, name='delete_staff'),
-    path('staff/<int:staff_id>/assign-subjects/', views.assign_subjects, name='assign_subjects'),
-    path('staff/<int:staff_id>/assign-classes/', views.assign_classes, name='assign_classes'),
+    # Search
+    path('search/', views.search, name='search'),
+    path('api/search/', views.search_api, name='search_api'),
+    path('api/autocomplete/', views.autocomplete_api, name='autocomplete_api'),
 ]
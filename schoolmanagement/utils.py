@@ -1,9 +1,24 @@
 import random
 import string
-from datetime import datetime
-from django.db.models import Max
+import time
+from datetime import date, datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.functions import Length
 from .models import Student, Staff, Guardian
 
+def next_sequence_number(queryset, field, prefix):
+    """
+    The number after the highest `prefix`NNNN identifier in `queryset`.
+    Longer identifiers sort first, so that 10000 comes after 9999.
+    """
+    last = queryset.filter(**{f'{field}__startswith': prefix}).annotate(
+        identifier_length=Length(field)
+    ).order_by('-identifier_length', f'-{field}').values_list(field, flat=True).first()
+    if last and last[len(prefix):].isdigit():
+        return int(last[len(prefix):]) + 1
+    return 1
+
 def generate_student_admission_number():
     """
     Generate a unique admission number for students in the format: ADM-YYYY-NNNN
@@ -11,18 +26,7 @@ def generate_student_admission_number():
     """
     current_year = datetime.now().year
     
-    # Get the highest admission number for the current year
-    max_admission = Student.objects.filter(
-        admission_number__startswith=f'ADM-{current_year}'
-    ).aggregate(Max('admission_number'))['admission_number__max']
-    
-    if max_admission:
-        # Extract the numeric part and increment
-        last_num = int(max_admission.split('-')[-1])
-        new_num = last_num + 1
-    else:
-        # First admission of the year
-        new_num = 1
+    new_num = next_sequence_number(Student.objects.all(), 'admission_number', f'ADM-{current_year}-')
     
     return f'ADM-{current_year}-{new_num:04d}'
 
@@ -33,18 +37,7 @@ def generate_staff_number():
     """
     current_year = datetime.now().year
     
-    # Get the highest staff number for the current year
-    max_staff = Staff.objects.filter(
-        staff_id__startswith=f'STF-{current_year}'
-    ).aggregate(Max('staff_id'))['staff_id__max']
-    
-    if max_staff:
-        # Extract the numeric part and increment
-        last_num = int(max_staff.split('-')[-1])
-        new_num = last_num + 1
-    else:
-        # First staff of the year
-        new_num = 1
+    new_num = next_sequence_number(Staff.objects.all(), 'staff_id', f'STF-{current_year}-')
     
     return f'STF-{current_year}-{new_num:04d}'
 
@@ -55,18 +48,7 @@ def generate_guardian_number():
     """
     current_year = datetime.now().year
     
-    # Get the highest guardian number for the current year
-    max_guardian = Guardian.objects.filter(
-        guardian_number__startswith=f'GDN-{current_year}'
-    ).aggregate(Max('guardian_number'))['guardian_number__max']
-    
-    if max_guardian:
-        # Extract the numeric part and increment
-        last_num = int(max_guardian.split('-')[-1])
-        new_num = last_num + 1
-    else:
-        # First guardian of the year
-        new_num = 1
+    new_num = next_sequence_number(Guardian.objects.all(), 'guardian_number', f'GDN-{current_year}-')
     
     return f'GDN-{current_year}-{new_num:04d}'
 
@@ -74,3 +56,55 @@ def generate_random_password(length=12):
     """Generate a random password with letters, digits, and special characters"""
     chars = string.ascii_letters + string.digits + '!@#$%^&*()_+=-'
     return ''.join(random.choice(chars) for _ in range(length))
+
+def get_term_dates(year, term):
+    """Return the (start, end) dates of a term from settings.ACADEMIC_TERMS."""
+    (start_month, start_day), (end_month, end_day) = settings.ACADEMIC_TERMS[term]
+    return date(year, start_month, start_day), date(year, end_month, end_day)
+
+def get_year_dates(year):
+    """Return the (start, end) dates of an academic year: the first term's start to the last term's end."""
+    terms = sorted(settings.ACADEMIC_TERMS)
+    return get_term_dates(year, terms[0])[0], get_term_dates(year, terms[-1])[1]
+
+def get_term_for_date(day):
+    """Return the (year, term) a date falls in, or None if it is outside every term."""
+    for term in settings.ACADEMIC_TERMS:
+        start, end = get_term_dates(day.year, term)
+        if start <= day <= end:
+            return day.year, term
+    return None
+
+def get_cache_version(name):
+    """
+    Return the current version of a group of cache keys. Keys built with the
+    version go stale together when bump_cache_version() is called.
+    """
+    key = f'version:{name}'
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so that a version key evicted from the cache
+        # never comes back with a number that older keys were built with
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+def get_cache_versions(names):
+    """get_cache_version() for several groups in one cache round trip."""
+    keys = [f'version:{name}' for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+def bump_cache_version(name):
+    """Invalidate every cache key built with the current version of `name`; returns the new version."""
+    key = f'version:{name}'
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(key, version, None)
+        return version
@@ -0,0 +1,238 @@
+import json
+import os
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .dashboard_service import invalidate_dashboard
+from .models import Class, Guardian, Staff, Student
+from .sqlite_stress import copy_database
+
+User = get_user_model()
+
+# Hard ceilings on queries per request, whatever the baseline says. These
+# views must not grow with the number of children or records involved.
+QUERY_BUDGETS = {
+    'dashboard_guardian': 6,
+    'guardian_dashboard': 12,
+    'guardian_dashboard_api': 8,
+    'mark_attendance_post': 12,
+}
+
+# A p95 slower than the baseline by less than this is treated as noise
+LATENCY_SLACK_MS = 5.0
+
+Scenario = namedtuple('Scenario', ['name', 'role', 'method', 'url', 'data', 'expected_status'])
+Measurement = namedtuple('Measurement', ['name', 'p50_ms', 'p95_ms', 'queries', 'status'])
+
+
+class BenchmarkUsers:
+    """The first user of each role in the database that has something to show."""
+
+    def __init__(self):
+        self.admin = User.objects.filter(is_superuser=True, is_active=True).order_by('pk').first()
+        self.teacher = Staff.objects.filter(role='teacher', classsubject__isnull=False).select_related('user').order_by('pk').first()
+        self.student = Student.objects.filter(current_class__isnull=False).select_related('user').order_by('pk').first()
+        self.guardian = Guardian.objects.filter(students__isnull=False, user__isnull=False).select_related('user').order_by('pk').first()
+
+    def user(self, role):
+        return {
+            'admin': self.admin,
+            'teacher': self.teacher and self.teacher.user,
+            'student': self.student and self.student.user,
+            'guardian': self.guardian and self.guardian.user,
+        }.get(role)
+
+
+@contextmanager
+def throwaway_database():
+    """
+    Point the default connection at a copy of the database for the duration
+    of a benchmark, since the login and mark_attendance scenarios write.
+    SQLite is copied to a temporary file; other databases run inside a
+    transaction that is rolled back.
+    """
+    if connection.vendor != 'sqlite':
+        with transaction.atomic():
+            try:
+                yield
+            finally:
+                transaction.set_rollback(True)
+                # Entries cached from the rolled back registers are stale
+                invalidate_dashboard('attendance')
+        return
+
+    path = copy_database()
+    original = connection.settings_dict['NAME']
+    connection.close()
+    connection.settings_dict['NAME'] = path
+    try:
+        yield
+    finally:
+        connection.close()
+        connection.settings_dict['NAME'] = original
+        invalidate_dashboard('attendance')
+        for leftover in (path, f'{path}-wal', f'{path}-shm'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+
+def _url(name, *args):
+    return reverse(f'schoolmanagement:{name}', args=args)
+
+
+def build_scenarios(users, password):
+    """The hot views, each as the user of the role that uses it."""
+    scenarios = []
+    if users.student:
+        scenarios += [
+            Scenario('login_email', None, 'post', _url('login'),
+                     {'username': users.student.user.email, 'password': password}, 302),
+            Scenario('login_admission_number', None, 'post', _url('login'),
+                     {'username': users.student.admission_number, 'password': password}, 302),
+        ]
+    for role in ('admin', 'teacher', 'student', 'guardian'):
+        if users.user(role):
+            scenarios.append(Scenario(f'dashboard_{role}', role, 'get', _url('dashboard'), None, 200))
+
+    if users.guardian:
+        child = users.guardian.students.order_by('pk').first()
+        scenarios += [
+            Scenario('guardian_dashboard', 'guardian', 'get', _url('guardian_dashboard'), None, 200),
+            Scenario('guardian_dashboard_api', 'guardian', 'get', _url('guardian_dashboard_api'), None, 200),
+            Scenario('guardian_student_detail', 'guardian', 'get', _url('guardian_student_detail', child.pk), None, 200),
+            Scenario('guardian_attendance', 'guardian', 'get', _url('attendance_history', child.pk), None, 200),
+            Scenario('guardian_exam_results', 'guardian', 'get', _url('exam_results', child.pk), None, 200),
+        ]
+
+    if users.teacher:
+        class_level = Class.objects.filter(classsubject__teacher=users.teacher).order_by('pk').first()
+        url = _url('mark_attendance', class_level.pk)
+        today = timezone.localdate().isoformat()
+        register = {
+            f'status_{pk}': 'present'
+            for pk in class_level.current_students.values_list('pk', flat=True)
+        }
+        scenarios += [
+            Scenario('mark_attendance', 'teacher', 'get', f'{url}?date={today}', None, 200),
+            Scenario('mark_attendance_post', 'teacher', 'post', f'{url}?date={today}', register, 302),
+        ]
+
+    if users.admin:
+        for model in ('student', 'staff', 'guardian', 'attendance', 'examresult', 'feepayment'):
+            scenarios.append(Scenario(
+                f'admin_{model}_changelist', 'admin', 'get', reverse(f'admin:schoolmanagement_{model}_changelist'), None, 200
+            ))
+        if users.student:
+            query = users.student.user.last_name or users.student.admission_number
+            scenarios.append(Scenario(
+                'admin_student_search', 'admin', 'get',
+                reverse('admin:schoolmanagement_student_changelist') + f'?q={query}', None, 200,
+            ))
+        scenarios.append(Scenario('autocomplete_api', 'admin', 'get', _url('autocomplete_api') + '?q=ka', None, 200))
+    return scenarios
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(scenario, users, iterations=20, warmup=2, cold=False):
+    """
+    Run a scenario `warmup` + `iterations` times through the test client.
+    Returns a Measurement with the p50/p95 latency of the timed runs and
+    the most queries any of them made. With `cold`, the cache is cleared
+    before every request.
+    """
+    client = Client(raise_request_exception=False)
+    user = users.user(scenario.role) if scenario.role else None
+    if user is not None:
+        client.force_login(user)
+    request = getattr(client, scenario.method)
+
+    timings, queries, status = [], 0, None
+    for run in range(warmup + iterations):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = request(scenario.url, scenario.data or {})
+            elapsed = (time.perf_counter() - started) * 1000
+        status = response.status_code
+        if status != scenario.expected_status:
+            break
+        if run >= warmup:
+            timings.append(elapsed)
+            queries = max(queries, len(captured))
+        if scenario.name.startswith('login'):
+            client.logout()
+
+    if not timings:
+        return Measurement(scenario.name, None, None, None, status)
+    timings.sort()
+    return Measurement(scenario.name, round(_percentile(timings, 0.5), 2), round(_percentile(timings, 0.95), 2), queries, status)
+
+
+def compare(measurements, baseline, scenarios, tolerance=0.25):
+    """
+    Check measurements against the baseline and the query budgets.
+    Returns a list of (scenario name, problem) for every regression.
+    """
+    expected = {scenario.name: scenario.expected_status for scenario in scenarios}
+    recorded = baseline.get('views', {}) if baseline else {}
+    problems = []
+    for measurement in measurements:
+        name = measurement.name
+        if measurement.status != expected[name]:
+            problems.append((name, f'returned {measurement.status}, expected {expected[name]}'))
+            continue
+        budget = QUERY_BUDGETS.get(name)
+        if budget is not None and measurement.queries > budget:
+            problems.append((name, f'{measurement.queries} queries, over the budget of {budget}'))
+        before = recorded.get(name)
+        if not before:
+            continue
+        if measurement.queries > before['queries']:
+            problems.append((name, f"{measurement.queries} queries, up from {before['queries']}"))
+        allowed = before['p95_ms'] * (1 + tolerance)
+        if measurement.p95_ms > allowed and measurement.p95_ms - before['p95_ms'] > LATENCY_SLACK_MS:
+            problems.append((name, f"p95 {measurement.p95_ms:.1f}ms, up from {before['p95_ms']:.1f}ms"))
+    return problems
+
+
+def load_baseline(path):
+    try:
+        with open(path) as baseline_file:
+            return json.load(baseline_file)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, measurements, iterations):
+    baseline = {
+        'recorded_at': timezone.now().isoformat(timespec='seconds'),
+        'database': connection.vendor,
+        'iterations': iterations,
+        'views': {
+            measurement.name: {
+                'p50_ms': measurement.p50_ms,
+                'p95_ms': measurement.p95_ms,
+                'queries': measurement.queries,
+            }
+            for measurement in measurements
+            if measurement.p50_ms is not None
+        },
+    }
+    with open(path, 'w') as baseline_file:
+        json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
+    return baseline
@@ -1,10 +1,32 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Count, Sum
-from .models import Student, Staff, FeePayment, Exam, FeeStructure, Class, Guardian
+from django.utils.functional import SimpleLazyObject
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils.dateparse import parse_date
+from .decorators import replica_reads
+from .models import Student, Staff, FeePayment, Exam, FeeStructure, Class, Guardian, Attendance
+from .statistics_service import get_statistics, get_exam_statistics
+from .ranking_service import get_rankings
+from .utils import get_term_for_date
+from .marks_import import import_marks as import_marks_file, MarksImportError
+from .enrollment_import import import_students as import_students_file, StudentImportError
+from .timetable_conflicts import school_conflict_report
+from .schedule_service import get_schedule, current_and_next, schedule_ical
+from .autocomplete_service import autocomplete
+from .search_service import KINDS as SEARCH_KINDS, search as search_people
+from .thumbnail_service import CACHE_CONTROL as THUMBNAIL_CACHE_CONTROL, open_thumbnail
+from .dashboard_service import (
+    DASHBOARD_CACHE_TIMEOUT, dashboard_version, admin_metrics, student_panel, teacher_panel, guardian_panel,
+    invalidate_dashboard,
+)
+
+# Days shown in the attendance summary below the register
+ATTENDANCE_SUMMARY_DAYS = 10
 
 
 def login_view(request):
@@ -36,71 +58,280 @@ def logout_view(request):
 def dashboard(request):
     user = request.user
     
-    # Check user role and redirect to appropriate dashboard
+    # Check user role and redirect to appropriate dashboard. Each panel is built
+    # lazily, so a cached template fragment skips its queries altogether.
     if user.is_staff:
         # Admin dashboard
-        total_students = Student.objects.count()
-        total_staff = Staff.objects.count()
-        pending_fees = FeePayment.objects.filter(payment_date__isnull=True).count()
-        recent_exams = Exam.objects.order_by('-date')[:5]
-        
-        context = {
-            'total_students': total_students,
-            'total_staff': total_staff,
-            'pending_fees': pending_fees,
-            'recent_exams': recent_exams
-        }
-        return render(request, 'dashboard/admin_dashboard.html', context)
+        context = {'panel': SimpleLazyObject(admin_metrics)}
+        role, template = 'admin', 'dashboard/admin_dashboard.html'
     
     elif hasattr(user, 'student'):
         # Student dashboard
         student = user.student
-        classes = student.classes.all()
-        recent_exams = Exam.objects.filter(class_level__in=classes).order_by('-date')[:5]
-        upcoming_fees = FeeStructure.objects.filter(
-            class_level__in=classes,
-            due_date__gte=timezone.now().date()
-        ).order_by('due_date')
-        
-        context = {
-            'student': student,
-            'classes': classes,
-            'recent_exams': recent_exams,
-            'upcoming_fees': upcoming_fees
-        }
-        return render(request, 'dashboard/student_dashboard.html', context)
+        context = {'student': student, 'panel': SimpleLazyObject(lambda: student_panel(student))}
+        role, template = 'student', 'dashboard/student_dashboard.html'
     
     elif hasattr(user, 'staff'):
         # Staff/Teacher dashboard
         staff = user.staff
-        classes_taught = Class.objects.filter(teachers=staff)
-        recent_exams = Exam.objects.filter(
-            class_level__in=classes_taught,
-            date__gte=timezone.now().date()
-        ).order_by('date')[:5]
-        
-        context = {
-            'staff': staff,
-            'classes_taught': classes_taught,
-            'recent_exams': recent_exams
-        }
-        return render(request, 'dashboard/teacher_dashboard.html', context)
-    
-    elif hasattr(user, 'guardian'):
+        context = {'staff': staff, 'panel': SimpleLazyObject(lambda: teacher_panel(staff))}
+        role, template = 'teacher', 'dashboard/teacher_dashboard.html'
+    
+    elif hasattr(user, 'guardian_profile'):
         # Guardian dashboard
-        guardian = user.guardian
-        students = guardian.students.all()
-        recent_exams = Exam.objects.filter(
-            class_level__in=students.values('class_level')
-        ).order_by('-date')[:5]
-        
-        context = {
-            'guardian': guardian,
-            'students': students,
-            'recent_exams': recent_exams
-        }
-        return render(request, 'dashboard/guardian_dashboard.html', context)
+        guardian = user.guardian_profile
+        context = {'guardian': guardian, 'panel': SimpleLazyObject(lambda: guardian_panel(guardian))}
+        role, template = 'guardian', 'dashboard/guardian_dashboard.html'
+    
+    else:
+        role = None
+    
+    if role:
+        context['dashboard_version'] = dashboard_version(role)
+        context['dashboard_cache_timeout'] = DASHBOARD_CACHE_TIMEOUT
+        return render(request, template, context)
     
     # If user has no recognized role
     messages.error(request, 'Your account type is not supported. Please contact the administrator.')
     return redirect('schoolmanagement:login')
+
+
+@login_required
+def exam_list(request):
+    exams = list(Exam.objects.select_related('subject', 'class_level'))
+    statistics = get_statistics(exams)
+    for exam in exams:
+        exam.stats = statistics[exam.pk]
+    
+    return render(request, 'academics/exam_list.html', {'exams': exams})
+
+
+@login_required
+def exam_detail(request, exam_id):
+    exam = get_object_or_404(Exam.objects.select_related('subject', 'class_level'), id=exam_id)
+    exam_results = list(exam.results.select_related('student__user').order_by('-marks_obtained'))
+
+    # Positions in the stream and across the class level, from the stored rankings
+    year_term = get_term_for_date(exam.date)
+    if year_term:
+        rankings = {ranking.student_id: ranking for ranking in get_rankings(exam.class_level, *year_term, exam=exam)}
+        for result in exam_results:
+            result.ranking = rankings.get(result.student_id)
+    
+    context = {
+        'exam': exam,
+        'stats': get_exam_statistics(exam),
+        'exam_results': exam_results,
+    }
+    return render(request, 'academics/exam_results.html', context)
+
+
+@login_required
+def import_marks(request, exam_id):
+    exam = get_object_or_404(Exam.objects.select_related('subject', 'class_level'), id=exam_id)
+    result = None
+    
+    if request.method == 'POST':
+        uploaded_file = request.FILES.get('file')
+        if not uploaded_file:
+            messages.error(request, 'Please choose a CSV or Excel file to upload.')
+        else:
+            try:
+                result = import_marks_file(exam, uploaded_file)
+            except MarksImportError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(request, f'Imported marks for {result.imported} student(s).')
+                if result.has_errors:
+                    messages.warning(request, f'{len(result.errors)} row(s) were skipped. See the details below.')
+    
+    return render(request, 'academics/import_marks.html', {'exam': exam, 'result': result})
+
+
+@login_required
+def import_students(request):
+    result = None
+    
+    if request.method == 'POST':
+        uploaded_file = request.FILES.get('file')
+        if not uploaded_file:
+            messages.error(request, 'Please choose a CSV or Excel file to upload.')
+        else:
+            try:
+                result = import_students_file(uploaded_file)
+            except StudentImportError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(request, f'Registered {result.imported} student(s).')
+                if result.has_errors:
+                    messages.warning(request, f'{len(result.errors)} row(s) were skipped. See the details below.')
+    
+    return render(request, 'students/import_students.html', {'result': result})
+
+
+@login_required
+def mark_attendance(request, class_id):
+    class_level = get_object_or_404(Class, id=class_id)
+    day = parse_date(request.GET.get('date', '')) or timezone.localdate()
+    students = class_level.current_students.select_related('user').order_by('user__last_name', 'user__first_name')
+    
+    if request.method == 'POST':
+        statuses = dict(Attendance.ATTENDANCE_STATUS)
+        records = [
+            Attendance(
+                student=student,
+                class_level=class_level,
+                date=day,
+                status=request.POST[f'status_{student.id}'],
+                recorded_by=request.user,
+            )
+            for student in students
+            if request.POST.get(f'status_{student.id}') in statuses
+        ]
+        with transaction.atomic():
+            Attendance.objects.bulk_create(
+                records,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['student', 'class_level', 'date'],
+                update_fields=['status', 'recorded_by', 'updated_at'],
+            )
+            # bulk_create sends no signals, so invalidate the dashboards here
+            invalidate_dashboard('attendance')
+        messages.success(request, f'Attendance saved for {len(records)} student(s).')
+        return redirect(f"{request.path}?date={day.isoformat()}")
+    
+    attendance_summary = class_level.attendances.values('date').annotate(
+        present=Count('id', filter=Q(status='present')),
+        absent=Count('id', filter=Q(status='absent')),
+        late=Count('id', filter=Q(status='late')),
+        total=Count('id'),
+    ).order_by('-date')[:ATTENDANCE_SUMMARY_DAYS]
+    
+    context = {
+        'class': class_level,
+        'date': day,
+        'students': students,
+        'attendance_summary': attendance_summary,
+    }
+    return render(request, 'attendance/mark_attendance.html', context)
+
+
+@login_required
+@replica_reads
+def timetable_conflicts(request):
+    conflicts = school_conflict_report()
+    return render(request, 'timetable/conflict_report.html', {'conflicts': conflicts})
+
+
+def _schedule_context(title, kind, owner_id, schedule):
+    current, upcoming = current_and_next(schedule)
+    return {
+        'title': title,
+        'kind': kind,
+        'owner_id': owner_id,
+        'schedule': schedule,
+        'current_lesson': current,
+        'next_lesson': upcoming,
+    }
+
+
+@login_required
+def teacher_schedule(request, staff_id=None):
+    if staff_id is None:
+        staff = getattr(request.user, 'staff', None)
+        if staff is None:
+            raise Http404('No staff profile for this account')
+    else:
+        staff = get_object_or_404(Staff.objects.select_related('user'), id=staff_id)
+    
+    schedule = get_schedule('teacher', staff.pk)
+    context = _schedule_context(f"Timetable: {staff.user.get_full_name() or staff.user.username}", 'teacher', staff.pk, schedule)
+    return render(request, 'timetable/schedule.html', context)
+
+
+@login_required
+def class_schedule(request, class_id):
+    class_level = get_object_or_404(Class, id=class_id)
+    schedule = get_schedule('class', class_level.pk)
+    context = _schedule_context(f"Timetable: {class_level}", 'class', class_level.pk, schedule)
+    return render(request, 'timetable/schedule.html', context)
+
+
+@login_required
+def schedule_calendar(request, kind, owner_id):
+    if kind not in ('class', 'teacher'):
+        raise Http404('Unknown schedule')
+    
+    schedule = get_schedule(kind, owner_id)
+    name = schedule[0][f'{kind}_name'] if schedule else kind.title()
+    response = HttpResponse(schedule_ical(schedule, f"{name} timetable"), content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = f'inline; filename="{kind}-{owner_id}-timetable.ics"'
+    return response
+
+
+@login_required
+def thumbnail(request, name):
+    # Names are hashes of the image, so a changed picture gets a new URL and this one can be cached for good
+    try:
+        image, content_type = open_thumbnail(name)
+    except FileNotFoundError:
+        raise Http404('No such thumbnail')
+    response = FileResponse(image, content_type=content_type)
+    response['Cache-Control'] = THUMBNAIL_CACHE_CONTROL
+    return response
+
+
+def _search_request(request):
+    query = request.GET.get('q', '').strip()
+    kind = request.GET.get('kind')
+    kinds = [kind] if kind in SEARCH_KINDS else None
+    return query, kind if kinds else '', search_people(query, kinds=kinds)
+
+
+@login_required
+def search(request):
+    query, kind, results = _search_request(request)
+    context = {
+        'query': query,
+        'kind': kind,
+        'kinds': list(SEARCH_KINDS),
+        'results': results,
+    }
+    return render(request, 'search/results.html', context)
+
+
+@login_required
+def search_api(request):
+    query, kind, results = _search_request(request)
+    return JsonResponse({
+        'query': query,
+        'results': [
+            {
+                'kind': result.kind,
+                'id': result.object_id,
+                'name': result.name,
+                'identifiers': result.identifiers,
+                'detail': result.extra,
+            }
+            for result in results
+        ],
+    })
+
+
+@login_required
+def autocomplete_api(request):
+    """Typeahead suggestions for the first few characters of a name or number."""
+    kind = request.GET.get('kind')
+    suggestions = autocomplete(request.user, request.GET.get('q', ''), kinds=[kind] if kind else None)
+    return JsonResponse({
+        'results': [
+            {
+                'kind': suggestion.kind,
+                'id': suggestion.object_id,
+                'label': suggestion.label,
+                'detail': suggestion.detail,
+            }
+            for suggestion in suggestions
+        ],
+    })